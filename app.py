@@ -3,11 +3,13 @@ Spralingua - AI-powered language learning platform.
 Main application entry point.
 """
 
-from flask import Flask, session, request, jsonify
+from flask import Flask, session, request, jsonify, g
 from datetime import datetime
+import time
 
 from config import Config
-from database import db, bcrypt
+from logging_config import configure_logging
+from database import db, bcrypt, get_engine_options
 from routes import register_blueprints
 from progress.progress_manager import ProgressManager
 
@@ -19,8 +21,10 @@ def create_app():
     # Load configuration
     app.config.from_object(Config)
     Config.log_config()
+    configure_logging()
 
     # Initialize extensions
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(Config.SQLALCHEMY_DATABASE_URI, Config)
     db.init_app(app)
     bcrypt.init_app(app)
 
@@ -34,6 +38,7 @@ def create_app():
     from models.test_progress import TestProgress
     from models.level_rule import LevelRule
     from models.exercise_progress import ExerciseProgress
+    from models.usage_ledger import UsageLedger
 
     # Register blueprints
     register_blueprints(app)
@@ -44,6 +49,14 @@ def create_app():
     # Register context processors
     register_context_processors(app)
 
+    # Register request hooks
+    register_request_hooks(app)
+
+    # Precompute translated scenarios (rebuilt lazily if the database isn't ready yet)
+    with app.app_context():
+        from scenarios.scenario_manager import ScenarioManager
+        ScenarioManager.load_scenario_table()
+
     return app
 
 
@@ -93,9 +106,101 @@ def register_context_processors(app):
         return {'timestamp': datetime.utcnow().strftime('%Y%m%d%H%M%S')}
 
 
+def register_request_hooks(app):
+    """Register before/after request hooks."""
+
+    @app.before_request
+    def start_request_timer():
+        """Remember when the request started for the Server-Timing 'total' entry."""
+        g.request_started_at = time.perf_counter()
+
+    @app.before_request
+    def start_profiler():
+        """Profile sampled requests and those carrying a signed X-Profile header."""
+        from observability.profiler import maybe_start_profile
+        maybe_start_profile()
+
+    # Registered first so it runs after every other after_request hook
+    @app.after_request
+    def finish_profiler(response):
+        """Write the request's profile and tell the caller where to find it."""
+        from observability.profiler import finish_profile
+        profile_id = finish_profile()
+        if profile_id:
+            response.headers['X-Profile-Id'] = profile_id
+        return response
+
+    @app.teardown_request
+    def finish_profiler_on_error(exception=None):
+        """Requests that raised never reach after_request; still keep their profile."""
+        from observability.profiler import finish_profile
+        finish_profile()
+
+    @app.after_request
+    def add_server_timing_header(response):
+        """Expose per-stage durations (db, claude_api, hint, ...) for this request."""
+        from observability.timing import get_request_spans, format_server_timing, record_span
+        total = time.perf_counter() - g.get('request_started_at', time.perf_counter())
+        if Config.SERVER_TIMING_ENABLED:
+            response.headers['Server-Timing'] = format_server_timing(get_request_spans(), total)
+        record_span('request', total)
+        return response
+
+    @app.after_request
+    def record_request_metrics(response):
+        """Count the request, its latency, queueing time and SQL statements per route."""
+        from observability.metrics import (
+            HTTP_REQUESTS, HTTP_DURATION, HTTP_QUEUE, DB_QUERIES, DB_QUERIES_PER_REQUEST,
+            parse_request_start, flush
+        )
+        from observability.timing import get_request_spans
+
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        elapsed = time.perf_counter() - g.get('request_started_at', time.perf_counter())
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        HTTP_DURATION.observe(elapsed, route=route)
+
+        queued = parse_request_start(request.headers.get('X-Request-Start'))
+        if queued is not None:
+            HTTP_QUEUE.observe(queued)
+
+        query_count = get_request_spans().get('db', (0.0, 0))[1]
+        DB_QUERIES.inc(query_count, route=route)
+        DB_QUERIES_PER_REQUEST.observe(query_count, route=route)
+
+        flush()
+        return response
+
+    @app.after_request
+    def check_query_budget(response):
+        """Flag likely N+1 statements, enforce query budgets and expose SQL counts outside production."""
+        from observability.queries import get_query_stats, check_request_queries
+        stats = get_query_stats()
+        if not Config.IS_PRODUCTION:
+            response.headers['X-DB-Queries'] = (
+                f"count={stats['count']}, time_ms={stats['seconds'] * 1000:.1f}, repeated={len(stats['repeated'])}"
+            )
+        check_request_queries(request.url_rule.rule if request.url_rule else 'unmatched', stats)
+        return response
+
+    @app.after_request
+    def add_identity_cache_header(response):
+        """Expose identity cache hits/misses outside production to spot duplicate lookups."""
+        if not Config.IS_PRODUCTION:
+            from progress.identity_cache import get_identity_cache_stats
+            stats = get_identity_cache_stats()['request']
+            response.headers['X-Identity-Cache'] = f"hits={stats['hits']}, misses={stats['misses']}"
+        return response
+
+
 # Create app instance
 app = create_app()
 
 
 if __name__ == '__main__':
+    # Gunicorn warms up from gunicorn_config.py; the dev server does it here so /readyz passes
+    from observability.metrics import clear_snapshots
+    from warmup import warmup
+    clear_snapshots()
+    warmup(app, freeze=False)
     app.run(debug=True, port=5000)
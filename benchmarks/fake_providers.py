@@ -0,0 +1,475 @@
+# Fake Provider Servers for Spralingua
+# Deterministic stand-ins for the Anthropic Messages API and Minimax t2a_v2 so
+# the chat and writing flows can be load tested offline and in CI.
+#
+# Usage:
+#   uv run python benchmarks/fake_providers.py
+#   uv run python benchmarks/fake_providers.py --claude-latency lognormal:800:0.4 --claude-error-rate 0.02
+#   uv run python benchmarks/fake_providers.py --minimax-latency uniform:300:900 --minimax-error-rate 0.05
+#
+# Then point the app at them:
+#   ANTHROPIC_BASE_URL=http://127.0.0.1:8901 ANTHROPIC_API_KEY=fake \
+#   MINIMAX_BASE_URL=http://127.0.0.1:8902 MINIMAX_API_KEY=fake MINIMAX_GROUP_ID=fake \
+#   uv run python app.py
+#
+# Latency specs (milliseconds): fixed:MS, uniform:LOW:HIGH, normal:MEAN:STDDEV,
+# lognormal:MEDIAN:SIGMA. Replies are a pure function of the request, and
+# latency/error draws come from a seeded RNG, so runs with the same --seed and
+# request order are repeatable.
+#
+# Note: the Anthropic SDK retries 429/5xx responses (2 retries by default), so
+# injected Claude errors show up as extra latency before they surface as failures.
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server
+
+# One silent MPEG-1 Layer III frame: 128 kbps, 32 kHz, mono (576 bytes, 36 ms)
+MP3_FRAME = bytes([0xFF, 0xFB, 0x98, 0xC4]) + bytes(572)
+MP3_FRAME_SECONDS = 1152 / 32000
+
+REPLIES = [
+    "Das klingt toll! Erzähl mir mehr darüber.",
+    "Interessant! Und was machst du gern am Wochenende?",
+    "Ah, verstehe. Wie lange lernst du schon Deutsch?",
+    "Sehr gut! Woher kommst du eigentlich?",
+    "Wirklich? Das wusste ich nicht. Was gefällt dir daran am besten?",
+    "Schön, dich kennenzulernen! Was ist dein Lieblingsessen?",
+]
+
+HINT_TYPES = ['praise', 'warning', 'error']
+
+
+class LatencyModel:
+    """Samples a delay in seconds from a named distribution"""
+
+    def __init__(self, kind='fixed', params=(0.0,)):
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec):
+        """Parse 'kind:p1[:p2]' (milliseconds) into a LatencyModel"""
+        kind, *values = spec.split(':')
+        params = tuple(float(v) for v in values)
+        expected = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+        if kind not in expected or len(params) != expected[kind]:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        return cls(kind, params)
+
+    def sample(self, rng):
+        if self.kind == 'fixed':
+            ms = self.params[0]
+        elif self.kind == 'uniform':
+            ms = rng.uniform(*self.params)
+        elif self.kind == 'normal':
+            ms = rng.gauss(*self.params)
+        else:
+            median, sigma = self.params
+            ms = rng.lognormvariate(math.log(max(median, 1e-6)), sigma)
+        return max(ms, 0.0) / 1000.0
+
+    def __repr__(self):
+        return f"{self.kind}:{':'.join(f'{p:g}' for p in self.params)}"
+
+
+class FaultPlan:
+    """Seeded latency and error draws shared by one fake server"""
+
+    def __init__(self, latency, error_rate=0.0, timeout_rate=0.0, hang_seconds=60.0, seed=42):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'timeouts': 0}
+
+    def draw(self):
+        """
+        Decide how the next request behaves
+
+        Returns:
+            Tuple of (delay_seconds, outcome) where outcome is 'ok', 'error' or 'timeout'
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = self.latency.sample(self._rng)
+            roll = self._rng.random()
+            if roll < self.timeout_rate:
+                self.stats['timeouts'] += 1
+                return self.hang_seconds, 'timeout'
+            if roll < self.timeout_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return delay, 'error'
+            return delay, 'ok'
+
+    def pick(self, choices):
+        with self._lock:
+            return self._rng.choice(choices)
+
+
+def _digest(*parts):
+    """Stable integer derived from the request content"""
+    return int(hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()[:12], 16)
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def _quoted(text):
+    """First single-quoted fragment of an instruction, e.g. the learner message in a hint request"""
+    start = text.find("'")
+    end = text.rfind("'")
+    return text[start + 1:end] if 0 <= start < end else text
+
+
+def build_claude_reply(system_prompt, user_text):
+    """
+    Produce a deterministic reply shaped like what the calling code parses
+
+    Args:
+        system_prompt: System prompt sent by the app
+        user_text: Last user message
+
+    Returns:
+        Reply text
+    """
+    seed = _digest(system_prompt[:200], user_text)
+
+    if user_text.startswith('Analyze this'):
+        message = _quoted(user_text)
+        words = message.split() or ['Hallo']
+        return json.dumps({
+            'type': HINT_TYPES[seed % len(HINT_TYPES)],
+            'phrase': words[seed % len(words)],
+            'hint': 'Check the word order in this phrase.'
+        })
+
+    if user_text.startswith('Provide comprehensive feedback on these'):
+        return '```json\n' + json.dumps({
+            'top_mistakes': [{'error': 'ich bin gehen', 'correction': 'ich gehe', 'explanation': 'Use one conjugated verb.'}],
+            'strengths': [{'phrase': 'Guten Tag', 'praise': 'Natural greeting.'}],
+            'focus_areas': ['Verb position', 'Articles'],
+            'overall_feedback': 'Good progress, keep practising.',
+            'score': 60 + seed % 40
+        }, ensure_ascii=False) + '\n```'
+
+    if user_text.startswith('Generate an email writing exercise'):
+        return (
+            "Liebe Anna,\n\n"
+            "wie geht es dir? Ich habe nächste Woche Urlaub und möchte dich besuchen.\n"
+            "Hast du am Samstag Zeit? Wir könnten zusammen essen gehen.\n\n"
+            "Viele Grüße\nMaria\n\n"
+            "Response Prompts:\n"
+            "- Sag, ob du am Samstag Zeit hast\n"
+            "- Schlag ein Restaurant vor\n"
+            "- Frag, wann sie ankommt\n"
+        )
+
+    if user_text.startswith('Evaluate this'):
+        return json.dumps({
+            'errors': {
+                'grammar': [{'text': 'ich habe gegangen', 'hint': 'Which auxiliary do verbs of movement use?'}],
+                'vocabulary': [],
+                'spelling': [{'text': 'strasse', 'hint': 'Nouns are capitalised.'}]
+            },
+            'message': 'Nice start!',
+            'general_feedback': 'Look again at the verbs.'
+        }, ensure_ascii=False)
+
+    if user_text.startswith('Provide comprehensive feedback on this'):
+        return json.dumps({
+            'original_text': 'Ich habe Zeit am Samstag.',
+            'corrected_text': 'Am Samstag habe ich Zeit.',
+            'explanations': [{'error': 'Ich habe Zeit am Samstag', 'correction': 'Am Samstag habe ich Zeit', 'explanation': 'Time first sounds more natural.'}],
+            'focus_points': ['Word order with time expressions'],
+            'score': 55 + seed % 45,
+            'feedback': 'Well done!',
+            'improvements_from_first': 'Fewer verb errors.'
+        }, ensure_ascii=False)
+
+    return REPLIES[seed % len(REPLIES)]
+
+
+def create_fake_anthropic_app(plan, model_name='fake-claude', token_delay=0.02):
+    """
+    Anthropic-compatible /v1/messages endpoint (JSON and SSE streaming)
+
+    Args:
+        plan: FaultPlan for latency and error injection
+        model_name: Model name echoed when the request omits one
+        token_delay: Seconds between streamed text deltas
+
+    Returns:
+        Flask app
+    """
+    app = Flask('fake_anthropic')
+
+    @app.route('/v1/messages', methods=['POST'])
+    def messages():
+        body = request.get_json(force=True, silent=True) or {}
+        system_prompt = body.get('system') or ''
+        if isinstance(system_prompt, list):
+            system_prompt = ''.join(block.get('text', '') for block in system_prompt)
+        history = body.get('messages') or []
+        user_text = ''
+        for message in reversed(history):
+            if message.get('role') == 'user':
+                content = message.get('content')
+                user_text = content if isinstance(content, str) else ''.join(
+                    block.get('text', '') for block in content if isinstance(block, dict)
+                )
+                break
+
+        delay, outcome = plan.draw()
+        if outcome == 'timeout':
+            time.sleep(delay)
+        if outcome != 'ok':
+            error_type, status = plan.pick([('overloaded_error', 529), ('api_error', 500), ('rate_limit_error', 429)])
+            return jsonify({'type': 'error', 'error': {'type': error_type, 'message': 'Injected failure'}}), status
+
+        text = build_claude_reply(system_prompt, user_text)
+        input_chars = len(system_prompt) + sum(len(json.dumps(m.get('content', ''))) for m in history)
+        usage = {
+            'input_tokens': _estimate_tokens('x' * input_chars),
+            'output_tokens': _estimate_tokens(text),
+            'cache_creation_input_tokens': 0,
+            'cache_read_input_tokens': 0
+        }
+        message_id = f'msg_fake_{uuid.uuid4().hex[:20]}'
+        model = body.get('model', model_name)
+
+        if not body.get('stream'):
+            time.sleep(delay)
+            return jsonify({
+                'id': message_id,
+                'type': 'message',
+                'role': 'assistant',
+                'model': model,
+                'content': [{'type': 'text', 'text': text}],
+                'stop_reason': 'end_turn',
+                'stop_sequence': None,
+                'usage': usage
+            })
+
+        def events():
+            def sse(event, data):
+                return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+            time.sleep(delay)  # time to first token
+            yield sse('message_start', {'type': 'message_start', 'message': {
+                'id': message_id, 'type': 'message', 'role': 'assistant', 'model': model,
+                'content': [], 'stop_reason': None, 'stop_sequence': None,
+                'usage': dict(usage, output_tokens=1)
+            }})
+            yield sse('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                              'content_block': {'type': 'text', 'text': ''}})
+            words = text.split(' ')
+            for i, word in enumerate(words):
+                chunk = word if i == len(words) - 1 else word + ' '
+                yield sse('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                                  'delta': {'type': 'text_delta', 'text': chunk}})
+                if token_delay:
+                    time.sleep(token_delay)
+            yield sse('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+            yield sse('message_delta', {'type': 'message_delta',
+                                        'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                        'usage': {'output_tokens': usage['output_tokens']}})
+            yield sse('message_stop', {'type': 'message_stop'})
+
+        return Response(events(), mimetype='text/event-stream')
+
+    @app.route('/_stats', methods=['GET'])
+    def stats():
+        return jsonify(plan.stats)
+
+    return app
+
+
+def _mp3_hex(text):
+    """Silent MP3 roughly as long as the text would take to speak (~15 chars/second)"""
+    frames = max(1, int(len(text) / 15 / MP3_FRAME_SECONDS))
+    return (MP3_FRAME * frames).hex(), frames * MP3_FRAME_SECONDS
+
+
+def create_fake_minimax_app(plan, ms_per_char=0.0):
+    """
+    Minimax-compatible /v1/t2a_v2 endpoint returning hex-encoded silent MP3
+
+    Args:
+        plan: FaultPlan for latency and error injection
+        ms_per_char: Extra synthesis latency per input character
+
+    Returns:
+        Flask app
+    """
+    app = Flask('fake_minimax')
+
+    @app.route('/v1/t2a_v2', methods=['POST'])
+    def t2a_v2():
+        body = request.get_json(force=True, silent=True) or {}
+        text = body.get('text', '')
+
+        delay, outcome = plan.draw()
+        delay += len(text) * ms_per_char / 1000.0
+        time.sleep(delay)
+        if outcome != 'ok':
+            if plan.pick(['http', 'api']) == 'http':
+                return jsonify({'base_resp': {'status_code': 1000, 'status_msg': 'Injected HTTP failure'}}), 500
+            return jsonify({'base_resp': {'status_code': 1002, 'status_msg': 'Injected rate limit'}})
+
+        trace_id = uuid.uuid4().hex
+        extra_info = {
+            'audio_format': 'mp3', 'audio_sample_rate': 32000, 'bitrate': 128000, 'audio_channel': 1,
+            'usage_characters': len(text)
+        }
+
+        if not body.get('stream'):
+            audio_hex, seconds = _mp3_hex(text)
+            return jsonify({
+                'data': {'audio': audio_hex, 'status': 2},
+                'extra_info': dict(extra_info, audio_length=int(seconds * 1000), audio_size=len(audio_hex) // 2),
+                'trace_id': trace_id,
+                'base_resp': {'status_code': 0, 'status_msg': 'success'}
+            })
+
+        def events():
+            # One chunk per sentence-ish piece, then the final summary chunk
+            pieces = [p for p in text.replace('!', '.').replace('?', '.').split('.') if p.strip()] or [text]
+            for piece in pieces:
+                audio_hex, _ = _mp3_hex(piece)
+                yield 'data: ' + json.dumps({
+                    'data': {'audio': audio_hex, 'status': 1}, 'trace_id': trace_id,
+                    'base_resp': {'status_code': 0, 'status_msg': ''}
+                }) + '\n\n'
+            audio_hex, seconds = _mp3_hex(text)
+            yield 'data: ' + json.dumps({
+                'data': {'audio': audio_hex, 'status': 2}, 'trace_id': trace_id,
+                'extra_info': dict(extra_info, audio_length=int(seconds * 1000), audio_size=len(audio_hex) // 2),
+                'base_resp': {'status_code': 0, 'status_msg': 'success'}
+            }) + '\n\n'
+
+        return Response(events(), mimetype='text/event-stream')
+
+    @app.route('/_stats', methods=['GET'])
+    def stats():
+        return jsonify(plan.stats)
+
+    return app
+
+
+class FakeProviders:
+    """Runs the fake Anthropic and Minimax servers on background threads"""
+
+    def __init__(self, host='127.0.0.1', claude_port=8901, minimax_port=8902,
+                 claude_plan=None, minimax_plan=None, token_delay=0.02, minimax_ms_per_char=0.0,
+                 quiet=True):
+        if quiet:
+            # Per-request access lines would dominate the output of a load test
+            logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.host = host
+        self.claude_plan = claude_plan or FaultPlan(LatencyModel.parse('fixed:0'))
+        self.minimax_plan = minimax_plan or FaultPlan(LatencyModel.parse('fixed:0'))
+        self._servers = [
+            make_server(host, claude_port, create_fake_anthropic_app(self.claude_plan, token_delay=token_delay), threaded=True),
+            make_server(host, minimax_port, create_fake_minimax_app(self.minimax_plan, minimax_ms_per_char), threaded=True),
+        ]
+        self._threads = []
+
+    @property
+    def claude_url(self):
+        return f'http://{self.host}:{self._servers[0].server_port}'
+
+    @property
+    def minimax_url(self):
+        return f'http://{self.host}:{self._servers[1].server_port}'
+
+    def start(self):
+        for server in self._servers:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+
+    def env(self):
+        """Environment variables that point the app at these servers"""
+        return {
+            'ANTHROPIC_BASE_URL': self.claude_url,
+            'ANTHROPIC_API_KEY': 'fake-key',
+            'MINIMAX_BASE_URL': self.minimax_url,
+            'MINIMAX_API_KEY': 'fake-key',
+            'MINIMAX_GROUP_ID': 'fake-group',
+        }
+
+
+def add_provider_arguments(parser):
+    """Register the fake provider options on an argparse parser"""
+    parser.add_argument('--claude-port', type=int, default=8901)
+    parser.add_argument('--minimax-port', type=int, default=8902)
+    parser.add_argument('--claude-latency', default='lognormal:700:0.35', help='Claude latency spec (ms)')
+    parser.add_argument('--claude-token-ms', type=float, default=20.0, help='Delay between streamed deltas (ms)')
+    parser.add_argument('--claude-error-rate', type=float, default=0.0)
+    parser.add_argument('--claude-timeout-rate', type=float, default=0.0)
+    parser.add_argument('--minimax-latency', default='lognormal:400:0.3', help='Minimax latency spec (ms)')
+    parser.add_argument('--minimax-ms-per-char', type=float, default=2.0)
+    parser.add_argument('--minimax-error-rate', type=float, default=0.0)
+    parser.add_argument('--minimax-timeout-rate', type=float, default=0.0)
+    parser.add_argument('--hang-seconds', type=float, default=60.0, help='How long injected timeouts hang')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def providers_from_args(args, host='127.0.0.1'):
+    """Build FakeProviders from parsed add_provider_arguments() options"""
+    return FakeProviders(
+        host=host,
+        claude_port=args.claude_port,
+        minimax_port=args.minimax_port,
+        claude_plan=FaultPlan(LatencyModel.parse(args.claude_latency), args.claude_error_rate,
+                              args.claude_timeout_rate, args.hang_seconds, seed=args.seed),
+        minimax_plan=FaultPlan(LatencyModel.parse(args.minimax_latency), args.minimax_error_rate,
+                               args.minimax_timeout_rate, args.hang_seconds, seed=args.seed + 1),
+        token_delay=args.claude_token_ms / 1000.0,
+        minimax_ms_per_char=args.minimax_ms_per_char
+    )
+
+
+def main():
+    """Run both fake servers until interrupted"""
+    parser = argparse.ArgumentParser(description='Run fake Anthropic and Minimax servers')
+    parser.add_argument('--host', default='127.0.0.1')
+    add_provider_arguments(parser)
+    args = parser.parse_args()
+
+    providers = providers_from_args(args, host=args.host).start()
+    print(f"[INFO] Fake Anthropic: {providers.claude_url} (latency {providers.claude_plan.latency}, "
+          f"errors {args.claude_error_rate:.1%}, timeouts {args.claude_timeout_rate:.1%})")
+    print(f"[INFO] Fake Minimax:   {providers.minimax_url} (latency {providers.minimax_plan.latency}, "
+          f"errors {args.minimax_error_rate:.1%}, timeouts {args.minimax_timeout_rate:.1%})")
+    print("[INFO] Environment for the app:")
+    for key, value in providers.env().items():
+        print(f"  {key}={value}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        providers.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,578 @@
+# Micro-Benchmarks for Spralingua
+# Times the CPU-bound pieces of the request path over every level x topic x
+# language pair combination and keeps a history so regressions show up.
+#
+# Covered:
+#   - ConversationPromptBuilder._build_clean_prompt
+#   - FeedbackPromptBuilder.get_hint_prompt / get_comprehensive_feedback_prompt
+#   - clean_json_response and the markdown/JSON extraction in services/feedback.py
+#     (generate_language_hint / generate_comprehensive_feedback against replayed replies)
+#   - Hint cache lookups and the near-duplicate MinHash index (services/hint_cache.py)
+#   - LetterTemplates.parse_letter_response
+#   - EmailExerciseManager._extract_json_from_response
+#   - The dashboard aggregation behind GET /api/user-progress (seeded temp SQLite)
+#
+# Usage:
+#   uv run python benchmarks/micro_benchmarks.py                       # run all, append to history
+#   uv run python benchmarks/micro_benchmarks.py --filter prompt       # only matching benchmarks
+#   uv run python benchmarks/micro_benchmarks.py --quick               # every 8th case, for a fast check
+#   uv run python benchmarks/micro_benchmarks.py --label "after caching" --fail-on-regression
+#   uv run python benchmarks/micro_benchmarks.py --no-save             # don't record this run
+#
+# Each run appends one JSON line to --history (default
+# benchmarks/results/micro_benchmarks.jsonl) and is compared with the previous
+# entry recorded on the same Python version; benchmarks whose median per-call
+# time grew by more than --threshold are reported as regressions.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+for path in (PROJECT_ROOT, BENCHMARKS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+LEVELS = ['A1', 'A2', 'B1', 'B2']
+LANGUAGES = ['english', 'german', 'spanish', 'portuguese']
+LANGUAGE_PAIRS = [(i, t) for i in LANGUAGES for t in LANGUAGES if i != t]
+TOPICS_PER_LEVEL = 16
+CHARACTERS = ['harry', 'sally']
+DEFAULT_HISTORY = os.path.join(BENCHMARKS_DIR, 'results', 'micro_benchmarks.jsonl')
+
+SAMPLE_MESSAGES = [
+    "Hallo, ich heiße Anna und ich komme aus Spanien.",
+    "Gestern ich bin ins Kino gegangen mit meine Freunde.",
+    "Ayer fui al cine con mis amigos y comimos palomitas.",
+    "Eu gosto muito de cozinhar nos fins de semana.",
+    "Yesterday I have went to the market for buy vegetables.",
+]
+
+# name -> (case builder, run function); see benchmark()
+BENCHMARKS = {}
+
+
+def benchmark(name, cases):
+    """
+    Register a benchmark
+
+    The decorated function receives one case and returns a zero-argument
+    callable; only the callable is timed, so per-case setup stays outside
+    the measurement.
+
+    Args:
+        name: Benchmark name used in reports and history
+        cases: Zero-argument function returning the list of cases
+    """
+    def decorator(func):
+        BENCHMARKS[name] = (cases, func)
+        return func
+    return decorator
+
+
+# =============================================================================
+# Cases
+# =============================================================================
+
+def level_topic_pair_cases():
+    """Every level x topic x language pair combination"""
+    return [
+        {'level': level, 'topic': topic, 'input_language': input_language, 'target_language': target_language}
+        for level in LEVELS
+        for topic in range(1, TOPICS_PER_LEVEL + 1)
+        for input_language, target_language in LANGUAGE_PAIRS
+    ]
+
+
+def level_pair_cases():
+    """Every level x language pair combination (for code that covers all topics at once)"""
+    return [
+        {'level': level, 'input_language': input_language, 'target_language': target_language}
+        for level in LEVELS
+        for input_language, target_language in LANGUAGE_PAIRS
+    ]
+
+
+def synthetic_topic(level, topic, target_language):
+    """Deterministic topic parameters shaped like TopicManager's output"""
+    level_index = LEVELS.index(level)
+    return {
+        'word_limit': 30 + 15 * level_index + topic % 4 * 5,
+        'opening_phrase': f'[{target_language}] Opening line for {level} topic {topic}',
+        'conversation_flow': [f'Step {step} of topic {topic}' for step in range(1, 4 + topic % 3)],
+        'required_vocabulary': [f'word_{topic}_{index}' for index in range(6 + level_index * 3)],
+        'topic_specific_rules': 'Use only the present tense.' if topic % 2 else None,
+        'number_of_exchanges': 4 + topic % 3,
+        'subtopics': [f'Subtopic {topic}.{index}' for index in range(1, 3 + topic % 3)],
+    }
+
+
+class ReplayClaudeClient:
+    """Stands in for ClaudeClient and answers with the fake provider's canned replies"""
+
+    def __init__(self):
+        from fake_providers import build_claude_reply
+        self.build_reply = build_claude_reply
+        self.enable_tools = False
+
+    def set_tools_enabled(self, enabled):
+        self.enable_tools = enabled
+
+    def send_message(self, user_input, system_prompt='', context=None, call_type='reply'):
+        return self.build_reply(system_prompt, user_input)
+
+
+# =============================================================================
+# Benchmarks
+# =============================================================================
+
+@benchmark('conversation_prompt.build_clean_prompt', level_topic_pair_cases)
+def bench_build_clean_prompt(case):
+    from models.level_rule import LevelRule
+    from prompts.conversation_prompt_builder import ConversationPromptBuilder
+
+    builder = ConversationPromptBuilder()
+    personality = builder._load_personality(CHARACTERS[case['topic'] % len(CHARACTERS)])
+    topic_params = synthetic_topic(case['level'], case['topic'], case['target_language'])
+    level_rules = LevelRule(case['level'], topic_params['word_limit'], {'tenses': ['present']},
+                            'basic', f"Guidelines for {case['level']} learners. " * 4)
+    context = {
+        'user_name': 'Anna',
+        'input_language': case['input_language'],
+        'target_language': case['target_language'],
+        'level': case['level'],
+        'topic_number': case['topic'],
+        'topic_title': f"Topic {case['topic']}",
+        'subtopics': topic_params['subtopics'],
+    }
+    return lambda: builder._build_clean_prompt(personality, context, level_rules, topic_params)
+
+
+@benchmark('feedback_prompt.get_hint_prompt', level_pair_cases)
+def bench_hint_prompt(case):
+    from prompts.feedback_prompts import FeedbackPromptBuilder
+
+    builder = FeedbackPromptBuilder()
+    return lambda: builder.get_hint_prompt(case['target_language'], case['input_language'], case['level'])
+
+
+@benchmark('feedback_prompt.get_comprehensive_feedback_prompt', level_pair_cases)
+def bench_comprehensive_feedback_prompt(case):
+    from prompts.feedback_prompts import FeedbackPromptBuilder
+
+    builder = FeedbackPromptBuilder()
+    return lambda: builder.get_comprehensive_feedback_prompt(
+        case['target_language'], case['input_language'], case['level']
+    )
+
+
+@benchmark('feedback.clean_json_response', level_pair_cases)
+def bench_clean_json_response(case):
+    from services.feedback import clean_json_response
+
+    # A feedback payload with the control characters and trailing commas the cleaner removes
+    payload = json.dumps({
+        'top_mistakes': [{'error': message, 'correction': message, 'explanation': 'Word order.'}
+                         for message in SAMPLE_MESSAGES],
+        'strengths': [{'phrase': 'Guten Tag', 'praise': 'Natural greeting.'}],
+        'focus_areas': ['Verb position', 'Articles', case['target_language']],
+        'overall_feedback': f"Good progress at {case['level']}.",
+        'score': 72
+    }, ensure_ascii=False)
+    raw = payload.replace('],', '],\x0b').replace('}]', '},]').replace('"score"', '\x07"score"')
+    return lambda: clean_json_response(raw)
+
+
+@benchmark('feedback.generate_language_hint', level_pair_cases)
+def bench_generate_language_hint(case):
+    from services.feedback import generate_language_hint
+
+    client = ReplayClaudeClient()
+    message = SAMPLE_MESSAGES[LEVELS.index(case['level']) % len(SAMPLE_MESSAGES)]
+    return lambda: generate_language_hint(message, client, case['level'], case['target_language'],
+                                          case['input_language'])
+
+
+@benchmark('hint_cache.get_cached_hint', level_pair_cases)
+def bench_hint_cache_lookup(case):
+    from config import Config
+    from services import hint_cache
+
+    message = SAMPLE_MESSAGES[LEVELS.index(case['level']) % len(SAMPLE_MESSAGES)]
+    args = (case['target_language'], case['input_language'], case['level'])
+    hint = {'type': 'error', 'phrase': message.split()[1], 'hint': 'Replayed hint', 'category': 'grammar'}
+
+    def lookup():
+        Config.HINT_CACHE_ENABLED = True
+        try:
+            return hint_cache.get_cached_hint(message.upper(), *args)
+        finally:
+            Config.HINT_CACHE_ENABLED = False
+
+    Config.HINT_CACHE_ENABLED = True
+    try:
+        hint_cache.store_hint(message, *args, hint)
+    finally:
+        Config.HINT_CACHE_ENABLED = False
+    return lookup
+
+
+@benchmark('similarity_index.lookup', level_pair_cases)
+def bench_similarity_lookup(case):
+    from services.similarity_index import MinHashIndex
+
+    index = MinHashIndex(max_entries=len(SAMPLE_MESSAGES) * 50)
+    for number in range(50):
+        for message in SAMPLE_MESSAGES:
+            index.add(case['level'], f'{message.lower()} {number}', {'number': number}, ttl=3600)
+    query = SAMPLE_MESSAGES[LEVELS.index(case['level']) % len(SAMPLE_MESSAGES)].lower().rstrip('.')
+    return lambda: index.lookup(case['level'], query, 0.8)
+
+
+@benchmark('feedback.generate_comprehensive_feedback', level_pair_cases)
+def bench_generate_comprehensive_feedback(case):
+    from services.feedback import generate_comprehensive_feedback
+
+    client = ReplayClaudeClient()
+    return lambda: generate_comprehensive_feedback(SAMPLE_MESSAGES, client, case['level'],
+                                                   case['target_language'], case['input_language'])
+
+
+@benchmark('letter_templates.parse_letter_response', level_pair_cases)
+def bench_parse_letter_response(case):
+    from email_writing.letter_templates import LetterTemplates
+
+    templates = LetterTemplates()
+    language = case['target_language']
+    random.seed(f"{case['level']}-{language}")
+    name = templates.get_random_name(language, 'female')
+    letter = '\n'.join([
+        f"{templates.get_greeting(language, 'Anna', 'female')},",
+        '',
+        templates.get_how_are_you(language),
+        *[f'Sentence {index} about the weekend plans and the weather.' for index in range(4 + LEVELS.index(case['level']) * 2)],
+        '',
+        templates.get_closing(language),
+        name,
+        '',
+        'Response Prompts:',
+        '- Say whether you are free on Saturday',
+        '- Suggest a restaurant',
+        '- Ask when she arrives',
+    ])
+    return lambda: templates.parse_letter_response(letter, language)
+
+
+def json_shape_cases():
+    """Level x language pair x the three response shapes the extractor handles"""
+    return [dict(case, shape=shape) for case in level_pair_cases() for shape in ('code_block', 'bare', 'embedded')]
+
+
+@benchmark('exercise_manager.extract_json_from_response', json_shape_cases)
+def bench_extract_json_from_response(case):
+    from email_writing.exercise_manager import EmailExerciseManager
+
+    manager = EmailExerciseManager()
+    body = json.dumps({
+        'original_text': ' '.join(SAMPLE_MESSAGES),
+        'corrected_text': ' '.join(SAMPLE_MESSAGES),
+        'explanations': [{'error': message, 'correction': message, 'explanation': 'Word order.'}
+                         for message in SAMPLE_MESSAGES],
+        'focus_points': ['Word order', case['target_language']],
+        'score': 64,
+        'feedback': f"Feedback for a {case['level']} learner."
+    }, ensure_ascii=False)
+    response = {
+        'code_block': f'Here is the evaluation:\n```json\n{body}\n```',
+        'bare': body,
+        'embedded': f'Here is the evaluation: {body} Hope this helps!',
+    }[case['shape']]
+    return lambda: manager._extract_json_from_response(response)
+
+
+@benchmark('dashboard.get_user_progress', level_pair_cases)
+def bench_get_user_progress(case):
+    app, user_ids = dashboard_app()
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session['authenticated'] = True
+        flask_session['user_id'] = user_ids[case['level']]
+    query = {'input_language': case['input_language'], 'target_language': case['target_language']}
+
+    def run():
+        response = client.get('/api/user-progress', query_string=query)
+        if response.status_code != 200:
+            raise RuntimeError(f'/api/user-progress returned {response.status_code}')
+    return run
+
+
+_dashboard = {}
+
+
+def dashboard_app():
+    """Seed a temp SQLite database with one learner per level holding every language pair"""
+    if _dashboard:
+        return _dashboard['app'], _dashboard['user_ids']
+
+    from app import app
+    from database import db
+    from models.exercise_progress import ExerciseProgress
+    from models.level_rule import LevelRule
+    from models.test_progress import TestProgress
+    from models.topic_definition import TopicDefinition
+    from models.topic_progress import TopicProgress
+    from models.user import User
+    from models.user_progress import UserProgress
+
+    now = datetime.utcnow()
+    user_ids = {}
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        for level in LEVELS:
+            db.session.add(LevelRule(level, 40, {'tenses': ['present']}, 'basic', 'Keep sentences short.'))
+            for topic in range(1, TOPICS_PER_LEVEL + 1):
+                params = synthetic_topic(level, topic, 'german')
+                db.session.add(TopicDefinition(
+                    level, topic, f'topic_{topic}', params['subtopics'], ['everyday life'], 'Talk.',
+                    word_limit=params['word_limit'], number_of_exchanges=params['number_of_exchanges']
+                ))
+
+        for user_index, level in enumerate(LEVELS, start=1):
+            user_ids[level] = user_index
+            db.session.execute(User.__table__.insert(), [{
+                'id': user_index, 'email': f'bench{user_index}@example.com', 'name': f'Bench {user_index}',
+                'password_hash': 'x' * 60, 'progress_level': 0
+            }])
+            for pair_index, (input_language, target_language) in enumerate(LANGUAGE_PAIRS):
+                completed_count = pair_index % (TOPICS_PER_LEVEL + 1)
+                progress_id = db.session.execute(UserProgress.__table__.insert().values(
+                    user_id=user_index, input_language=input_language, target_language=target_language,
+                    current_level=level, current_topic=min(completed_count + 1, TOPICS_PER_LEVEL),
+                    progress_in_level=0, last_accessed=now, created_at=now
+                )).inserted_primary_key[0]
+
+                for topic in range(1, TOPICS_PER_LEVEL + 1):
+                    completed = topic <= completed_count
+                    db.session.execute(TopicProgress.__table__.insert().values(
+                        user_progress_id=progress_id, level=level, topic_number=topic, completed=completed,
+                        completed_at=now if completed else None, exercises_completed=5 if completed else 0,
+                        total_exercises=5, has_seen_completion_popup=completed
+                    ))
+                    if completed:
+                        db.session.execute(ExerciseProgress.__table__.insert(), [{
+                            'user_progress_id': progress_id, 'level': level, 'topic_number': topic,
+                            'exercise_type': exercise_type, 'score': 80.0, 'completed': True, 'attempts': 1,
+                            'best_score': 80.0, 'completed_at': now, 'last_attempt_at': now,
+                            'messages_correct': 4, 'messages_total': 5
+                        } for exercise_type in ('casual_chat', 'email_writing')])
+
+                db.session.execute(TestProgress.__table__.insert(), [{
+                    'user_progress_id': progress_id, 'test_type': test_type, 'test_number': number,
+                    'passed': False, 'attempts': 0
+                } for number, test_type in enumerate(['checkpoint_1', 'checkpoint_2', 'final'], start=1)])
+        db.session.commit()
+
+    _dashboard.update(app=app, user_ids=user_ids)
+    return app, user_ids
+
+
+# =============================================================================
+# Runner
+# =============================================================================
+
+def time_callable(func, min_time, rounds):
+    """
+    Best per-call time over several rounds
+
+    The loop count is calibrated so each round lasts at least min_time.
+
+    Returns:
+        Seconds per call
+    """
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    best = elapsed / loops
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+
+def run_benchmark(name, quick, min_time, rounds):
+    """
+    Time one benchmark over all of its cases
+
+    Returns:
+        Dict of summary statistics (microseconds per call)
+    """
+    cases_func, bench_func = BENCHMARKS[name]
+    cases = cases_func()
+    if quick:
+        cases = cases[::8]
+
+    per_case = []
+    for case in cases:
+        func = bench_func(case)
+        func()   # warm caches (personalities, imports) before timing
+        per_case.append(time_callable(func, min_time, rounds) * 1e6)
+
+    per_case.sort()
+    return {
+        'cases': len(per_case),
+        'median_us': statistics.median(per_case),
+        'p95_us': per_case[max(0, int(round(0.95 * len(per_case))) - 1)],
+        'max_us': per_case[-1],
+        'sweep_ms': sum(per_case) / 1000.0,
+    }
+
+
+def load_history(path):
+    """Read every recorded run (oldest first)"""
+    if not os.path.exists(path):
+        return []
+    runs = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    continue
+    return runs
+
+
+def previous_run(history, python_version, quick):
+    """Most recent comparable run (same Python version and case set)"""
+    for run in reversed(history):
+        if run.get('python') == python_version and run.get('quick', False) == quick:
+            return run
+    return None
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    """Run the micro-benchmarks"""
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for prompt building, parsing and progress')
+    parser.add_argument('--filter', help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--quick', action='store_true', help='Use every 8th case')
+    parser.add_argument('--min-time', type=float, default=0.002, help='Minimum seconds per timing round')
+    parser.add_argument('--rounds', type=int, default=3, help='Timing rounds per case (best is kept)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON lines file of past runs')
+    parser.add_argument('--label', help='Free-text note stored with this run')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Median slowdown (fraction) reported as a regression')
+    parser.add_argument('--no-save', action='store_true', help="Don't append this run to the history")
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on regressions')
+    args = parser.parse_args()
+
+    # Personalities and templates are loaded relative to the project root
+    os.chdir(PROJECT_ROOT)
+
+    # Everything runs against a throwaway database and quiet logging
+    temp_dir = tempfile.mkdtemp(prefix='spralingua_micro_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(temp_dir, 'micro.db')}"
+    os.environ.setdefault('FLASK_SECRET_KEY', 'micro-benchmark-secret')
+    os.environ['LOG_LEVEL'] = 'WARNING'
+    os.environ['METRICS_DIR'] = ''
+    # generate_language_hint is measured on the cache-miss path; the cache has its own benchmark
+    os.environ['HINT_CACHE_ENABLED'] = 'false'
+    os.environ['HINT_CACHE_PATH'] = os.path.join(temp_dir, 'hints.sqlite3')
+
+    # Importing the app registers every model mapper the benchmarked code relies on
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app  # noqa: F401
+
+    names = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+    if not names:
+        print(f"[ERROR] No benchmark matches '{args.filter}'")
+        return 1
+
+    python_version = platform.python_version()
+    history = load_history(args.history)
+    baseline = previous_run(history, python_version, args.quick)
+
+    results = {}
+    print(f"[INFO] Running {len(names)} benchmarks (python {python_version}"
+          f"{', quick' if args.quick else ''})")
+    for name in names:
+        started = time.perf_counter()
+        # Several of the measured functions print progress; keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = run_benchmark(name, args.quick, args.min_time, args.rounds)
+        print(f"[INFO] {name}: {results[name]['cases']} cases in {time.perf_counter() - started:.1f}s")
+
+    print()
+    if baseline:
+        print(f"[RESULTS] Compared with {baseline.get('commit') or 'unknown'} "
+              f"({baseline.get('timestamp')}{', ' + baseline['label'] if baseline.get('label') else ''})")
+    print(f"{'benchmark':<52} {'cases':>5} {'median us':>10} {'p95 us':>10} {'max us':>10} {'change':>8}")
+
+    regressions = []
+    for name, stats in results.items():
+        change = ''
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous and previous.get('median_us'):
+            ratio = stats['median_us'] / previous['median_us'] - 1
+            change = f'{ratio:+.0%}'
+            if ratio > args.threshold:
+                regressions.append((name, ratio))
+                change += ' !'
+        print(f"{name:<52} {stats['cases']:>5} {stats['median_us']:>10.1f} {stats['p95_us']:>10.1f} "
+              f"{stats['max_us']:>10.1f} {change:>8}")
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, 'a') as f:
+            f.write(json.dumps({
+                'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'commit': git_revision(),
+                'label': args.label,
+                'python': python_version,
+                'platform': platform.platform(),
+                'quick': args.quick,
+                'results': results,
+            }) + '\n')
+        print(f"[INFO] Run recorded in {args.history}")
+
+    if regressions:
+        print()
+        for name, ratio in regressions:
+            print(f"[WARNING] Regression: {name} median {ratio:+.0%} (threshold {args.threshold:.0%})")
+        if args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
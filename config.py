@@ -4,6 +4,7 @@ Centralizes all configuration in one place.
 """
 
 import os
+import tempfile
 from datetime import timedelta
 from dotenv import load_dotenv
 
@@ -25,6 +26,19 @@ class Config:
     SQLALCHEMY_DATABASE_URI = _database_url
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool (see database.get_engine_options and observability/pool.py)
+    # Per worker process: size for (workers x threads) against the database's connection limit.
+    # DB_PGBOUNCER=true targets PgBouncer in transaction mode: no server-side prepared
+    # statements and no startup options, so DB_STATEMENT_TIMEOUT_MS must be set on the role instead.
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '10'))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+    DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', 'false').lower() == 'true'
+
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     SESSION_COOKIE_SECURE = bool(os.getenv('RAILWAY_ENVIRONMENT'))
@@ -41,10 +55,142 @@ class Config:
     MINIMAX_GROUP_ID = os.getenv('MINIMAX_GROUP_ID')
     MINIMAX_VOICE_ID = os.getenv('MINIMAX_VOICE_ID', 'female-shaonv')
 
+    # Provider endpoints (override to use benchmarks/fake_providers.py)
+    ANTHROPIC_BASE_URL = os.getenv('ANTHROPIC_BASE_URL')
+    MINIMAX_BASE_URL = os.getenv('MINIMAX_BASE_URL', 'https://api.minimax.io')
+
+    # Claude model routing (see services/model_routing.py)
+    # CLAUDE_MODEL_ROUTES ("call_type=model,...") overrides the model per call type
+    CLAUDE_MODEL = os.getenv('CLAUDE_MODEL', 'claude-3-haiku-20240307')
+    CLAUDE_MODEL_ROUTES = os.getenv('CLAUDE_MODEL_ROUTES', '')
+    REPLY_TOKENS_PER_WORD = float(os.getenv('REPLY_TOKENS_PER_WORD', '2.0'))
+
+    # Hint cache (see services/hint_cache.py)
+    # Per-process LRU in front of a SQLite file shared by the workers on a host
+    HINT_CACHE_ENABLED = os.getenv('HINT_CACHE_ENABLED', 'true').lower() == 'true'
+    HINT_CACHE_PATH = os.getenv('HINT_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'spralingua-cache', 'hints.sqlite3'))
+    HINT_CACHE_TTL = float(os.getenv('HINT_CACHE_TTL', '86400'))
+    HINT_CACHE_MAX_ENTRIES = int(os.getenv('HINT_CACHE_MAX_ENTRIES', '20000'))
+    HINT_CACHE_LOCAL_ENTRIES = int(os.getenv('HINT_CACHE_LOCAL_ENTRIES', '2000'))
+    # Near-duplicate reuse via MinHash/LSH over character trigrams (per process)
+    HINT_SIMILARITY_ENABLED = os.getenv('HINT_SIMILARITY_ENABLED', 'true').lower() == 'true'
+    HINT_SIMILARITY_THRESHOLD = float(os.getenv('HINT_SIMILARITY_THRESHOLD', '0.8'))
+    HINT_SIMILARITY_ENTRIES = int(os.getenv('HINT_SIMILARITY_ENTRIES', '5000'))
+
+    # Outbound call resilience (see services/resilience.py)
+    # Per-attempt timeouts; retries use full-jitter backoff limited by a retry budget
+    # (RETRY_BUDGET_RATIO extra calls per call, RETRY_BUDGET_BURST saved up), and a
+    # per-provider circuit breaker opens at CIRCUIT_FAILURE_RATE over CIRCUIT_WINDOW seconds.
+    # HINT_HEDGE_AFTER_MS > 0 sends a duplicate hint request when the first is that slow.
+    CLAUDE_TIMEOUT = float(os.getenv('CLAUDE_TIMEOUT', '30'))
+    CLAUDE_HINT_TIMEOUT = float(os.getenv('CLAUDE_HINT_TIMEOUT', '10'))
+    MINIMAX_CONNECT_TIMEOUT = float(os.getenv('MINIMAX_CONNECT_TIMEOUT', '3.05'))
+    MINIMAX_TIMEOUT = float(os.getenv('MINIMAX_TIMEOUT', '20'))
+    RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', '3'))
+    RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '0.25'))
+    RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '4'))
+    RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', '0.2'))
+    RETRY_BUDGET_BURST = float(os.getenv('RETRY_BUDGET_BURST', '10'))
+    CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5'))
+    CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', '10'))
+    CIRCUIT_WINDOW = float(os.getenv('CIRCUIT_WINDOW', '30'))
+    CIRCUIT_COOLDOWN = float(os.getenv('CIRCUIT_COOLDOWN', '15'))
+    HINT_HEDGE_AFTER_MS = float(os.getenv('HINT_HEDGE_AFTER_MS', '0'))
+
+    # Claude admission control (see services/llm_scheduler.py)
+    # At most CLAUDE_MAX_CONCURRENCY calls run, by priority
+    # (reply > evaluation > hint > letter > feedback); a full class queue or a wait over
+    # CLAUDE_QUEUE_TIMEOUT seconds returns 429. CLAUDE_SCHEDULER_LIMITS ("hint=4/8,...")
+    # overrides per-class concurrency/queue limits. The limits hold across the workers on a
+    # host through CLAUDE_SCHEDULER_PATH (empty: per worker); a crashed worker's slots are
+    # freed after CLAUDE_SLOT_LEASE seconds. They only bite with several workers or threads.
+    CLAUDE_MAX_CONCURRENCY = int(os.getenv('CLAUDE_MAX_CONCURRENCY', '8'))
+    CLAUDE_QUEUE_TIMEOUT = float(os.getenv('CLAUDE_QUEUE_TIMEOUT', '10'))
+    CLAUDE_SCHEDULER_LIMITS = os.getenv('CLAUDE_SCHEDULER_LIMITS', '')
+    CLAUDE_SCHEDULER_PATH = os.getenv('CLAUDE_SCHEDULER_PATH', os.path.join(tempfile.gettempdir(), 'spralingua-cache', 'scheduler.sqlite3'))
+    CLAUDE_SLOT_LEASE = float(os.getenv('CLAUDE_SLOT_LEASE', '120'))
+
+    # Rate limits and daily budgets (see services/rate_limit.py and services/spend_ledger.py)
+    # RATE_LIMITS / RATE_LIMITS_IP: "name=capacity/seconds,..." token buckets per user / per client IP,
+    # shared by the workers on a host through RATE_LIMIT_PATH (empty: per worker).
+    # RATE_LIMIT_TRUSTED_PROXIES is how many proxies append to X-Forwarded-For; 0 ignores the header
+    # (a client could pick its own IP bucket otherwise). Set it to 1 on Railway.
+    # Daily budgets per user and UTC day; 0 disables.
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_PATH = os.getenv('RATE_LIMIT_PATH', os.path.join(tempfile.gettempdir(), 'spralingua-cache', 'ratelimit.sqlite3'))
+    RATE_LIMITS = os.getenv('RATE_LIMITS', 'chat=20/60,tts=40/60,generate=6/300,submit=12/300')
+    RATE_LIMITS_IP = os.getenv('RATE_LIMITS_IP', 'chat=120/60,tts=240/60,generate=30/300,submit=60/300')
+    RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', '0'))
+    DAILY_TOKEN_BUDGET = int(os.getenv('DAILY_TOKEN_BUDGET', '300000'))
+    DAILY_TTS_CHAR_BUDGET = int(os.getenv('DAILY_TTS_CHAR_BUDGET', '30000'))
+
+    # Sentence-pipelined TTS (see services/tts_pipeline.py)
+    # Per worker: TTS_PIPELINE_WORKERS Minimax calls in flight across all pipelined requests
+    TTS_PIPELINE_ENABLED = os.getenv('TTS_PIPELINE_ENABLED', 'true').lower() == 'true'
+    TTS_PIPELINE_WORKERS = int(os.getenv('TTS_PIPELINE_WORKERS', '4'))
+    TTS_PIPELINE_MAX_SEGMENTS = int(os.getenv('TTS_PIPELINE_MAX_SEGMENTS', '6'))
+
+    # Server-initiated reply audio (see services/reply_audio.py)
+    # The chat endpoint starts synthesising the reply when asked to ("speak": true); segments
+    # are kept for REPLY_AUDIO_TTL seconds in REPLY_AUDIO_PATH (empty: per worker).
+    REPLY_AUDIO_ENABLED = os.getenv('REPLY_AUDIO_ENABLED', 'true').lower() == 'true'
+    REPLY_AUDIO_PATH = os.getenv('REPLY_AUDIO_PATH', os.path.join(tempfile.gettempdir(), 'spralingua-cache', 'reply_audio.sqlite3'))
+    REPLY_AUDIO_TTL = float(os.getenv('REPLY_AUDIO_TTL', '120'))
+    REPLY_AUDIO_WAIT = float(os.getenv('REPLY_AUDIO_WAIT', '30'))
+
+    # Single-flight deduplication of identical provider calls (see services/single_flight.py)
+    # Always within a worker; SINGLE_FLIGHT_PATH (a SQLite lock table) also dedupes across
+    # the workers on a host. Results stay readable for SINGLE_FLIGHT_RESULT_TTL seconds.
+    SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+    SINGLE_FLIGHT_PATH = os.getenv('SINGLE_FLIGHT_PATH', '')
+    SINGLE_FLIGHT_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_TIMEOUT', '30'))
+    SINGLE_FLIGHT_RESULT_TTL = float(os.getenv('SINGLE_FLIGHT_RESULT_TTL', '5'))
+
     # Environment detection
     IS_PRODUCTION = bool(os.getenv('RAILWAY_ENVIRONMENT'))
     DEBUG = not IS_PRODUCTION
 
+    # Logging (see logging_config.py)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO' if IS_PRODUCTION else 'DEBUG').upper()
+    LOG_SAMPLE_RATES = os.getenv('LOG_SAMPLE_RATES', '')
+
+    # Server-Timing response header with per-stage durations (see observability/timing.py)
+    SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+
+    # Prometheus metrics (see observability/metrics.py)
+    # METRICS_DIR holds per-worker snapshots so /metrics reports all workers (empty: per worker);
+    # METRICS_TOKEN protects /metrics (required in production: without it /metrics answers 404)
+    METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'spralingua-cache', 'metrics'))
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1.0'))
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+    # SQL query diagnostics (see observability/queries.py)
+    # Statements run N_PLUS_ONE_THRESHOLD+ times in one request are flagged as likely N+1;
+    # QUERY_BUDGETS ("route=max,...") overrides the per-route statement budgets
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '5'))
+    QUERY_BUDGET_DEFAULT = int(os.getenv('QUERY_BUDGET_DEFAULT', '60'))
+    QUERY_BUDGETS = os.getenv('QUERY_BUDGETS', '')
+    QUERY_BUDGET_ENFORCE = os.getenv('QUERY_BUDGET_ENFORCE', 'false').lower() == 'true'
+
+    # Sampling profiler (see observability/profiler.py)
+    # PROFILER_TOKEN signs X-Profile request headers and protects /ops/profiles
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'
+    PROFILER_SAMPLE_RATE = float(os.getenv('PROFILER_SAMPLE_RATE', '0.01'))
+    PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', '5'))
+    PROFILER_DIR = os.getenv('PROFILER_DIR', os.path.join(tempfile.gettempdir(), 'spralingua-profiles'))
+    PROFILER_MAX_FILES = int(os.getenv('PROFILER_MAX_FILES', '200'))
+    PROFILER_TOKEN = os.getenv('PROFILER_TOKEN')
+
+    # Readiness probes (see observability/health.py)
+    # /readyz fails until warm-up is done or while the database is slower than READINESS_DB_MAX_MS;
+    # provider probes are opt-in and only fail readiness with READINESS_REQUIRE_PROVIDERS
+    READINESS_DB_MAX_MS = float(os.getenv('READINESS_DB_MAX_MS', '250'))
+    READINESS_PROBE_PROVIDERS = os.getenv('READINESS_PROBE_PROVIDERS', 'false').lower() == 'true'
+    READINESS_REQUIRE_PROVIDERS = os.getenv('READINESS_REQUIRE_PROVIDERS', 'false').lower() == 'true'
+    READINESS_PROVIDER_TIMEOUT = float(os.getenv('READINESS_PROVIDER_TIMEOUT', '2.0'))
+    READINESS_PROVIDER_MAX_MS = float(os.getenv('READINESS_PROVIDER_MAX_MS', '1000'))
+    READINESS_PROVIDER_TTL = float(os.getenv('READINESS_PROVIDER_TTL', '30'))
+
     @classmethod
     def log_config(cls):
         """Log configuration status (masked for security)."""
@@ -55,9 +201,15 @@ class Config:
         else:
             print("[CONFIG ERROR] No DATABASE_URL found!")
 
+        print(f"[CONFIG] DB pool: size={cls.DB_POOL_SIZE}, overflow={cls.DB_MAX_OVERFLOW}, "
+              f"timeout={cls.DB_POOL_TIMEOUT}s, pgbouncer={cls.DB_PGBOUNCER}")
         print(f"[CONFIG] Production mode: {cls.IS_PRODUCTION}")
+        print(f"[CONFIG] Log level: {cls.LOG_LEVEL}")
         print(f"[CONFIG] Anthropic API configured: {bool(cls.ANTHROPIC_API_KEY)}")
         print(f"[CONFIG] Minimax API configured: {bool(cls.MINIMAX_API_KEY)}")
+        if cls.ANTHROPIC_BASE_URL:
+            print(f"[CONFIG] Anthropic base URL: {cls.ANTHROPIC_BASE_URL}")
+        print(f"[CONFIG] Minimax base URL: {cls.MINIMAX_BASE_URL}")
 
 
 class DevelopmentConfig(Config):
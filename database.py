@@ -1,6 +1,51 @@
 # Database configuration - separate from app to avoid circular imports
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
+from sqlalchemy.engine import make_url
 
 db = SQLAlchemy()
-bcrypt = Bcrypt()
\ No newline at end of file
+bcrypt = Bcrypt()
+
+
+def get_engine_options(database_uri, config):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings
+
+    Args:
+        database_uri: SQLAlchemy database URL
+        config: Config class
+
+    Returns:
+        Dict of create_engine() keyword arguments ({} for in-memory SQLite,
+        which Flask-SQLAlchemy sets up with its own StaticPool)
+    """
+    from observability.pool import InstrumentedQueuePool
+
+    if not database_uri:
+        return {}
+    url = make_url(database_uri)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': config.DB_POOL_SIZE,
+        'max_overflow': config.DB_MAX_OVERFLOW,
+        'pool_timeout': config.DB_POOL_TIMEOUT,
+        'pool_recycle': config.DB_POOL_RECYCLE,
+        'pool_pre_ping': config.DB_POOL_PRE_PING,
+    }
+
+    if url.get_backend_name() == 'postgresql':
+        connect_args = {'connect_timeout': config.DB_CONNECT_TIMEOUT}
+        if config.DB_PGBOUNCER:
+            # Transaction pooling hands each transaction to any server connection:
+            # prepared statements would be missing there, and PgBouncer rejects
+            # unknown startup parameters such as "options"
+            if url.get_driver_name() == 'psycopg':
+                connect_args['prepare_threshold'] = None
+        elif config.DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args['options'] = f'-c statement_timeout={config.DB_STATEMENT_TIMEOUT_MS}'
+        options['connect_args'] = connect_args
+
+    return options
@@ -6,6 +6,9 @@ from typing import Dict, Tuple, Optional, List
 from progress.progress_manager import ProgressManager
 from topics.topic_manager import TopicManager
 from level_rules.level_rules_manager import LevelRulesManager
+from logging_config import get_logger
+
+logger = get_logger('prompts.email')
 
 class EmailPromptBuilder:
     """
@@ -30,39 +33,38 @@ class EmailPromptBuilder:
             Tuple of (prompt_string, context_dict) where context contains user data
         """
         try:
-            print(f"[DEBUG] EmailPromptBuilder: Building prompt for user_id={user_id}")
+            logger.debug("EmailPromptBuilder: Building prompt for user_id=%s", user_id)
 
             # Get user context
             user_context = self._get_user_context(user_id, topic_override)
 
             if not user_context:
-                print(f"[ERROR] EmailPromptBuilder: No user context found for user_id={user_id}")
+                logger.error("EmailPromptBuilder: No user context found for user_id=%s", user_id)
                 return None, None
 
-            print(f"[DEBUG] EmailPromptBuilder: User context retrieved - languages: {user_context['input_language']} to {user_context['target_language']}, level={user_context['level']}")
+            logger.debug("EmailPromptBuilder: User context retrieved - languages: %s to %s, level=%s", user_context['input_language'], user_context['target_language'], user_context['level'])
 
             # Get student name from database
             student_name = None
             try:
-                from models.user import User
-                from database import db
-                user = db.session.query(User).filter_by(id=user_id).first()
+                from progress.identity_cache import get_user
+                user = get_user(user_id)
                 if user:
                     student_name = user.name
-                    print(f"[DEBUG] EmailPromptBuilder: Student name retrieved: {student_name}")
+                    logger.debug("EmailPromptBuilder: Student name retrieved: %s", student_name)
             except Exception as e:
-                print(f"[WARNING] EmailPromptBuilder: Could not retrieve student name: {e}")
+                logger.warning("EmailPromptBuilder: Could not retrieve student name: %s", e)
 
             # Get level rules from database
             level_rules = self.level_rules_manager.get_level_rules(user_context['level'])
-            print(f"[DEBUG] EmailPromptBuilder: Level rules retrieved: {bool(level_rules)}")
+            logger.debug("EmailPromptBuilder: Level rules retrieved: %s", bool(level_rules))
 
             # Get topic-specific parameters from database
             topic_params = self._get_topic_parameters(
                 user_context['level'],
                 user_context['topic_number']
             )
-            print(f"[DEBUG] EmailPromptBuilder: Topic params retrieved: {bool(topic_params)}")
+            logger.debug("EmailPromptBuilder: Topic params retrieved: %s", bool(topic_params))
 
             # Build the letter generation prompt
             generation_prompt = self._build_letter_prompt(
@@ -72,13 +74,11 @@ class EmailPromptBuilder:
                 student_name
             )
 
-            print(f"[DEBUG] EmailPromptBuilder: Prompt built successfully, length={len(generation_prompt) if generation_prompt else 0}")
+            logger.debug("EmailPromptBuilder: Prompt built successfully, length=%s", len(generation_prompt) if generation_prompt else 0)
             return generation_prompt, user_context
 
         except Exception as e:
-            print(f"[ERROR] EmailPromptBuilder: Exception in build_generation_prompt: {e}")
-            import traceback
-            print(f"[ERROR] EmailPromptBuilder: Traceback: {traceback.format_exc()}")
+            logger.exception("EmailPromptBuilder: Exception in build_generation_prompt: %s", e)
             return None, None
 
     def build_evaluation_prompt(self, user_context: Dict, attempt: int,
@@ -118,39 +118,39 @@ class EmailPromptBuilder:
     def _get_user_context(self, user_id: int, topic_override: int = None) -> Optional[Dict]:
         """Get user's language pair, level, and current topic (or use topic override)"""
         try:
-            print(f"[DEBUG] _get_user_context: Getting context for user_id={user_id}")
+            logger.debug("_get_user_context: Getting context for user_id=%s", user_id)
 
             # Check if user_id is valid
             if not user_id:
-                print(f"[ERROR] _get_user_context: Invalid user_id={user_id}")
+                logger.error("_get_user_context: Invalid user_id=%s", user_id)
                 return None
 
             # Get user's current progress
-            print(f"[DEBUG] _get_user_context: Calling progress_manager.get_user_progress({user_id})")
+            logger.debug("_get_user_context: Calling progress_manager.get_user_progress(%s)", user_id)
             user_progress = self.progress_manager.get_user_progress(user_id)
-            print(f"[DEBUG] _get_user_context: Progress result found: {bool(user_progress)}")
+            logger.debug("_get_user_context: Progress result found: %s", bool(user_progress))
 
             if not user_progress:
-                print(f"[WARNING] _get_user_context: No progress found for user {user_id}")
+                logger.warning("_get_user_context: No progress found for user %s", user_id)
                 return None
 
-            print(f"[DEBUG] _get_user_context: Found progress - languages: {user_progress.input_language} to {user_progress.target_language}, level={user_progress.current_level}")
+            logger.debug("_get_user_context: Found progress - languages: %s to %s, level=%s", user_progress.input_language, user_progress.target_language, user_progress.current_level)
 
             # Get topic information - use override if provided
             if topic_override:
-                print(f"[INFO] _get_user_context: Using topic override: Topic {topic_override}")
+                logger.info("_get_user_context: Using topic override: Topic %s", topic_override)
                 topic_info = self.topic_manager.get_topic_definition(
                     user_progress.current_level, topic_override
                 )
             else:
                 # Get current topic information
                 # TopicManager uses user_progress_id, not user_id
-                print(f"[DEBUG] _get_user_context: Calling topic_manager.get_current_topic({user_progress.id})")
+                logger.debug("_get_user_context: Calling topic_manager.get_current_topic(%s)", user_progress.id)
                 topic_info = self.topic_manager.get_current_topic(user_progress.id)
-                print(f"[DEBUG] _get_user_context: Topic info result: {topic_info}")
+                logger.debug("_get_user_context: Topic info result: %s", topic_info)
 
                 if not topic_info:
-                    print(f"[DEBUG] _get_user_context: No current topic found, defaulting to Topic 1")
+                    logger.debug("_get_user_context: No current topic found, defaulting to Topic 1")
                     # Default to Topic 1 if no specific topic
                     topic_info = self.topic_manager.get_topic_definition(
                         user_progress.current_level, 1
@@ -172,13 +172,11 @@ class EmailPromptBuilder:
                 'subtopics': topic_dict.get('subtopics', []) if topic_dict else []
             }
 
-            print(f"[DEBUG] _get_user_context: Context built successfully")
+            logger.debug("_get_user_context: Context built successfully")
             return context
 
         except Exception as e:
-            print(f"[ERROR] _get_user_context: Exception occurred: {e}")
-            import traceback
-            print(f"[ERROR] _get_user_context: Traceback: {traceback.format_exc()}")
+            logger.exception("_get_user_context: Exception occurred: %s", e)
             return None
 
     def _get_topic_parameters(self, level: str, topic_number: int) -> Dict:
@@ -201,7 +199,7 @@ class EmailPromptBuilder:
             }
 
         except Exception as e:
-            print(f"[ERROR] Getting topic parameters: {e}")
+            logger.error("Getting topic parameters: %s", e)
             return {}
 
     def _build_letter_prompt(self, context: Dict, level_rules, topic_params: Dict, student_name: str = None) -> str:
@@ -5,10 +5,15 @@ import re
 import random
 from typing import Dict, Any, Optional, Tuple
 from services.claude_client import ClaudeClient
+from services.llm_scheduler import SchedulerBusyError
 from models.user import User
 from email_writing.email_prompt_builder import EmailPromptBuilder
 from email_writing.email_feedback_builder import EmailFeedbackBuilder
 from email_writing.letter_templates import LetterTemplates
+from logging_config import get_logger
+from observability.timing import timed
+
+logger = get_logger('exercises')
 
 
 class EmailExerciseManager:
@@ -49,12 +54,14 @@ class EmailExerciseManager:
             else:
                 return False, {'error': f'Unknown action: {action}'}
 
+        except SchedulerBusyError:
+            # Surfaced to the route as 429 with Retry-After
+            raise
         except Exception as e:
-            print(f"[ERROR] [EXERCISE MANAGER] Error processing request: {e}")
-            import traceback
-            print(f"[ERROR] [EXERCISE MANAGER] Traceback: {traceback.format_exc()}")
+            logger.exception("Error processing exercise request: %s", e)
             return False, {'error': str(e)}
 
+    @timed('letter_generate')
     def _handle_generate_letter(self, data: dict, user_context: dict,
                                 session_data: dict) -> Tuple[bool, dict]:
         """Generate a letter for the email writing exercise."""
@@ -66,26 +73,25 @@ class EmailExerciseManager:
             if user_id:
                 # Try to get user info from database
                 try:
-                    from database import db
-                    user = db.session.query(User).filter_by(id=user_id).first()
+                    from progress.identity_cache import get_user
+                    user = get_user(user_id)
                     if user:
                         user_name = user.name  # Use real name from database
                 except Exception as e:
-                    print(f"[WARNING] [EXERCISE MANAGER] Could not retrieve user info: {e}")
+                    logger.warning("Could not retrieve user info: %s", e)
 
             # Get topic override from user context if available
             topic_override = user_context.get('topic_override')
             if topic_override:
-                print(f"[INFO] [EXERCISE MANAGER] Using topic override: {topic_override}")
+                logger.info("Using topic override: %s", topic_override)
 
             # Build the generation prompt using the new language-aware builder
-            print(f"[DEBUG] [EXERCISE MANAGER] Building generation prompt for user_id: {user_id}")
+            logger.debug("Building generation prompt for user %s", user_id)
             generation_prompt, context = self.prompt_builder.build_generation_prompt(user_id, topic_override)
-            print(f"[DEBUG] [EXERCISE MANAGER] Got prompt: {bool(generation_prompt)}, context: {bool(context)}")
+            logger.debug("Got prompt: %s, context: %s", bool(generation_prompt), bool(context))
 
             if not generation_prompt or not context:
-                print(f"[ERROR] [EXERCISE MANAGER] Could not build generation prompt for user {user_id}")
-                print(f"[ERROR] [EXERCISE MANAGER] Returning error response")
+                logger.error("Could not build generation prompt for user %s, returning error response", user_id)
                 # Return error response directly - no fallback to German
                 return True, {
                     'letter': 'ERROR - System configuration issue. The dynamic prompt system failed. Please contact support.',
@@ -99,14 +105,17 @@ class EmailExerciseManager:
                     'attempt': 1
                 }
 
-            print(f"[INFO] [EXERCISE MANAGER] Generating letter for {user_name}")
-            print(f"[INFO] [EXERCISE MANAGER] Language: {context['input_language']} -> {context['target_language']}")
-            print(f"[INFO] [EXERCISE MANAGER] Level: {context['level']}, Topic {context['topic_number']}: {context['topic_title']}")
+            logger.info(
+                "Generating letter for %s (%s -> %s, level %s, topic %s: %s)",
+                user_name, context['input_language'], context['target_language'],
+                context['level'], context['topic_number'], context['topic_title']
+            )
 
             # Get Claude to generate the letter
             response = self.claude_client.send_message(
                 user_input="Generate an email writing exercise for me.",
-                system_prompt=generation_prompt
+                system_prompt=generation_prompt,
+                call_type='letter'
             )
 
             # Parse the letter using the letter templates parser
@@ -161,10 +170,14 @@ class EmailExerciseManager:
                 'attempt': 1
             }
 
+        except SchedulerBusyError:
+            # Surfaced to the route as 429 with Retry-After
+            raise
         except Exception as e:
-            print(f"[ERROR] [EXERCISE MANAGER] Error generating letter: {e}")
+            logger.error("Error generating letter: %s", e)
             return False, {'error': f'Failed to generate letter: {str(e)}'}
 
+    @timed('letter_evaluate')
     def _handle_evaluate_response(self, data: dict, user_context: dict,
                                   session_data: dict) -> Tuple[bool, dict]:
         """Evaluate the student's response."""
@@ -177,7 +190,7 @@ class EmailExerciseManager:
             stored_context = session_data.get('user_context') if session_data else None
 
             if not stored_context:
-                print(f"[ERROR] [EXERCISE MANAGER] No stored context for evaluation")
+                logger.error("No stored context for evaluation")
                 # Return error response directly - no fallback
                 return True, {
                     'errors': [],
@@ -201,7 +214,8 @@ class EmailExerciseManager:
                 target_lang = stored_context['target_language'].capitalize()
                 response = self.claude_client.send_message(
                     user_input=f"Evaluate this {target_lang} response and identify errors.",
-                    system_prompt=evaluation_prompt
+                    system_prompt=evaluation_prompt,
+                    call_type='evaluation'
                 )
 
                 # Parse JSON response
@@ -235,7 +249,8 @@ class EmailExerciseManager:
                 target_lang = stored_context['target_language'].capitalize()
                 response = self.claude_client.send_message(
                     user_input=f"Provide comprehensive feedback on this {target_lang} response.",
-                    system_prompt=evaluation_prompt
+                    system_prompt=evaluation_prompt,
+                    call_type='evaluation'
                 )
 
                 # Parse JSON response
@@ -257,8 +272,11 @@ class EmailExerciseManager:
                         'feedback_type': 'comprehensive'  # Required for score saving
                     }
 
+        except SchedulerBusyError:
+            # Surfaced to the route as 429 with Retry-After
+            raise
         except Exception as e:
-            print(f"[ERROR] [EXERCISE MANAGER] Error evaluating response: {e}")
+            logger.error("Error evaluating response: %s", e)
             return False, {'error': f'Failed to evaluate response: {str(e)}'}
 
     def _extract_json_from_response(self, response: str) -> Optional[dict]:
@@ -270,12 +288,12 @@ class EmailExerciseManager:
             json_code_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
             if json_code_match:
                 json_str = json_code_match.group(1).strip()
-                print(f"[DEBUG] [EXERCISE MANAGER] Found JSON in code block")
+                logger.debug("Found JSON in code block")
 
             # Method 2: Try to find JSON object starting with { and ending with }
             elif response.strip().startswith('{') and response.strip().endswith('}'):
                 json_str = response.strip()
-                print(f"[DEBUG] [EXERCISE MANAGER] Using entire response as JSON")
+                logger.debug("Using entire response as JSON")
 
             # Method 3: Look for JSON object in the middle of text
             else:
@@ -285,13 +303,13 @@ class EmailExerciseManager:
 
                 if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
                     json_str = response[start_idx:end_idx + 1]
-                    print(f"[DEBUG] [EXERCISE MANAGER] Extracted JSON from position {start_idx} to {end_idx}")
+                    logger.debug("Extracted JSON from position %d to %d", start_idx, end_idx)
                 else:
-                    print(f"[ERROR] [EXERCISE MANAGER] No valid JSON structure found in response")
+                    logger.error("No valid JSON structure found in response")
                     return None
 
             if not json_str:
-                print(f"[ERROR] [EXERCISE MANAGER] No JSON string extracted")
+                logger.error("No JSON string extracted")
                 return None
 
             # Clean up the JSON string - remove problematic control characters
@@ -300,10 +318,10 @@ class EmailExerciseManager:
             # Try to parse the JSON
             try:
                 result = json.loads(json_str)
-                print(f"[DEBUG] [EXERCISE MANAGER] Successfully parsed JSON")
+                logger.debug("Successfully parsed JSON")
                 return result
             except json.JSONDecodeError as e:
-                print(f"[ERROR] [EXERCISE MANAGER] JSON parsing failed: {e}")
+                logger.warning("JSON parsing failed, trying cleanup: %s", e)
                 # Try to fix common JSON issues
                 # Remove trailing commas
                 json_str = re.sub(r',\s*}', '}', json_str)
@@ -311,13 +329,13 @@ class EmailExerciseManager:
 
                 try:
                     result = json.loads(json_str)
-                    print(f"[DEBUG] [EXERCISE MANAGER] Successfully parsed JSON after cleanup")
+                    logger.debug("Successfully parsed JSON after cleanup")
                     return result
                 except:
-                    print(f"[ERROR] [EXERCISE MANAGER] Could not fix JSON")
+                    logger.error("Could not fix JSON")
                     return None
 
         except Exception as e:
-            print(f"[ERROR] [EXERCISE MANAGER] Unexpected error extracting JSON: {e}")
+            logger.error("Unexpected error extracting JSON: %s", e)
             return None
 
@@ -12,12 +12,18 @@ backlog = 2048
 # Worker processes
 # Using 1 worker for portfolio/demo project with minimal traffic (~10 users/month)
 # Saves significant RAM vs the formula (cpu_count * 2 + 1) which spawns 17+ workers
-workers = 1
-worker_class = 'sync'
+# Scale with WEB_CONCURRENCY / GUNICORN_THREADS; the Claude scheduler's limits
+# (services/llm_scheduler.py) only come into play with more than one of either
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+worker_class = 'sync' if threads == 1 else 'gthread'
 worker_connections = 1000
 timeout = 120
 keepalive = 5
 
+# Load the app once in the master and fork workers from it (see warmup.py)
+preload_app = True
+
 # Logging
 accesslog = '-'
 errorlog = '-'
@@ -38,3 +44,25 @@ tmp_upload_dir = None
 # SSL (if needed)
 keyfile = None
 certfile = None
+
+
+# Server hooks
+def on_starting(server):
+    """Clear per-worker metrics snapshots left over from a previous run (see observability/metrics.py)."""
+    from observability.metrics import clear_snapshots
+    clear_snapshots()
+
+
+def when_ready(server):
+    """Warm the preloaded app in the master so workers inherit it copy-on-write."""
+    if server.cfg.preload_app:
+        from app import app
+        from warmup import warmup
+        warmup(app)
+
+
+def post_worker_init(worker):
+    """Without preload_app each worker loads its own copy; warm it before the first request."""
+    if not worker.cfg.preload_app:
+        from warmup import warmup
+        warmup(worker.wsgi, freeze=False)
@@ -3,15 +3,37 @@
 
 from database import db
 from models.level_rule import LevelRule
+from sqlalchemy.orm import Session
 from typing import Optional, Dict, Any
 
+# Level rules shared by every manager instance in the process. Rows are loaded
+# in a separate session and kept detached so request commits can't expire them.
+_level_rules_cache = {}
+
 class LevelRulesManager:
     """Manages level rules and guidelines for language learning"""
     
     def __init__(self):
         """Initialize the LevelRulesManager"""
         self.db = db
-        self._cache = {}  # Cache level rules to avoid repeated DB queries
+        self._cache = _level_rules_cache  # Cache level rules to avoid repeated DB queries
+
+    @classmethod
+    def load_level_rules(cls) -> int:
+        """
+        Load every level's rules into the shared cache
+
+        Returns:
+            Number of levels loaded
+        """
+        try:
+            with Session(db.engine) as session:
+                rules = session.query(LevelRule).all()
+            _level_rules_cache.update({rule.level.upper(): rule for rule in rules})
+            return len(rules)
+        except Exception as e:
+            print(f"[WARNING] Could not load level rules: {e}")
+            return 0
     
     def get_level_rules(self, level: str) -> Optional[LevelRule]:
         """
@@ -30,7 +52,8 @@ class LevelRulesManager:
             return self._cache[level_upper]
         
         try:
-            rules = LevelRule.query.filter_by(level=level_upper).first()
+            with Session(db.engine) as session:
+                rules = session.query(LevelRule).filter_by(level=level_upper).first()
             if rules:
                 self._cache[level_upper] = rules
             return rules
@@ -136,8 +159,8 @@ class LevelRulesManager:
             return []
     
     def clear_cache(self):
-        """Clear the internal cache"""
-        self._cache = {}
+        """Clear the shared cache"""
+        self._cache.clear()
     
     def format_level_description(self, level: str) -> str:
         """
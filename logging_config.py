@@ -0,0 +1,160 @@
+"""
+Logging configuration for Spralingua.
+Leveled, sampled, non-blocking logging for the request path.
+
+Modules get a category logger with get_logger('claude'), get_logger('minimax')
+etc. and log with %-style arguments so messages are only formatted when a
+record is actually emitted. Records pass through a QueueHandler; a background
+listener thread does the stdout writes, so the sync worker never blocks on them.
+
+Environment (read through Config):
+    LOG_LEVEL: DEBUG/INFO/WARNING/ERROR (default INFO in production, DEBUG otherwise)
+    LOG_SAMPLE_RATES: keep only a fraction of DEBUG records per category,
+        e.g. "claude=0.1,hints=0.05,minimax=0" (categories not listed keep everything)
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+
+from config import Config
+
+ROOT_LOGGER = 'spralingua'
+LOG_FORMAT = '[%(levelname)s] [%(name)s] %(message)s'
+
+_lock = threading.Lock()
+_state = {'configured': False, 'listener': None, 'handler': None}
+
+
+class SamplingFilter(logging.Filter):
+    """Drop a configurable fraction of DEBUG records per logger category"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._resolved = {}
+
+    def _rate_for(self, name):
+        """Longest matching category prefix wins (e.g. 'hints' covers 'hints.parse')"""
+        rate = self._resolved.get(name)
+        if rate is None:
+            category = name[len(ROOT_LOGGER) + 1:] if name.startswith(ROOT_LOGGER + '.') else name
+            rate = 1.0
+            best = -1
+            for prefix, prefix_rate in self.rates.items():
+                if (category == prefix or category.startswith(prefix + '.')) and len(prefix) > best:
+                    rate, best = prefix_rate, len(prefix)
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or not self.rates:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+def parse_sample_rates(spec):
+    """
+    Parse a "category=rate,..." string into a dict
+
+    Args:
+        spec: Sample rate specification (invalid entries are ignored)
+
+    Returns:
+        Dict mapping category to a rate between 0.0 and 1.0
+    """
+    rates = {}
+    for part in (spec or '').split(','):
+        if '=' not in part:
+            continue
+        category, _, value = part.partition('=')
+        try:
+            rates[category.strip()] = min(max(float(value), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+def _start_listener():
+    """Create the queue handler/listener pair and attach it to the root logger"""
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(parse_sample_rates(Config.LOG_SAMPLE_RATES)))
+
+    root = logging.getLogger(ROOT_LOGGER)
+    if _state['handler'] is not None:
+        root.removeHandler(_state['handler'])
+    root.addHandler(handler)
+
+    _state['listener'] = listener
+    _state['handler'] = handler
+
+
+def _restart_listener_after_fork():
+    """The listener thread doesn't survive fork (gunicorn preload); give each worker its own"""
+    global _lock
+    _lock = threading.Lock()
+    if _state['configured']:
+        _start_listener()
+
+
+def configure_logging(level=None):
+    """
+    Configure the 'spralingua' logger tree once per process
+
+    Args:
+        level: Optional level name overriding Config.LOG_LEVEL
+    """
+    with _lock:
+        if _state['configured']:
+            if level:
+                logging.getLogger(ROOT_LOGGER).setLevel(level.upper())
+            return
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel((level or Config.LOG_LEVEL).upper())
+        root.propagate = False
+        _start_listener()
+        _state['configured'] = True
+
+    atexit.register(stop_logging)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    listener = _state.get('listener')
+    if listener is not None:
+        try:
+            listener.stop()
+        except Exception:
+            pass
+        _state['listener'] = None
+
+
+def get_logger(category):
+    """
+    Get the logger for a category (configuring logging on first use)
+
+    Args:
+        category: Short category name such as 'claude', 'minimax' or 'hints'
+
+    Returns:
+        logging.Logger named 'spralingua.<category>'
+    """
+    if not _state['configured']:
+        configure_logging()
+    return logging.getLogger(f'{ROOT_LOGGER}.{category}')
@@ -0,0 +1,5 @@
+# Migrations module for Spralingua
+# Versioned schema changes applied on top of the SQLAlchemy models
+from .migration_runner import MigrationRunner
+
+__all__ = ['MigrationRunner']
@@ -0,0 +1,201 @@
+# Migration Runner for Spralingua
+# Applies versioned schema migrations and records them in schema_migrations
+#
+# Usage:
+#   uv run python migrations/migration_runner.py status
+#   uv run python migrations/migration_runner.py upgrade [--to VERSION]
+#   uv run python migrations/migration_runner.py downgrade --to VERSION
+
+import argparse
+import importlib
+import os
+import pkgutil
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+
+# Allow running as a script (python migrations/migration_runner.py)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+VERSIONS_PACKAGE = 'migrations.versions'
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+class MigrationRunner:
+    """Discovers migration modules and applies them in version order"""
+
+    def __init__(self, engine):
+        """
+        Initialize the MigrationRunner
+
+        Args:
+            engine: SQLAlchemy engine to migrate
+        """
+        self.engine = engine
+
+    def load_migrations(self):
+        """
+        Load all migration modules from migrations/versions
+
+        Each module defines VERSION (int), DESCRIPTION (str),
+        upgrade(connection) and downgrade(connection).
+
+        Returns:
+            List of migration modules sorted by VERSION
+        """
+        package = importlib.import_module(VERSIONS_PACKAGE)
+        migrations = []
+        for module_info in pkgutil.iter_modules(package.__path__):
+            module = importlib.import_module(f"{VERSIONS_PACKAGE}.{module_info.name}")
+            if hasattr(module, 'VERSION'):
+                migrations.append(module)
+
+        migrations.sort(key=lambda m: m.VERSION)
+
+        versions = [m.VERSION for m in migrations]
+        if len(versions) != len(set(versions)):
+            raise ValueError(f"Duplicate migration versions found: {versions}")
+
+        return migrations
+
+    def ensure_version_table(self):
+        """Create the schema_migrations table if it doesn't exist"""
+        _metadata.create_all(self.engine, tables=[schema_migrations], checkfirst=True)
+
+    def get_applied_versions(self):
+        """
+        Get the set of applied migration versions
+
+        Returns:
+            Set of version integers
+        """
+        self.ensure_version_table()
+        with self.engine.connect() as connection:
+            rows = connection.execute(select(schema_migrations.c.version)).all()
+        return {row.version for row in rows}
+
+    def get_pending(self, target=None):
+        """
+        Get migrations not yet applied, optionally up to a target version
+
+        Args:
+            target: Optional highest version to include
+
+        Returns:
+            List of migration modules
+        """
+        applied = self.get_applied_versions()
+        return [
+            m for m in self.load_migrations()
+            if m.VERSION not in applied and (target is None or m.VERSION <= target)
+        ]
+
+    def upgrade(self, target=None):
+        """
+        Apply pending migrations in order, each in its own transaction
+
+        Args:
+            target: Optional highest version to apply
+
+        Returns:
+            List of applied version numbers
+        """
+        applied = []
+        for migration in self.get_pending(target):
+            print(f"[INFO] Applying migration {migration.VERSION}: {migration.DESCRIPTION}")
+            with self.engine.begin() as connection:
+                migration.upgrade(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=migration.VERSION,
+                    description=migration.DESCRIPTION,
+                    applied_at=datetime.utcnow()
+                ))
+            applied.append(migration.VERSION)
+            print(f"[SUCCESS] Migration {migration.VERSION} applied")
+        return applied
+
+    def downgrade(self, target):
+        """
+        Revert applied migrations newer than the target version
+
+        Args:
+            target: Version to downgrade to (0 reverts everything)
+
+        Returns:
+            List of reverted version numbers
+        """
+        applied_versions = self.get_applied_versions()
+        to_revert = [
+            m for m in reversed(self.load_migrations())
+            if m.VERSION in applied_versions and m.VERSION > target
+        ]
+
+        reverted = []
+        for migration in to_revert:
+            print(f"[INFO] Reverting migration {migration.VERSION}: {migration.DESCRIPTION}")
+            with self.engine.begin() as connection:
+                migration.downgrade(connection)
+                connection.execute(schema_migrations.delete().where(
+                    schema_migrations.c.version == migration.VERSION
+                ))
+            reverted.append(migration.VERSION)
+            print(f"[SUCCESS] Migration {migration.VERSION} reverted")
+        return reverted
+
+    def status(self):
+        """
+        Get the status of every known migration
+
+        Returns:
+            List of dicts with version, description and applied flag
+        """
+        applied = self.get_applied_versions()
+        return [
+            {
+                'version': m.VERSION,
+                'description': m.DESCRIPTION,
+                'applied': m.VERSION in applied
+            }
+            for m in self.load_migrations()
+        ]
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description='Spralingua schema migrations')
+    parser.add_argument('command', choices=['status', 'upgrade', 'downgrade'])
+    parser.add_argument('--to', type=int, default=None, help='Target migration version')
+    args = parser.parse_args()
+
+    from app import app
+    from database import db
+
+    with app.app_context():
+        runner = MigrationRunner(db.engine)
+
+        if args.command == 'status':
+            for item in runner.status():
+                marker = '[APPLIED]' if item['applied'] else '[PENDING]'
+                print(f"{marker} {item['version']:04d} {item['description']}")
+        elif args.command == 'upgrade':
+            applied = runner.upgrade(args.to)
+            if not applied:
+                print("[INFO] Database is up to date")
+        else:
+            if args.to is None:
+                parser.error('downgrade requires --to VERSION')
+            runner.downgrade(args.to)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Versioned migrations - one module per schema change, named vNNNN_description.py
@@ -0,0 +1,57 @@
+# Migration 0001: composite indexes for progress access paths
+#
+# The per-topic and per-exercise lookups are already served by the unique
+# constraints _user_level_topic_uc and _user_level_topic_exercise_uc. This adds
+# indexes for the two hot paths that were falling back to scans:
+#   - TopicManager.check_completion_popup_needed filters topic_progress by
+#     (user_progress_id, completed, has_seen_completion_popup) ordered by topic_number
+#   - ProgressManager.get_user_progress filters user_progress by user_id
+#     ordered by last_accessed
+
+from sqlalchemy import Boolean, Column, DateTime, Index, Integer, MetaData, Table
+
+VERSION = 1
+DESCRIPTION = 'Composite indexes for progress access paths'
+
+_metadata = MetaData()
+
+_topic_progress = Table(
+    'topic_progress', _metadata,
+    Column('user_progress_id', Integer),
+    Column('completed', Boolean),
+    Column('has_seen_completion_popup', Boolean),
+    Column('topic_number', Integer)
+)
+
+_user_progress = Table(
+    'user_progress', _metadata,
+    Column('user_id', Integer),
+    Column('last_accessed', DateTime)
+)
+
+INDEXES = [
+    Index(
+        'ix_topic_progress_popup_lookup',
+        _topic_progress.c.user_progress_id,
+        _topic_progress.c.completed,
+        _topic_progress.c.has_seen_completion_popup,
+        _topic_progress.c.topic_number
+    ),
+    Index(
+        'ix_user_progress_user_last_accessed',
+        _user_progress.c.user_id,
+        _user_progress.c.last_accessed
+    ),
+]
+
+
+def upgrade(connection):
+    """Create the indexes (no-op for databases built with db.create_all())"""
+    for index in INDEXES:
+        index.create(bind=connection, checkfirst=True)
+
+
+def downgrade(connection):
+    """Drop the indexes"""
+    for index in INDEXES:
+        index.drop(bind=connection, checkfirst=True)
@@ -0,0 +1,39 @@
+# Migration 0002: per-user daily spend ledger
+#
+# usage_ledger holds one row per user and UTC day with the Claude input/output
+# tokens and Minimax TTS characters spent on their requests. It backs the daily
+# budgets enforced by services/spend_ledger.py.
+
+from sqlalchemy import (BigInteger, Column, Date, DateTime, ForeignKey, Integer, MetaData, Table,
+                        UniqueConstraint)
+
+VERSION = 2
+DESCRIPTION = 'Per-user daily spend ledger'
+
+_metadata = MetaData()
+
+# Referenced by the foreign key only; never created here
+Table('users', _metadata, Column('id', Integer, primary_key=True))
+
+usage_ledger = Table(
+    'usage_ledger', _metadata,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+    Column('day', Date, nullable=False),
+    Column('input_tokens', BigInteger, nullable=False, default=0),
+    Column('output_tokens', BigInteger, nullable=False, default=0),
+    Column('tts_characters', BigInteger, nullable=False, default=0),
+    Column('requests', Integer, nullable=False, default=0),
+    Column('updated_at', DateTime, nullable=False),
+    UniqueConstraint('user_id', 'day', name='_user_day_uc')
+)
+
+
+def upgrade(connection):
+    """Create the table (no-op for databases built with db.create_all())"""
+    usage_ledger.create(bind=connection, checkfirst=True)
+
+
+def downgrade(connection):
+    """Drop the table"""
+    usage_ledger.drop(bind=connection, checkfirst=True)
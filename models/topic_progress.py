@@ -19,8 +19,11 @@ class TopicProgress(db.Model):
     user_progress = db.relationship('UserProgress', backref=db.backref('topic_records', lazy='dynamic', cascade='all, delete-orphan'))
 
     # Unique constraint for user progress + level + topic number
+    # Popup lookup index (see migrations/versions/v0001_progress_indexes.py)
     __table_args__ = (
         db.UniqueConstraint('user_progress_id', 'level', 'topic_number', name='_user_level_topic_uc'),
+        db.Index('ix_topic_progress_popup_lookup', 'user_progress_id', 'completed',
+                 'has_seen_completion_popup', 'topic_number'),
     )
     
     def __init__(self, user_progress_id, level, topic_number, total_exercises):
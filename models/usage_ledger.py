@@ -0,0 +1,35 @@
+from datetime import datetime
+from database import db
+
+class UsageLedger(db.Model):
+    """Model for a user's provider spend per day (Claude tokens, TTS characters)"""
+    __tablename__ = 'usage_ledger'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # UTC day
+    input_tokens = db.Column(db.BigInteger, default=0, nullable=False)
+    output_tokens = db.Column(db.BigInteger, default=0, nullable=False)
+    tts_characters = db.Column(db.BigInteger, default=0, nullable=False)
+    requests = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    # One row per user and day (see migrations/versions/v0002_usage_ledger.py)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='_user_day_uc'),
+    )
+
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization"""
+        return {
+            'user_id': self.user_id,
+            'day': self.day.isoformat() if self.day else None,
+            'input_tokens': self.input_tokens,
+            'output_tokens': self.output_tokens,
+            'tts_characters': self.tts_characters,
+            'requests': self.requests,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<UsageLedger user={self.user_id} day={self.day} tokens={self.input_tokens}+{self.output_tokens} tts={self.tts_characters}>'
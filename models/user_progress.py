@@ -19,8 +19,10 @@ class UserProgress(db.Model):
     user = db.relationship('User', backref=db.backref('progress_records', lazy='dynamic', cascade='all, delete-orphan'))
     
     # Unique constraint for user + language pair
+    # Most-recent lookup index (see migrations/versions/v0001_progress_indexes.py)
     __table_args__ = (
         db.UniqueConstraint('user_id', 'input_language', 'target_language', name='_user_language_pair_uc'),
+        db.Index('ix_user_progress_user_last_accessed', 'user_id', 'last_accessed'),
     )
     
     def __init__(self, user_id, input_language, target_language, current_level):
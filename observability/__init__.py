@@ -0,0 +1,12 @@
+# Observability module for Spralingua
+# Request timing, Prometheus metrics and related diagnostics
+
+from .timing import span, timed, record_span, get_request_spans, get_stage_histograms
+from .metrics import registry, record_cache, render_prometheus
+from .queries import get_query_stats, check_request_queries, QueryBudgetExceeded
+
+__all__ = [
+    'span', 'timed', 'record_span', 'get_request_spans', 'get_stage_histograms',
+    'registry', 'record_cache', 'render_prometheus',
+    'get_query_stats', 'check_request_queries', 'QueryBudgetExceeded'
+]
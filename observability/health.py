@@ -0,0 +1,131 @@
+# Health and Readiness Probes for Spralingua
+# Dependency round-trip checks behind /healthz and /readyz (routes/ops.py)
+#
+# /healthz only says the process is serving. /readyz additionally requires
+# warm-up to have finished and the database to answer within
+# READINESS_DB_MAX_MS. With READINESS_PROBE_PROVIDERS on, the Claude and
+# Minimax endpoints are probed too; their results are cached for
+# READINESS_PROVIDER_TTL seconds so frequent load balancer polls don't turn
+# into a stream of outbound requests. Provider trouble only fails readiness
+# when READINESS_REQUIRE_PROVIDERS is set, since an outage at a provider
+# would otherwise take every instance out of rotation at once.
+
+import threading
+import time
+
+import requests
+from sqlalchemy import text
+
+from config import Config
+from observability.metrics import READINESS_PROBE_DURATION
+from observability.pool import get_pool_status
+
+DEFAULT_ANTHROPIC_URL = 'https://api.anthropic.com'
+
+_provider_cache = {}
+_provider_lock = threading.Lock()
+
+
+def _result(name, ok, started, detail=None, threshold_ms=None):
+    """Build one probe result and record its latency"""
+    seconds = time.perf_counter() - started
+    READINESS_PROBE_DURATION.observe(seconds, dependency=name)
+    latency_ms = round(seconds * 1000, 1)
+    status = 'ok' if ok else 'fail'
+    if ok and threshold_ms is not None and latency_ms > threshold_ms:
+        status = 'slow'
+    result = {'status': status, 'latency_ms': latency_ms}
+    if detail:
+        result['detail'] = detail
+    return result
+
+
+def probe_database():
+    """
+    Round-trip a trivial statement through the connection pool
+
+    Returns:
+        Dict with 'status' (ok/slow/fail), 'latency_ms', the worker's pool
+        state ('pool', see observability/pool.py) and optional 'detail'
+    """
+    from database import db
+
+    started = time.perf_counter()
+    try:
+        db.session.execute(text('SELECT 1'))
+        db.session.rollback()
+        result = _result('database', True, started, threshold_ms=Config.READINESS_DB_MAX_MS)
+        result['pool'] = get_pool_status(db.engine)
+        return result
+    except Exception as e:
+        db.session.rollback()
+        return _result('database', False, started, detail=str(e).splitlines()[0][:200])
+
+
+def probe_http(name, url):
+    """
+    Measure the round trip to a provider endpoint
+
+    Any HTTP response counts as reachable; only connection errors and
+    timeouts fail. The connection also primes DNS and TLS session caches.
+
+    Args:
+        name: Dependency name used in the report and metrics
+        url: Base URL to request
+
+    Returns:
+        Dict with 'status', 'latency_ms' and optional 'detail'
+    """
+    started = time.perf_counter()
+    try:
+        response = requests.head(url, timeout=Config.READINESS_PROVIDER_TIMEOUT, allow_redirects=False)
+        return _result(name, True, started, detail=f'HTTP {response.status_code}',
+                       threshold_ms=Config.READINESS_PROVIDER_MAX_MS)
+    except requests.RequestException as e:
+        return _result(name, False, started, detail=type(e).__name__)
+
+
+def probe_providers():
+    """
+    Probe Claude and Minimax, reusing results younger than READINESS_PROVIDER_TTL
+
+    Returns:
+        Dict of provider name -> probe result (with 'age_s')
+    """
+    targets = {
+        'claude': Config.ANTHROPIC_BASE_URL or DEFAULT_ANTHROPIC_URL,
+        'minimax': Config.MINIMAX_BASE_URL,
+    }
+    now = time.monotonic()
+    results = {}
+    with _provider_lock:
+        for name, url in targets.items():
+            cached = _provider_cache.get(name)
+            if cached is None or now - cached[0] > Config.READINESS_PROVIDER_TTL:
+                cached = (time.monotonic(), probe_http(name, url))
+                _provider_cache[name] = cached
+            results[name] = dict(cached[1], age_s=round(time.monotonic() - cached[0], 1))
+    return results
+
+
+def check_readiness(warm):
+    """
+    Evaluate readiness for /readyz
+
+    Args:
+        warm: Whether warm-up has finished in this process
+
+    Returns:
+        Tuple of (ready, report dict)
+    """
+    checks = {'warmup': {'status': 'ok' if warm else 'fail'}}
+    checks['database'] = probe_database()
+    ready = warm and checks['database']['status'] == 'ok'
+
+    if Config.READINESS_PROBE_PROVIDERS:
+        providers = probe_providers()
+        checks.update(providers)
+        if Config.READINESS_REQUIRE_PROVIDERS:
+            ready = ready and all(result['status'] == 'ok' for result in providers.values())
+
+    return ready, {'status': 'ready' if ready else 'not_ready', 'checks': checks}
@@ -0,0 +1,356 @@
+# Metrics Registry for Spralingua
+# Counters and histograms rendered in the Prometheus text exposition format
+#
+# Each worker process keeps its own in-memory registry. When METRICS_DIR is
+# set, workers periodically write a JSON snapshot of their registry to
+# <METRICS_DIR>/metrics_<pid>_<boot id>.json and /metrics sums every snapshot,
+# so a scrape answered by any gunicorn worker reports totals for all of them.
+# Snapshots of exited workers are kept so counters never go backwards; the
+# random boot id stops a restarted worker that reuses a PID from overwriting
+# its predecessor's file. The directory is cleared when the server starts
+# (gunicorn's on_starting hook, or app.py for the dev server).
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from config import Config
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+METRIC_PREFIX = 'spralingua_'
+
+
+def _label_key(labels):
+    """Labels as a hashable, order-independent key"""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Thread-safe store of counter values and histogram buckets"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.definitions = {}   # name -> (type, help, buckets)
+        self.counters = {}      # (name, label_key) -> value
+        self.histograms = {}    # (name, label_key) -> [bucket counts..., sum, count]
+
+    def define(self, name, metric_type, help_text, buckets=None):
+        self.definitions[name] = (metric_type, help_text, buckets)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        buckets = self.definitions[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            state = self.histograms.get(key)
+            if state is None:
+                state = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(buckets)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def to_snapshot(self):
+        """JSON-serialisable copy of the current values"""
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(state)] for (name, labels), state in self.histograms.items()]
+            }
+
+
+class Counter:
+    """Handle for a registered counter"""
+
+    def __init__(self, registry, name, help_text):
+        self.registry = registry
+        self.name = METRIC_PREFIX + name
+        registry.define(self.name, 'counter', help_text)
+
+    def inc(self, amount=1, **labels):
+        self.registry.inc(self.name, amount, **labels)
+
+
+class Histogram:
+    """Handle for a registered histogram"""
+
+    def __init__(self, registry, name, help_text, buckets=LATENCY_BUCKETS):
+        self.registry = registry
+        self.name = METRIC_PREFIX + name
+        self.buckets = buckets
+        registry.define(self.name, 'histogram', help_text, buckets)
+
+    def observe(self, value, **labels):
+        self.registry.observe(self.name, value, **labels)
+
+
+registry = MetricsRegistry()
+
+# Requests
+HTTP_REQUESTS = Counter(registry, 'http_requests_total', 'HTTP requests by route and status')
+HTTP_DURATION = Histogram(registry, 'http_request_duration_seconds', 'HTTP request latency by route')
+HTTP_QUEUE = Histogram(registry, 'http_request_queue_seconds', 'Time between the proxy receiving a request (X-Request-Start) and the app handling it')
+RATE_LIMITED = Counter(registry, 'rate_limited_total', 'Requests refused by limit name and scope (user/ip/budget)')
+STAGE_DURATION = Histogram(registry, 'stage_duration_seconds', 'Latency of instrumented request stages (see Server-Timing)')
+DB_QUERIES = Counter(registry, 'db_queries_total', 'SQL statements executed by route')
+DB_QUERIES_PER_REQUEST = Histogram(registry, 'db_queries_per_request', 'SQL statements per request by route', COUNT_BUCKETS)
+DB_REPEATED_STATEMENTS = Counter(registry, 'db_repeated_statements_total', 'Statements repeated within one request (likely N+1) by route')
+DB_QUERY_BUDGET_EXCEEDED = Counter(registry, 'db_query_budget_exceeded_total', 'Requests over their route query budget')
+DB_POOL_CHECKOUTS = Counter(registry, 'db_pool_checkouts_total', 'Connections checked out of the SQLAlchemy pool')
+DB_POOL_CHECKOUT_WAIT = Histogram(registry, 'db_pool_checkout_wait_seconds', 'Time to obtain a pooled connection (queue wait or new connection)')
+DB_POOL_OVERFLOW = Counter(registry, 'db_pool_overflow_total', 'Connections opened beyond DB_POOL_SIZE')
+DB_POOL_TIMEOUTS = Counter(registry, 'db_pool_timeouts_total', 'Checkouts that gave up after DB_POOL_TIMEOUT')
+
+# Providers
+CLAUDE_REQUESTS = Counter(registry, 'claude_requests_total', 'Claude API calls by call type and outcome')
+CLAUDE_DURATION = Histogram(registry, 'claude_request_duration_seconds', 'Claude API latency by call type')
+CLAUDE_TOKENS = Counter(registry, 'claude_tokens_total', 'Claude tokens by call type and kind (input/output/cache_read/cache_creation)')
+CLAUDE_ADMISSIONS = Counter(registry, 'claude_admissions_total', 'Claude call admission by call type and result (admitted/queue_full/queue_timeout)')
+CLAUDE_QUEUE_WAIT = Histogram(registry, 'claude_queue_wait_seconds', 'Time Claude calls waited for a scheduler slot by call type')
+MINIMAX_REQUESTS = Counter(registry, 'minimax_requests_total', 'Minimax TTS calls by outcome')
+MINIMAX_DURATION = Histogram(registry, 'minimax_request_duration_seconds', 'Minimax TTS latency')
+MINIMAX_AUDIO_BYTES = Counter(registry, 'minimax_audio_bytes_total', 'Decoded audio bytes returned by Minimax')
+PROVIDER_RETRIES = Counter(registry, 'provider_retries_total', 'Provider retries by provider and result (retried/budget_exhausted)')
+PROVIDER_CIRCUIT = Counter(registry, 'provider_circuit_events_total', 'Circuit breaker transitions (open/half_open/closed) and rejected calls by provider')
+PROVIDER_HEDGES = Counter(registry, 'provider_hedges_total', 'Hedged requests by provider and result (launched/won)')
+SINGLE_FLIGHT_CALLS = Counter(registry, 'single_flight_calls_total', 'Deduplicated provider calls by flight and role (leader/follower/remote_follower)')
+REPLY_AUDIO = Counter(registry, 'reply_audio_total', 'Server-initiated chat reply audio by outcome (started/skipped/fetched/expired)')
+READINESS_PROBE_DURATION = Histogram(registry, 'readiness_probe_duration_seconds', 'Round-trip latency of /readyz dependency probes')
+
+# Caches (hit ratio = hits / (hits + misses), also rendered as a gauge)
+CACHE_REQUESTS = Counter(registry, 'cache_requests_total', 'Cache lookups by cache and result (hit/miss)')
+
+# Casual chat hints (share served locally also rendered as a gauge)
+HINTS = Counter(registry, 'hints_total', 'Casual chat hints by source (prescreen/cache/claude) and pre-screen')
+
+_flush_state = {'last': 0.0, 'boot': uuid.uuid4().hex[:12]}
+
+
+def _reset_after_fork():
+    """Workers forked from a preloaded master start from zero, not the master's counts"""
+    registry.reset()
+    _flush_state['last'] = 0.0
+    _flush_state['boot'] = uuid.uuid4().hex[:12]
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def record_cache(cache, hit):
+    """Count one lookup against a named cache"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def _snapshot_path():
+    return os.path.join(Config.METRICS_DIR, f"metrics_{os.getpid()}_{_flush_state['boot']}.json")
+
+
+def flush(force=False):
+    """
+    Write this worker's snapshot to METRICS_DIR (throttled to METRICS_FLUSH_INTERVAL)
+
+    Args:
+        force: Write even if the last flush was recent
+    """
+    if not Config.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _flush_state['last'] < Config.METRICS_FLUSH_INTERVAL:
+        return
+    _flush_state['last'] = now
+
+    try:
+        os.makedirs(Config.METRICS_DIR, exist_ok=True)
+        path = _snapshot_path()
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(registry.to_snapshot(), f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+atexit.register(flush, force=True)
+
+
+def clear_snapshots():
+    """Remove snapshots left in METRICS_DIR by a previous run (call before workers start)"""
+    if not Config.METRICS_DIR or not os.path.isdir(Config.METRICS_DIR):
+        return
+    for path in glob.glob(os.path.join(Config.METRICS_DIR, 'metrics_*.json')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def parse_request_start(header_value, now=None):
+    """
+    Convert an X-Request-Start header (t=<epoch s|ms|us>) into queueing seconds
+
+    Args:
+        header_value: Raw header value
+        now: Current epoch seconds (defaults to time.time())
+
+    Returns:
+        Seconds spent before the app saw the request, or None if unusable
+    """
+    try:
+        started = float(header_value.strip().removeprefix('t='))
+    except (AttributeError, ValueError):
+        return None
+    if started > 1e14:
+        started /= 1e6
+    elif started > 1e11:
+        started /= 1e3
+    waited = (now or time.time()) - started
+    return waited if 0 <= waited < 3600 else None
+
+
+def _collect():
+    """Sum this process's live values with every other worker's snapshot"""
+    counters = {}
+    histograms = {}
+
+    def merge(snapshot):
+        for name, labels, value in snapshot.get('counters', []):
+            key = (name, tuple(tuple(l) for l in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, state in snapshot.get('histograms', []):
+            key = (name, tuple(tuple(l) for l in labels))
+            if key in histograms:
+                histograms[key] = [a + b for a, b in zip(histograms[key], state)]
+            else:
+                histograms[key] = list(state)
+
+    merge(registry.to_snapshot())
+
+    if Config.METRICS_DIR:
+        own_path = _snapshot_path()
+        for path in glob.glob(os.path.join(Config.METRICS_DIR, 'metrics_*.json')):
+            if path == own_path:
+                continue
+            try:
+                with open(path) as f:
+                    merge(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+    return counters, histograms
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + list(extra or [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+def render_prometheus():
+    """
+    Render all metrics in the Prometheus text exposition format (version 0.0.4)
+
+    Returns:
+        Exposition text
+    """
+    counters, histograms = _collect()
+    lines = []
+
+    for name, (metric_type, help_text, buckets) in registry.definitions.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+
+        if metric_type == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+        else:
+            for (metric, labels), state in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ['+Inf'], state[:len(buckets) + 1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {state[-2]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {state[-1]}')
+
+    # Derived hit ratio per cache
+    ratio_name = METRIC_PREFIX + 'cache_hit_ratio'
+    totals = {}
+    for (metric, labels), value in counters.items():
+        if metric == CACHE_REQUESTS.name:
+            label_map = dict(labels)
+            hits, total = totals.get(label_map.get('cache'), (0, 0))
+            totals[label_map.get('cache')] = (
+                hits + (value if label_map.get('result') == 'hit' else 0), total + value
+            )
+    lines.append(f'# HELP {ratio_name} Cache hits / lookups since the workers started')
+    lines.append(f'# TYPE {ratio_name} gauge')
+    for cache, (hits, total) in sorted(totals.items()):
+        if total:
+            lines.append(f'{ratio_name}{_format_labels([("cache", cache)])} {hits / total:.6f}')
+
+    # Derived share of hints served without a Claude call
+    local_name = METRIC_PREFIX + 'hints_local_ratio'
+    local, total = 0, 0
+    for (metric, labels), value in counters.items():
+        if metric == HINTS.name:
+            total += value
+            local += value if dict(labels).get('source') != 'claude' else 0
+    lines.append(f'# HELP {local_name} Hints served by pre-screens or the hint cache / all hints since the workers started')
+    lines.append(f'# TYPE {local_name} gauge')
+    if total:
+        lines.append(f'{local_name} {local / total:.6f}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def get_histogram(histogram, label=None):
+    """
+    Get this process's buckets for one histogram, keyed by a single label
+
+    Args:
+        histogram: Histogram handle
+        label: Label whose value keys the result (e.g. 'stage')
+
+    Returns:
+        Dict of label value -> {'buckets', 'count', 'sum'}
+    """
+    bounds = [str(b) for b in histogram.buckets] + ['+Inf']
+    result = {}
+    for metric, labels, state in registry.to_snapshot()['histograms']:
+        if metric != histogram.name:
+            continue
+        key = dict(tuple(l) for l in labels).get(label) if label else ''
+        result[key] = {
+            'buckets': dict(zip(bounds, state[:len(bounds)])),
+            'count': state[-1],
+            'sum': state[-2]
+        }
+    return result
@@ -0,0 +1,68 @@
+# Connection Pool Instrumentation for Spralingua
+# Checkout wait, overflow and timeout metrics for the SQLAlchemy pool
+#
+# database.get_engine_options() installs InstrumentedQueuePool as the engine's
+# poolclass. Every checkout is counted and the time spent obtaining a
+# connection (waiting on the queue, or opening a new one) is observed in
+# db_pool_checkout_wait_seconds. Waits above POOL_WAIT_SPAN_THRESHOLD also show
+# up as a 'db_pool' stage in Server-Timing, so a request that queued for a
+# connection is visible next to its 'db' time. Connections opened beyond
+# DB_POOL_SIZE count as overflow; checkouts that hit DB_POOL_TIMEOUT count as
+# timeouts. Size the pool so overflow is rare and timeouts never happen.
+
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from observability.metrics import (
+    DB_POOL_CHECKOUTS, DB_POOL_CHECKOUT_WAIT, DB_POOL_OVERFLOW, DB_POOL_TIMEOUTS
+)
+from observability.timing import record_span
+
+# Shorter waits (a connection was idle in the queue) stay out of Server-Timing
+POOL_WAIT_SPAN_THRESHOLD = 0.001
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkout waits, overflow and timeouts"""
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        waited = time.perf_counter() - started
+
+        DB_POOL_CHECKOUTS.inc()
+        DB_POOL_CHECKOUT_WAIT.observe(waited)
+        if self._overflow > overflow_before and self._overflow > 0:
+            DB_POOL_OVERFLOW.inc()
+        if waited >= POOL_WAIT_SPAN_THRESHOLD:
+            record_span('db_pool', waited)
+        return connection
+
+
+def get_pool_status(engine):
+    """
+    Current state of an engine's pool in this worker
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        Dict with 'size', 'checked_out', 'idle' and 'overflow' (QueuePool),
+        or just 'pool' (the class name) for other pool types
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {'pool': type(pool).__name__}
+    return {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+    }
@@ -0,0 +1,318 @@
+# Sampling Profiler for Spralingua
+# Opt-in statistical profiling of individual requests, stored as collapsed stacks
+#
+# A profiled request registers its thread with a background sampler that reads
+# the thread's current frame every PROFILER_INTERVAL_MS via sys._current_frames().
+# Stacks are counted as "outer;...;inner" strings (the collapsed/folded format
+# used by flamegraph.pl and speedscope) and written to
+# <PROFILER_DIR>/<route>/<time>-<pid>-<n>.folded when the request finishes.
+#
+# A request is profiled when either:
+#   - PROFILER_ENABLED is on and it falls in the PROFILER_SAMPLE_RATE fraction, or
+#   - it carries a valid signed X-Profile header (see sign_profile_header), which
+#     works without enabling sampling, so a slow route can be investigated live.
+# /ops/profiles (routes/ops.py) merges the files per route into one flamegraph.
+
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+from config import Config
+from logging_config import get_logger
+
+logger = get_logger('profiler')
+
+PROFILE_HEADER = 'X-Profile'
+MAX_STACK_DEPTH = 128
+
+_lock = threading.Lock()
+_sessions = {}          # thread ident -> ProfileSession
+_sampler = {'thread': None, 'wake': threading.Event()}
+_counter = itertools.count(1)
+
+
+class ProfileSession:
+    """Samples collected for one request thread"""
+
+    def __init__(self, route, reason):
+        self.route = route
+        self.reason = reason
+        self.started = time.time()
+        self.stacks = {}
+        self.samples = 0
+
+    def add(self, frame):
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+            frame = frame.f_back
+        stack = ';'.join(reversed(names))
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+
+def _sample_loop():
+    """Background thread: sample every registered request thread until none remain"""
+    interval = max(Config.PROFILER_INTERVAL_MS, 1) / 1000.0
+    while True:
+        with _lock:
+            if not _sessions:
+                _sampler['thread'] = None
+                return
+            frames = sys._current_frames()
+            for ident, session in _sessions.items():
+                frame = frames.get(ident)
+                if frame is not None:
+                    session.add(frame)
+        del frames
+        time.sleep(interval)
+
+
+def _reset_after_fork():
+    """The sampler thread doesn't survive fork; workers start with no sessions"""
+    global _lock
+    _lock = threading.Lock()
+    _sessions.clear()
+    _sampler['thread'] = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def sign_profile_header(ttl_seconds=3600, secret=None):
+    """
+    Create a value for the X-Profile request header
+
+    Args:
+        ttl_seconds: How long the signature stays valid
+        secret: Signing key (defaults to PROFILER_TOKEN)
+
+    Returns:
+        "<expires>.<signature>" string
+    """
+    expires = int(time.time() + ttl_seconds)
+    key = (secret or Config.PROFILER_TOKEN or '').encode()
+    signature = hmac.new(key, str(expires).encode(), hashlib.sha256).hexdigest()
+    return f'{expires}.{signature}'
+
+
+def verify_profile_header(value):
+    """Check an X-Profile header value against PROFILER_TOKEN"""
+    if not value or not Config.PROFILER_TOKEN:
+        return False
+    expires, _, signature = value.strip().partition('.')
+    try:
+        if int(expires) < time.time():
+            return False
+    except ValueError:
+        return False
+    expected = hmac.new(Config.PROFILER_TOKEN.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature, expected)
+
+
+def maybe_start_profile():
+    """Start profiling the current request if it is sampled or explicitly requested"""
+    if verify_profile_header(request.headers.get(PROFILE_HEADER)):
+        reason = 'header'
+    elif Config.PROFILER_ENABLED and random.random() < Config.PROFILER_SAMPLE_RATE:
+        reason = 'sampled'
+    else:
+        return
+
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    session = ProfileSession(route, reason)
+    g.profile_session = session
+
+    with _lock:
+        _sessions[threading.get_ident()] = session
+        if _sampler['thread'] is None:
+            _sampler['thread'] = threading.Thread(target=_sample_loop, name='profiler-sampler', daemon=True)
+            _sampler['thread'].start()
+
+
+def finish_profile():
+    """
+    Stop profiling the current request and write its stacks
+
+    Returns:
+        Profile id ("<route dir>/<file name>") or None if nothing was recorded
+    """
+    if not has_request_context():
+        return None
+    session = g.pop('profile_session', None)
+    if session is None:
+        return None
+
+    with _lock:
+        _sessions.pop(threading.get_ident(), None)
+
+    if not session.samples:
+        return None
+    try:
+        return _write_session(session)
+    except OSError as e:
+        logger.warning("Could not write profile for %s: %s", session.route, e)
+        return None
+
+
+def route_dirname(route):
+    """Filesystem-safe directory name for a route rule"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', route.strip('/')) or 'root'
+
+
+def _write_session(session):
+    directory = os.path.join(Config.PROFILER_DIR, route_dirname(session.route))
+    os.makedirs(directory, exist_ok=True)
+    name = f'{int(session.started * 1000)}-{os.getpid()}-{next(_counter)}.folded'
+    path = os.path.join(directory, name)
+
+    with open(f'{path}.tmp', 'w') as f:
+        f.write(f'# route={session.route} reason={session.reason} samples={session.samples} '
+                f'interval_ms={Config.PROFILER_INTERVAL_MS} duration_ms={(time.time() - session.started) * 1000:.1f}\n')
+        for stack, count in sorted(session.stacks.items()):
+            f.write(f'{stack} {count}\n')
+    os.replace(f'{path}.tmp', path)
+
+    _prune(directory)
+    logger.info("Profiled %s (%s): %d samples -> %s", session.route, session.reason, session.samples, path)
+    return f'{os.path.basename(directory)}/{name}'
+
+
+def _prune(directory):
+    """Keep only the newest PROFILER_MAX_FILES profiles per route"""
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.folded'))
+    for name in files[:max(len(files) - Config.PROFILER_MAX_FILES, 0)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def list_profiles():
+    """
+    Summarise stored profiles
+
+    Returns:
+        Dict of route -> {'profiles', 'samples', 'latest'}
+    """
+    summary = {}
+    if not os.path.isdir(Config.PROFILER_DIR):
+        return summary
+    for dirname in sorted(os.listdir(Config.PROFILER_DIR)):
+        directory = os.path.join(Config.PROFILER_DIR, dirname)
+        files = sorted(name for name in os.listdir(directory) if name.endswith('.folded')) \
+            if os.path.isdir(directory) else []
+        if not files:
+            continue
+        route, samples = dirname, 0
+        for name in files:
+            header = _read_header(os.path.join(directory, name))
+            route = header.get('route', route)
+            samples += int(header.get('samples', 0))
+        summary[route] = {
+            'profiles': len(files),
+            'samples': samples,
+            'latest': int(files[-1].split('-')[0]) / 1000.0
+        }
+    return summary
+
+
+def _read_header(path):
+    try:
+        with open(path) as f:
+            first = f.readline()
+    except OSError:
+        return {}
+    if not first.startswith('#'):
+        return {}
+    return dict(part.split('=', 1) for part in first[1:].split() if '=' in part)
+
+
+def aggregate_stacks(route, limit=None):
+    """
+    Merge the stored profiles of one route
+
+    Args:
+        route: URL rule, e.g. '/api/casual-chat/chat'
+        limit: Only use the newest `limit` profiles
+
+    Returns:
+        Tuple of (dict of collapsed stack -> samples, number of profiles used)
+    """
+    directory = os.path.join(Config.PROFILER_DIR, route_dirname(route))
+    if not os.path.isdir(directory):
+        return {}, 0
+    files = sorted(name for name in os.listdir(directory) if name.endswith('.folded'))
+    if limit:
+        files = files[-limit:]
+
+    stacks = {}
+    for name in files:
+        try:
+            with open(os.path.join(directory, name)) as f:
+                for line in f:
+                    if line.startswith('#'):
+                        continue
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if stack and count.isdigit():
+                        stacks[stack] = stacks.get(stack, 0) + int(count)
+        except OSError:
+            continue
+    return stacks, len(files)
+
+
+def to_folded(stacks):
+    """Collapsed stack text (flamegraph.pl / speedscope import)"""
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(stacks.items()))
+
+
+def to_speedscope(stacks, name):
+    """
+    Convert collapsed stacks to a speedscope sampled profile
+
+    Args:
+        stacks: Dict of collapsed stack -> samples
+        name: Profile name shown in speedscope
+
+    Returns:
+        JSON string in the speedscope file format
+    """
+    frames, index = [], {}
+    samples, weights = [], []
+    interval = Config.PROFILER_INTERVAL_MS
+    for stack, count in sorted(stacks.items()):
+        sample = []
+        for frame in stack.split(';'):
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({'name': frame})
+            sample.append(index[frame])
+        samples.append(sample)
+        weights.append(count * interval)
+
+    return json.dumps({
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'spralingua',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': sum(weights),
+            'samples': samples,
+            'weights': weights
+        }]
+    })
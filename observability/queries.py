@@ -0,0 +1,148 @@
+# SQL Query Diagnostics for Spralingua
+# Per-request statement counts, repeated-statement (N+1) detection and query budgets
+#
+# Every statement executed during a request is tallied on flask.g by its SQL
+# text (parameters are bound separately, so a loop that loads one row per
+# topic shows up as the same statement many times). Statement count and DB
+# time come from the 'db' stage recorded in observability/timing.py.
+#
+# After each request the route is checked against its query budget
+# (DEFAULT_QUERY_BUDGETS, overridden by QUERY_BUDGETS, else QUERY_BUDGET_DEFAULT).
+# Overruns and repeated statements are logged and counted on /metrics; with
+# QUERY_BUDGET_ENFORCE=true an overrun raises QueryBudgetExceeded instead, so
+# load tests and test clients fail loudly.
+
+import re
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import Config
+from logging_config import get_logger
+from observability.metrics import DB_QUERY_BUDGET_EXCEEDED, DB_REPEATED_STATEMENTS
+from observability.timing import get_request_spans
+
+logger = get_logger('queries')
+
+# Statement counts measured with benchmarks/load_test.py plus some headroom;
+# other routes use QUERY_BUDGET_DEFAULT.
+DEFAULT_QUERY_BUDGETS = {
+    '/login': 5,
+    '/logout': 2,
+    '/api/save-progress': 50,
+    '/api/user-progress': 8,
+    '/api/casual-chat/scenario': 8,
+    '/api/casual-chat/chat': 17,
+    '/api/casual-chat/tts': 4,
+    '/api/writing-practice/generate': 14,
+    '/api/writing-practice/submit': 22,
+    '/healthz': 0,
+    '/readyz': 1,
+}
+
+
+SELECT_COLUMNS = re.compile(r'^SELECT\s.*?\sFROM\s', re.IGNORECASE | re.DOTALL)
+
+
+class QueryBudgetExceeded(Exception):
+    """A request executed more SQL statements than its route's budget"""
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        statements = g.setdefault('sql_statements', {})
+        statements[statement] = statements.get(statement, 0) + 1
+
+
+def parse_query_budgets(spec):
+    """
+    Parse a "route=max,..." string into a dict
+
+    Args:
+        spec: Budget specification, e.g. "/api/user-progress=8,/dashboard=12"
+
+    Returns:
+        Dict mapping route rule to the maximum number of statements
+    """
+    budgets = {}
+    for part in (spec or '').split(','):
+        if '=' not in part:
+            continue
+        route, _, value = part.rpartition('=')
+        try:
+            budgets[route.strip()] = int(value)
+        except ValueError:
+            continue
+    return budgets
+
+
+_budgets = {}
+
+
+def get_query_budget(route):
+    """
+    Get the statement budget for a route
+
+    Args:
+        route: URL rule, e.g. '/api/user-progress'
+
+    Returns:
+        Maximum number of statements, or None if budgets are disabled
+    """
+    if not _budgets:
+        _budgets.update(DEFAULT_QUERY_BUDGETS)
+        _budgets.update(parse_query_budgets(Config.QUERY_BUDGETS))
+    budget = _budgets.get(route, Config.QUERY_BUDGET_DEFAULT)
+    return budget if budget is not None and budget >= 0 else None
+
+
+def get_query_stats():
+    """
+    Get SQL statistics for the current request
+
+    Returns:
+        Dict with 'count', 'seconds' and 'repeated' (list of (statement, count)
+        executed at least N_PLUS_ONE_THRESHOLD times, most frequent first)
+    """
+    seconds, count = get_request_spans().get('db', (0.0, 0))
+    statements = g.get('sql_statements', {}) if has_request_context() else {}
+    repeated = sorted(
+        ((statement, times) for statement, times in statements.items()
+         if times >= Config.N_PLUS_ONE_THRESHOLD),
+        key=lambda item: item[1], reverse=True
+    )
+    return {'count': count, 'seconds': seconds, 'repeated': repeated}
+
+
+def summarise_statement(statement, limit=200):
+    """One-line statement with the SELECT column list collapsed, for logs"""
+    statement = SELECT_COLUMNS.sub('SELECT ... FROM ', ' '.join(statement.split()))
+    return statement if len(statement) <= limit else statement[:limit] + '...'
+
+
+def check_request_queries(route, stats=None):
+    """
+    Flag repeated statements and enforce the route's query budget
+
+    Args:
+        route: URL rule of the current request
+        stats: Result of get_query_stats() (computed if omitted)
+
+    Raises:
+        QueryBudgetExceeded: Over budget while QUERY_BUDGET_ENFORCE is on
+    """
+    stats = stats or get_query_stats()
+
+    for statement, times in stats['repeated']:
+        DB_REPEATED_STATEMENTS.inc(route=route)
+        logger.info("Possible N+1 on %s: statement ran %d times: %s", route, times, summarise_statement(statement))
+
+    budget = get_query_budget(route)
+    if budget is not None and stats['count'] > budget:
+        DB_QUERY_BUDGET_EXCEEDED.inc(route=route)
+        message = f"{route} executed {stats['count']} SQL statements (budget {budget})"
+        if Config.QUERY_BUDGET_ENFORCE:
+            raise QueryBudgetExceeded(message)
+        logger.warning("Query budget exceeded: %s", message)
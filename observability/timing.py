@@ -0,0 +1,121 @@
+# Request Timing for Spralingua
+# Lightweight spans that feed a Server-Timing header and per-stage histograms
+#
+# Wrap a stage with `with span('claude_api'):` or decorate a function with
+# @timed('prompt_build'). Durations are kept on flask.g for the current
+# request (summed per stage for the Server-Timing header) and folded into
+# the stage_duration_seconds histogram exported on /metrics. Time spent
+# executing SQL is recorded as the 'db' stage automatically via engine events.
+
+import functools
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from observability.metrics import STAGE_DURATION, get_histogram
+
+
+def record_span(name, seconds):
+    """
+    Record a completed stage duration
+
+    Args:
+        name: Stage name (a Server-Timing token, e.g. 'claude_api')
+        seconds: Duration in seconds
+    """
+    STAGE_DURATION.observe(seconds, stage=name)
+
+    if has_request_context():
+        spans = g.setdefault('timing_spans', {})
+        total, count = spans.get(name, (0.0, 0))
+        spans[name] = (total + seconds, count + 1)
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as stage `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def timed(name):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_request_spans():
+    """
+    Get the stages recorded for the current request
+
+    Returns:
+        Dict of stage name -> (total_seconds, count)
+    """
+    if not has_request_context():
+        return {}
+    return dict(g.get('timing_spans', {}))
+
+
+def get_stage_histograms():
+    """
+    Get latency histograms for every stage seen by this worker process
+
+    Returns:
+        Dict of stage name -> {'buckets', 'count', 'sum'}
+    """
+    return get_histogram(STAGE_DURATION, 'stage')
+
+
+def format_server_timing(spans, total_seconds=None):
+    """
+    Build a Server-Timing header value
+
+    Args:
+        spans: Dict of stage name -> (total_seconds, count)
+        total_seconds: Optional whole-request duration, emitted as 'total'
+
+    Returns:
+        Header value such as 'db;dur=3.1;desc="x4", claude_api;dur=812.4'
+    """
+    entries = []
+    for name, (seconds, count) in spans.items():
+        entry = f'{name};dur={seconds * 1000:.1f}'
+        if count > 1:
+            entry += f';desc="x{count}"'
+        entries.append(entry)
+    if total_seconds is not None:
+        entries.append(f'total;dur={total_seconds * 1000:.1f}')
+    return ', '.join(entries)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if starts:
+        record_span('db', time.perf_counter() - starts.pop())
+
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_query_timer(exception_context):
+    """Failed statements never reach after_cursor_execute; drop their start time"""
+    conn = exception_context.connection
+    if conn is not None:
+        starts = conn.info.get('query_start_time')
+        if starts:
+            starts.pop()
@@ -4,8 +4,12 @@
 from database import db
 from models.exercise_progress import ExerciseProgress
 from models.topic_progress import TopicProgress
-from models.user_progress import UserProgress
 from sqlalchemy.exc import IntegrityError
+from logging_config import get_logger
+from observability.timing import timed
+from progress.progression_engine import get_progression_engine
+
+logger = get_logger('progress')
 
 class ExerciseProgressManager:
     """Manages exercise completion tracking and topic advancement"""
@@ -39,6 +43,7 @@ class ExerciseProgressManager:
             print(f"[ERROR] Getting exercise progress: {e}")
             return None
 
+    @timed('exercise_record')
     def record_exercise_attempt(self, user_progress_id, level, topic_number, exercise_type,
                                score, messages_correct=None, messages_total=None):
         """
@@ -114,21 +119,13 @@ class ExerciseProgressManager:
             bool: True if topic was completed and user advanced
         """
         try:
-            # Get all exercises for this topic
-            # Currently we have 2 active exercises: casual_chat and email_writing
-            active_exercises = ['casual_chat', 'email_writing']
-
-            all_complete = True
-            for exercise_type in active_exercises:
-                progress = self.get_exercise_progress(
-                    user_progress_id, level, topic_number, exercise_type
-                )
-                if not progress or not progress.completed:
-                    all_complete = False
-                    break
+            # Completion rules live in ProgressionEngine.exercise_status; the
+            # attempt was committed, so the engine loads a fresh snapshot
+            engine = get_progression_engine(user_progress_id)
+            all_complete = engine.exercise_status(level, topic_number)['topic_complete']
 
             if all_complete:
-                print(f"[INFO] All exercises complete for topic {topic_number}. Marking topic complete.")
+                logger.info("All exercises complete for topic %s, marking topic complete", topic_number)
 
                 # Use TopicManager to handle topic completion properly
                 from topics.topic_manager import TopicManager
@@ -136,16 +133,16 @@ class ExerciseProgressManager:
                 success, result = topic_manager.mark_topic_complete(user_progress_id, level, topic_number)
 
                 if success:
-                    print(f"[SUCCESS] Topic {topic_number} marked as complete")
+                    logger.info("Topic %s marked as complete", topic_number)
                     # Log next item info
                     if result.get('next_item'):
                         next_item = result['next_item']
                         if next_item['type'] == 'topic':
-                            print(f"[INFO] Next topic: Topic {next_item['topic_number']}")
+                            logger.info("Next topic: Topic %s", next_item['topic_number'])
                         elif next_item['type'] == 'test':
-                            print(f"[INFO] Next: {next_item['message']}")
+                            logger.info("Next: %s", next_item['message'])
                         elif next_item['type'] == 'completed':
-                            print(f"[INFO] Level completed!")
+                            logger.info("Level completed")
                     return True
                 else:
                     print(f"[ERROR] Failed to mark topic complete: {result}")
@@ -197,39 +194,8 @@ class ExerciseProgressManager:
             dict with exercise statuses
         """
         try:
-            active_exercises = ['casual_chat', 'email_writing']
-            exercises_status = {}
-
-            for exercise_type in active_exercises:
-                progress = self.get_exercise_progress(
-                    user_progress_id, level, topic_number, exercise_type
-                )
-
-                if progress:
-                    exercises_status[exercise_type] = {
-                        'completed': progress.completed,
-                        'score': progress.score,
-                        'best_score': progress.best_score,
-                        'attempts': progress.attempts,
-                        'status': progress.get_completion_status()
-                    }
-                else:
-                    exercises_status[exercise_type] = {
-                        'completed': False,
-                        'score': 0,
-                        'best_score': 0,
-                        'attempts': 0,
-                        'status': 'not_started'
-                    }
-
-            # Check if topic is complete
-            topic_complete = all(ex['completed'] for ex in exercises_status.values())
-
-            return {
-                'exercises': exercises_status,
-                'topic_complete': topic_complete,
-                'topic_number': topic_number
-            }
+            engine = get_progression_engine(user_progress_id)
+            return engine.exercise_status(level, topic_number)
 
         except Exception as e:
             print(f"[ERROR] Getting topic exercises status: {e}")
@@ -0,0 +1,123 @@
+# Identity Cache for Spralingua
+# Request-scoped memoisation of User and UserProgress lookups
+#
+# A chat turn resolves the same User / active UserProgress from several
+# managers and builders. Lookups go through this cache, which lives on
+# flask.g (so it never outlives the request) and is dropped on every session
+# commit or rollback so "most recent" and "not found" answers can't go stale.
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database import db
+from models.user import User
+from observability.metrics import record_cache
+
+_MISSING = object()
+
+# Totals for this worker process since startup
+_process_stats = {'hits': 0, 'misses': 0}
+
+
+def _request_cache():
+    """Get the cache dict for the current request, or None outside an app context"""
+    if not has_app_context():
+        return None
+    return g.setdefault('identity_cache', {})
+
+
+def _record(outcome):
+    """Count a hit or miss for the request and the process"""
+    _process_stats[outcome] += 1
+    record_cache('identity', outcome == 'hits')
+    if has_app_context():
+        stats = g.setdefault('identity_cache_stats', {'hits': 0, 'misses': 0})
+        stats[outcome] += 1
+
+
+def get_or_load(key, loader):
+    """
+    Return the cached value for key, calling loader() on a miss
+
+    None results are cached too, so repeated "not found" lookups are free.
+
+    Args:
+        key: Hashable cache key
+        loader: Zero-argument callable that queries the database
+
+    Returns:
+        Cached or freshly loaded value
+    """
+    cache = _request_cache()
+    if cache is None:
+        return loader()
+
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        _record('hits')
+        return value
+
+    _record('misses')
+    value = loader()
+    cache[key] = value
+    return value
+
+
+def remember(key, value):
+    """Store a value under an additional key (e.g. a progress found via another lookup)"""
+    cache = _request_cache()
+    if cache is not None:
+        cache[key] = value
+
+
+def get_user(user_id):
+    """
+    Get a User by ID, memoised for the request
+
+    Args:
+        user_id: The user's ID
+
+    Returns:
+        User object or None
+    """
+    if not user_id:
+        return None
+    return get_or_load(
+        ('user', user_id),
+        lambda: db.session.query(User).filter_by(id=user_id).first()
+    )
+
+
+def get_identity_cache_stats():
+    """
+    Get hit/miss counts for the current request and the worker process
+
+    Returns:
+        Dict with 'request' and 'process' hit/miss dicts
+    """
+    request_stats = {'hits': 0, 'misses': 0}
+    if has_app_context():
+        request_stats = dict(g.get('identity_cache_stats', request_stats))
+    return {
+        'request': request_stats,
+        'process': dict(_process_stats)
+    }
+
+
+def invalidate_identity_cache():
+    """Drop everything cached for the current request (statistics are kept)"""
+    if has_app_context():
+        g.pop('identity_cache', None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    """Commits can create rows or change last_accessed ordering"""
+    invalidate_identity_cache()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_after_rollback(session):
+    """Rolled-back objects may no longer exist"""
+    invalidate_identity_cache()
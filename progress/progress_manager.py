@@ -3,6 +3,7 @@
 
 from database import db
 from models.user_progress import UserProgress
+from progress import identity_cache
 from sqlalchemy.exc import IntegrityError
 
 class ProgressManager:
@@ -16,6 +17,8 @@ class ProgressManager:
         """
         Get user's progress for a specific language pair or most recent
         
+        Lookups are memoised for the current request (see progress/identity_cache.py).
+        
         Args:
             user_id: The user's ID
             input_language: Optional specific input language
@@ -29,13 +32,27 @@ class ProgressManager:
             
             if input_language and target_language:
                 # Get specific language pair
-                progress = query.filter_by(
-                    input_language=input_language.lower(),
-                    target_language=target_language.lower()
-                ).first()
+                input_language = input_language.lower()
+                target_language = target_language.lower()
+                progress = identity_cache.get_or_load(
+                    ('user_progress', user_id, input_language, target_language),
+                    lambda: query.filter_by(
+                        input_language=input_language,
+                        target_language=target_language
+                    ).first()
+                )
             else:
                 # Get most recently accessed progress
-                progress = query.order_by(UserProgress.last_accessed.desc()).first()
+                progress = identity_cache.get_or_load(
+                    ('user_progress_recent', user_id),
+                    lambda: query.order_by(UserProgress.last_accessed.desc()).first()
+                )
+                if progress:
+                    # A later lookup by language pair resolves to the same row
+                    identity_cache.remember(
+                        ('user_progress', user_id, progress.input_language, progress.target_language),
+                        progress
+                    )
             
             return progress
         except Exception as e:
@@ -0,0 +1,459 @@
+# Progression Engine for Spralingua
+# Answers gating, unlock and next-topic questions from one in-memory snapshot
+# of a learner's progress rows, so a request loads them once instead of every
+# manager method re-querying UserProgress / TopicProgress / TestProgress.
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.user_progress import UserProgress
+from models.topic_progress import TopicProgress
+from models.test_progress import TestProgress
+from models.exercise_progress import ExerciseProgress
+from models.topic_definition import TopicDefinition
+from observability.timing import timed
+from observability.metrics import record_cache
+
+# Topics gated by each checkpoint (legacy 12-topic gating used by TestManager)
+TEST_REQUIREMENTS = {
+    'checkpoint_1': {
+        'topics': [1, 2, 3, 4],
+        'message': 'Complete topics 1-4 to unlock Test 1'
+    },
+    'checkpoint_2': {
+        'topics': [5, 6, 7, 8],
+        'message': 'Complete topics 5-8 to unlock Test 2',
+        'prerequisite_test': 'checkpoint_1'
+    },
+    'final': {
+        'topics': [9, 10, 11, 12],
+        'message': 'Complete topics 9-12 to unlock Final Test',
+        'prerequisite_test': 'checkpoint_2'
+    }
+}
+
+ACTIVE_EXERCISES = ['casual_chat', 'email_writing']
+TOTAL_TOPICS = 16
+
+
+class ProgressSnapshot:
+    """All progress rows for one UserProgress, loaded in a fixed number of queries"""
+
+    def __init__(self, user_progress, topic_progress, tests, exercises, topic_definitions):
+        """
+        Initialize the snapshot
+
+        Args:
+            user_progress: UserProgress object or None
+            topic_progress: List of TopicProgress objects (all levels)
+            tests: List of TestProgress objects
+            exercises: List of ExerciseProgress objects (all levels)
+            topic_definitions: Dict of topic_number -> TopicDefinition for the current level
+        """
+        self.user_progress = user_progress
+        self.topic_progress = sorted(topic_progress, key=lambda tp: tp.topic_number)
+        self.tests = {t.test_type: t for t in tests}
+        self.exercises = {
+            (e.level, e.topic_number, e.exercise_type): e for e in exercises
+        }
+        self.topic_definitions = topic_definitions
+
+    @classmethod
+    @timed('progress_snapshot')
+    def load(cls, user_progress_id):
+        """
+        Load a snapshot from the database (5 queries, or 1 if the progress is missing)
+
+        Args:
+            user_progress_id: The user progress ID
+
+        Returns:
+            ProgressSnapshot object
+        """
+        user_progress = UserProgress.query.get(user_progress_id)
+        if not user_progress:
+            return cls(None, [], [], [], {})
+
+        topic_progress = TopicProgress.query.filter_by(user_progress_id=user_progress_id).all()
+        tests = TestProgress.query.filter_by(user_progress_id=user_progress_id).all()
+        exercises = ExerciseProgress.query.filter_by(user_progress_id=user_progress_id).all()
+        definitions = TopicDefinition.query.filter_by(level=user_progress.current_level.upper()).all()
+
+        return cls(
+            user_progress,
+            topic_progress,
+            tests,
+            exercises,
+            {d.topic_number: d for d in definitions}
+        )
+
+
+class ProgressionEngine:
+    """Pure progression rules evaluated against a ProgressSnapshot (no I/O)"""
+
+    def __init__(self, snapshot):
+        """
+        Initialize the engine
+
+        Args:
+            snapshot: ProgressSnapshot object
+        """
+        self.snapshot = snapshot
+
+    @property
+    def user_progress(self):
+        return self.snapshot.user_progress
+
+    def level_topics(self, level=None):
+        """
+        Get topic progress rows for a level, ordered by topic number
+
+        Args:
+            level: The level (defaults to the user's current level)
+
+        Returns:
+            List of TopicProgress objects
+        """
+        if level is None:
+            if not self.user_progress:
+                return []
+            level = self.user_progress.current_level
+        level = level.upper()
+        return [tp for tp in self.snapshot.topic_progress if tp.level == level]
+
+    def get_topic_progress(self, topic_number, level=None):
+        """Get the TopicProgress row for a topic (current level by default) or None"""
+        return next((tp for tp in self.level_topics(level) if tp.topic_number == topic_number), None)
+
+    def get_test(self, test_type):
+        """Get the TestProgress row for a test type or None"""
+        return self.snapshot.tests.get(test_type)
+
+    def get_topic_definition(self, topic_number):
+        """Get the TopicDefinition for a topic in the current level or None"""
+        return self.snapshot.topic_definitions.get(topic_number)
+
+    def completed_topic_numbers(self):
+        """Completed topic numbers across all levels (matches the unfiltered queries)"""
+        return [tp.topic_number for tp in self.snapshot.topic_progress if tp.completed]
+
+    def max_accessible_topic(self):
+        """Highest topic the user may open in the current level"""
+        completed = [tp.topic_number for tp in self.level_topics() if tp.completed]
+        return max(completed) + 1 if completed else self.user_progress.current_topic
+
+    def current_topic(self):
+        """
+        Get the current topic a user should be working on
+
+        Returns:
+            Dict with current topic info or None
+        """
+        if not self.user_progress:
+            return None
+
+        all_progress = self.level_topics()
+        if not all_progress:
+            return None
+
+        checkpoint_1 = self.get_test('checkpoint_1')
+        checkpoint_2 = self.get_test('checkpoint_2')
+
+        for progress in all_progress:
+            topic_num = progress.topic_number
+
+            if topic_num in [5, 6, 7, 8] and checkpoint_1 and not checkpoint_1.passed:
+                if all(p.completed for p in all_progress if p.topic_number in [1, 2, 3, 4]):
+                    return {
+                        'type': 'test',
+                        'test_type': 'checkpoint_1',
+                        'test_number': 1,
+                        'message': 'Complete Test 1 to unlock topics 5-8'
+                    }
+                continue
+
+            elif topic_num in [9, 10, 11, 12] and checkpoint_2 and not checkpoint_2.passed:
+                if all(p.completed for p in all_progress if p.topic_number in [5, 6, 7, 8]):
+                    return {
+                        'type': 'test',
+                        'test_type': 'checkpoint_2',
+                        'test_number': 2,
+                        'message': 'Complete Test 2 to unlock topics 9-12'
+                    }
+                continue
+
+            if not progress.completed:
+                topic_def = self.get_topic_definition(topic_num)
+                if topic_def:
+                    return {
+                        'type': 'topic',
+                        'topic_number': topic_num,
+                        'title_key': topic_def.title_key,
+                        'progress': progress.to_dict(),
+                        'definition': topic_def.to_dict()
+                    }
+
+        final_test = self.get_test('final')
+        if final_test and not final_test.passed:
+            return {
+                'type': 'test',
+                'test_type': 'final',
+                'test_number': 3,
+                'message': 'Complete Final Test to advance to next level'
+            }
+
+        return {
+            'type': 'completed',
+            'message': 'Level completed! Ready to advance.'
+        }
+
+    def next_item(self, completed_topic_number):
+        """
+        Determine what comes next after completing a topic (16-topic system)
+
+        Args:
+            completed_topic_number: The topic that was just completed
+
+        Returns:
+            Dict with next item info (topic or completed) or None
+        """
+        if not self.user_progress:
+            return None
+
+        if completed_topic_number < TOTAL_TOPICS:
+            next_topic_num = completed_topic_number + 1
+            topic_def = self.get_topic_definition(next_topic_num)
+            if topic_def:
+                return {
+                    'type': 'topic',
+                    'topic_number': next_topic_num,
+                    'title_key': topic_def.title_key
+                }
+        elif completed_topic_number == TOTAL_TOPICS:
+            return {
+                'type': 'completed',
+                'message': 'Level completed! Ready to advance to next level.'
+            }
+
+        return None
+
+    def first_uncompleted_topic(self, last_topic=12):
+        """
+        Get the first topic (1..last_topic) without a completed progress row
+
+        Used to pick the practice topic when no override is given. Returns 1
+        when there is no progress yet or everything is complete.
+
+        Args:
+            last_topic: Highest topic number to consider
+
+        Returns:
+            Topic number
+        """
+        all_progress = self.snapshot.topic_progress
+        if not all_progress:
+            return 1
+
+        for topic_num in range(1, last_topic + 1):
+            topic_progress = next((tp for tp in all_progress if tp.topic_number == topic_num), None)
+            if not topic_progress or not topic_progress.completed:
+                return topic_num
+
+        return 1
+
+    def can_access_topic(self, topic_number):
+        """
+        Check if a user can access a specific topic
+
+        Returns:
+            Tuple (can_access: bool, reason: str)
+        """
+        if not self.user_progress:
+            return False, "User progress not found"
+
+        if topic_number == 1:
+            return True, "First topic is always accessible"
+
+        prev_topic = self.get_topic_progress(topic_number - 1)
+        if prev_topic and not prev_topic.completed:
+            return False, f"Complete Topic {topic_number - 1} first"
+
+        return True, "Topic is accessible"
+
+    def completion_popup_topic(self):
+        """
+        Get the earliest completed topic whose popup hasn't been shown
+
+        Returns:
+            TopicProgress object or None
+        """
+        pending = [
+            tp for tp in self.snapshot.topic_progress
+            if tp.completed and not tp.has_seen_completion_popup
+        ]
+        return pending[0] if pending else None
+
+    def is_test_unlocked(self, test_type):
+        """
+        Check if a test is unlocked based on completed topics
+
+        Returns:
+            Tuple (unlocked: bool, message: str)
+        """
+        if test_type not in TEST_REQUIREMENTS:
+            return False, 'Invalid test type'
+
+        req = TEST_REQUIREMENTS[test_type]
+        completed_numbers = self.completed_topic_numbers()
+
+        if 'prerequisite_test' in req:
+            prereq_test = self.get_test(req['prerequisite_test'])
+            if not prereq_test or not prereq_test.passed:
+                return False, f'Must pass {req["prerequisite_test"]} first'
+
+        if all(topic in completed_numbers for topic in req['topics']):
+            return True, 'Test is unlocked'
+
+        missing = [t for t in req['topics'] if t not in completed_numbers]
+        return False, f'{req["message"]} (Missing topics: {missing})'
+
+    def newly_unlocked_test(self):
+        """
+        Find a test whose topics are complete but which hasn't been passed yet
+
+        Returns:
+            Dict with test unlock info or None
+        """
+        completed_numbers = set(self.completed_topic_numbers())
+
+        tests_to_check = [
+            ('checkpoint_1', {1, 2, 3, 4}, 'Test 1 is now available', None),
+            ('checkpoint_2', {5, 6, 7, 8}, 'Test 2 is now available', 'checkpoint_1'),
+            ('final', {9, 10, 11, 12}, 'Final Test is now available', 'checkpoint_2')
+        ]
+
+        for test_type, required_topics, message, prerequisite in tests_to_check:
+            if not required_topics.issubset(completed_numbers):
+                continue
+
+            test_progress = self.get_test(test_type)
+            if not test_progress or test_progress.passed:
+                continue
+
+            if prerequisite:
+                prereq = self.get_test(prerequisite)
+                if not prereq or not prereq.passed:
+                    continue
+
+            return {
+                'test_type': test_type,
+                'test_number': test_progress.test_number,
+                'message': message,
+                'unlocked': True
+            }
+
+        return None
+
+    def can_proceed_to_topic(self, topic_number):
+        """
+        Check if user can proceed to a topic (not blocked by a checkpoint test)
+
+        Returns:
+            Tuple (can_proceed: bool, blocking_test: str or None)
+        """
+        gates = [
+            ([5, 6, 7, 8], 'checkpoint_1', [1, 2, 3, 4]),
+            ([9, 10, 11, 12], 'checkpoint_2', [5, 6, 7, 8]),
+        ]
+
+        for gated_topics, test_type, required_topics in gates:
+            if topic_number not in gated_topics:
+                continue
+
+            test = self.get_test(test_type)
+            if not test or not test.passed:
+                completed_count = sum(
+                    1 for tp in self.snapshot.topic_progress
+                    if tp.completed and tp.topic_number in required_topics
+                )
+                if completed_count == 4:
+                    return False, test_type
+            break
+
+        return True, None
+
+    def exercise_status(self, level, topic_number):
+        """
+        Get status of all active exercises in a topic
+
+        Returns:
+            Dict with per-exercise status, topic_complete and topic_number
+        """
+        exercises_status = {}
+        for exercise_type in ACTIVE_EXERCISES:
+            progress = self.snapshot.exercises.get((level.upper(), topic_number, exercise_type))
+            if progress:
+                exercises_status[exercise_type] = {
+                    'completed': progress.completed,
+                    'score': progress.score,
+                    'best_score': progress.best_score,
+                    'attempts': progress.attempts,
+                    'status': progress.get_completion_status()
+                }
+            else:
+                exercises_status[exercise_type] = {
+                    'completed': False,
+                    'score': 0,
+                    'best_score': 0,
+                    'attempts': 0,
+                    'status': 'not_started'
+                }
+
+        return {
+            'exercises': exercises_status,
+            'topic_complete': all(ex['completed'] for ex in exercises_status.values()),
+            'topic_number': topic_number
+        }
+
+
+def get_progression_engine(user_progress_id):
+    """
+    Get a ProgressionEngine for a user progress, sharing the snapshot within a request
+
+    Inside an app context the snapshot is cached on flask.g and dropped on
+    every session commit, so writes are always followed by a fresh load.
+    Outside an app context a new snapshot is loaded each call.
+
+    Args:
+        user_progress_id: The user progress ID
+
+    Returns:
+        ProgressionEngine object
+    """
+    if not has_app_context():
+        return ProgressionEngine(ProgressSnapshot.load(user_progress_id))
+
+    snapshots = g.setdefault('progress_snapshots', {})
+    record_cache('progress_snapshot', user_progress_id in snapshots)
+    if user_progress_id not in snapshots:
+        snapshots[user_progress_id] = ProgressSnapshot.load(user_progress_id)
+    return ProgressionEngine(snapshots[user_progress_id])
+
+
+def invalidate_progress_snapshots():
+    """Drop all snapshots cached for the current request"""
+    if has_app_context():
+        g.pop('progress_snapshots', None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    """Committed writes may add rows or change the level - reload on next use"""
+    invalidate_progress_snapshots()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _invalidate_after_rollback(session):
+    """Rolled-back objects are expired - reload on next use"""
+    invalidate_progress_snapshots()
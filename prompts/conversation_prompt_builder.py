@@ -7,9 +7,21 @@ from typing import Dict, Optional, Tuple
 from progress.progress_manager import ProgressManager
 from topics.topic_manager import TopicManager
 from level_rules.level_rules_manager import LevelRulesManager
+from progress.progression_engine import get_progression_engine
+from progress.identity_cache import get_user
 from flask import current_app
 from models.user import User
 from database import db
+from logging_config import get_logger
+from observability.timing import timed
+
+logger = get_logger('prompts.conversation')
+
+PERSONALITIES_PATH = os.path.join('prompts', 'personalities')
+
+# Parsed personality files shared by every builder instance in the process
+_personality_cache = {}
+
 
 class ConversationPromptBuilder:
     """Builds personalized conversation prompts based on user progress and character personality"""
@@ -19,14 +31,15 @@ class ConversationPromptBuilder:
         self.progress_manager = ProgressManager()
         self.topic_manager = TopicManager()
         self.level_rules_manager = LevelRulesManager()
-        self.personalities_path = os.path.join('prompts', 'personalities')
+        self.personalities_path = PERSONALITIES_PATH
         
-        # Cache for loaded files
-        self._personality_cache = {}
+        # Cache for loaded files (shared across instances)
+        self._personality_cache = _personality_cache
         
         # Feature flag for enhanced system
         self.use_enhanced = os.environ.get('USE_ENHANCED_PROMPTS', 'true').lower() == 'true'
     
+    @timed('prompt_build')
     def build_prompt(self, user_id: int, character: str = 'harry', topic_override: int = None) -> Tuple[str, Dict]:
         """
         Build a complete conversation prompt for the given user and character
@@ -47,7 +60,7 @@ class ConversationPromptBuilder:
                 return self._build_legacy_prompt(user_id, character)
             
         except Exception as e:
-            print(f"[ERROR] ConversationPromptBuilder: {e}")
+            logger.error("ConversationPromptBuilder: %s", e)
             # Return None to signal fallback to old system
             return None, None
     
@@ -82,6 +95,8 @@ class ConversationPromptBuilder:
 
         # Add number_of_exchanges to user_context for frontend use
         user_context['number_of_exchanges'] = topic_params.get('number_of_exchanges', 5)
+        # Word limit sizes the reply's output token budget (services/model_routing.py)
+        user_context['word_limit'] = topic_params.get('word_limit')
 
         return final_prompt, user_context
     
@@ -211,6 +226,21 @@ Follow this structure:
         
         return params
     
+    @classmethod
+    def load_personalities(cls) -> int:
+        """
+        Parse every personality file into the shared cache
+
+        Returns:
+            Number of personalities loaded
+        """
+        for filename in sorted(os.listdir(PERSONALITIES_PATH)):
+            character = filename.removesuffix('_personality.yaml')
+            if character != filename and character not in _personality_cache:
+                with open(os.path.join(PERSONALITIES_PATH, filename), 'r', encoding='utf-8') as file:
+                    _personality_cache[character] = yaml.safe_load(file)
+        return len(_personality_cache)
+
     def _load_personality(self, character: str) -> Dict:
         """Load personality YAML for the given character"""
         if character in self._personality_cache:
@@ -250,7 +280,7 @@ Follow this structure:
         
         try:
             # Get user's name from User table
-            user = db.session.query(User).filter_by(id=user_id).first()
+            user = get_user(user_id)
             if user:
                 context['user_name'] = user.name
             
@@ -266,7 +296,7 @@ Follow this structure:
                 # Use topic override if provided, otherwise determine current topic
                 if topic_override:
                     context['topic_number'] = topic_override
-                    print(f"[INFO] Using topic override: Topic {topic_override}")
+                    logger.info("Using topic override: Topic %s", topic_override)
                 else:
                     # Determine current topic (next uncompleted topic)
                     current_topic_number = self._determine_current_topic(user_progress.id, context['level'])
@@ -281,7 +311,7 @@ Follow this structure:
                     context['conversation_contexts'] = topic_def.conversation_contexts
             
         except Exception as e:
-            print(f"[WARNING] Could not get user context: {e}")
+            logger.warning("Could not get user context: %s", e)
             # Return default context
         
         return context
@@ -293,28 +323,10 @@ Follow this structure:
         Returns the next uncompleted topic number (1-12)
         """
         try:
-            # Get all topic progress for this user
-            all_progress = self.topic_manager.get_user_topic_progress(user_progress_id)
-            
-            if not all_progress:
-                # No progress yet, start with topic 1
-                return 1
-            
-            # Find the first uncompleted topic
-            for topic_num in range(1, 13):  # Topics 1-12
-                topic_progress = next(
-                    (tp for tp in all_progress if tp.topic_number == topic_num), 
-                    None
-                )
-                
-                if not topic_progress or not topic_progress.completed:
-                    return topic_num
-            
-            # All topics completed, cycle back to 1
-            return 1
+            return get_progression_engine(user_progress_id).first_uncompleted_topic()
             
         except Exception as e:
-            print(f"[WARNING] Could not determine current topic: {e}")
+            logger.warning("Could not determine current topic: %s", e)
             return 1  # Default to topic 1
     
     def _translate_topic_title(self, title_key: str) -> str:
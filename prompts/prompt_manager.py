@@ -1,6 +1,13 @@
 import yaml
 from typing import Dict
 
+from logging_config import get_logger
+
+logger = get_logger('prompts')
+
+# Parsed prompt files shared by every PromptManager in the process, keyed by path
+_prompt_files: Dict[str, Dict[str, str]] = {}
+
 
 class PromptManager:
     """Manages loading and accessing prompts from YAML configuration files."""
@@ -17,10 +24,14 @@ class PromptManager:
         self.load_prompts()
     
     def load_prompts(self) -> None:
-        """Load prompts from the YAML file."""
+        """Load prompts from the YAML file (parsed once per process)."""
+        if self.prompt_file in _prompt_files:
+            self._prompts = _prompt_files[self.prompt_file]
+            return
         try:
             with open(self.prompt_file, 'r', encoding='utf-8') as file:
                 self._prompts = yaml.safe_load(file) or {}
+            _prompt_files[self.prompt_file] = self._prompts
         except FileNotFoundError:
             raise FileNotFoundError(f"Prompt file '{self.prompt_file}' not found")
         except yaml.YAMLError as e:
@@ -62,5 +73,6 @@ class PromptManager:
     
     def reload_prompts(self) -> None:
         """Reload prompts from the YAML file."""
+        _prompt_files.pop(self.prompt_file, None)
         self.load_prompts()
-        print(f"[SUCCESS] [PROMPT MANAGER] Reloaded prompts from {self.prompt_file}")
\ No newline at end of file
+        logger.info("Reloaded prompts from %s", self.prompt_file)
\ No newline at end of file
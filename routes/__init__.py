@@ -6,8 +6,9 @@ from .core import core_bp
 from .auth import auth_bp
 from .exercises import exercises_bp
 from .api import api_bp
+from .ops import ops_bp
 
-__all__ = ['core_bp', 'auth_bp', 'exercises_bp', 'api_bp']
+__all__ = ['core_bp', 'auth_bp', 'exercises_bp', 'api_bp', 'ops_bp']
 
 
 def register_blueprints(app):
@@ -16,3 +17,4 @@ def register_blueprints(app):
     app.register_blueprint(auth_bp)
     app.register_blueprint(exercises_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
+    app.register_blueprint(ops_bp)
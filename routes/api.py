@@ -3,16 +3,43 @@ API routes blueprint.
 Handles all /api/* endpoints.
 """
 
+import hashlib
+import json
 import time
 import uuid
 import os
-from flask import Blueprint, request, jsonify, session, current_app
+from flask import Blueprint, Response, request, jsonify, session, current_app, stream_with_context, url_for
 
 from auth.decorators import login_required
+from config import Config
 from progress.progress_manager import ProgressManager
+from logging_config import get_logger
+from observability.metrics import REPLY_AUDIO
+from observability.timing import span
+from services.resilience import CircuitOpenError
+from services.llm_scheduler import SchedulerBusyError
+from services.rate_limit import rate_limited, take_token
+from services.spend_ledger import record_spend, flush_spend, check_budget
 
 
 api_bp = Blueprint('api', __name__)
+logger = get_logger('api')
+
+
+def _undo_chat_message():
+    """Forget the message counted before a failed tutor call, so the client's retry isn't counted twice"""
+    messages = session.get('casual_chat_messages')
+    if messages:
+        messages.pop()
+        session['casual_chat_total'] = len(messages)
+        session.modified = True
+
+
+def _busy_response(error):
+    """429 with Retry-After for a Claude call the scheduler did not admit"""
+    response = jsonify({'error': 'The tutor is busy right now, please try again in a moment'})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
 
 
 # =============================================================================
@@ -28,7 +55,8 @@ def test_claude():
         claude = ClaudeClient()
         response = claude.send_message(
             "Say 'Hello! Claude is working!' in German.",
-            "You are a helpful assistant. Respond briefly."
+            "You are a helpful assistant. Respond briefly.",
+            call_type='test'
         )
 
         return jsonify({
@@ -51,8 +79,10 @@ def test_claude():
 
 @api_bp.route('/casual-chat/chat', methods=['POST'])
 @login_required
+@rate_limited('chat', budget='tokens')
 def casual_chat():
     """Chat API endpoint for casual chat conversation practice."""
+    message_counted = False
     try:
         from services.claude_client import ClaudeClient
         from prompts.prompt_manager import PromptManager
@@ -68,13 +98,13 @@ def casual_chat():
 
         # Log worker process info for debugging
         worker_pid = os.getpid()
-        print(f"[WORKER DEBUG] Process ID: {worker_pid}")
+        logger.debug("Worker process ID: %s", worker_pid)
 
         # Initialize or get Claude client
         if 'claude_client' not in session:
             session['claude_client'] = True
             claude = ClaudeClient()
-            print(f"[WORKER DEBUG] Created NEW ClaudeClient in worker {worker_pid}")
+            logger.debug("Created NEW ClaudeClient in worker %s", worker_pid)
             current_app.claude_clients = getattr(current_app, 'claude_clients', {})
             session_id = session.get('_id', id(session))
             current_app.claude_clients[session_id] = claude
@@ -90,7 +120,7 @@ def casual_chat():
         # Restore conversation history from session (survives across workers)
         if 'claude_conversation_history' in session:
             claude.set_conversation_history(session['claude_conversation_history'])
-            print(f"[SESSION RESTORE] Restored {len(session['claude_conversation_history'])} messages")
+            logger.debug("Restored %d messages from session", len(session['claude_conversation_history']))
 
         # Build dynamic prompt
         system_prompt = None
@@ -111,17 +141,17 @@ def casual_chat():
                 if dynamic_prompt:
                     system_prompt = dynamic_prompt
                     user_context = context
-                    print(f"[INFO] Using dynamic prompt for user {session['user_id']}")
+                    logger.info("Using dynamic prompt for user %s", session['user_id'])
 
             except Exception as e:
-                print(f"[WARNING] Dynamic prompt failed: {e}")
+                logger.warning("Dynamic prompt failed: %s", e)
 
         # Fallback to error prompt
         if not system_prompt:
             prompt_file = os.path.join('prompts', 'fallback_error.yaml')
             prompt_manager = PromptManager(prompt_file)
             system_prompt = prompt_manager.get_prompt('casual_chat_prompt', '')
-            print(f"[WARNING] Using fallback ERROR prompt")
+            logger.warning("Using fallback ERROR prompt")
 
         # Track messages and scoring
         if 'casual_chat_messages' not in session:
@@ -133,15 +163,24 @@ def casual_chat():
         session['casual_chat_messages'].append(message)
         message_count = len(session['casual_chat_messages'])
         session['casual_chat_total'] = message_count
+        message_counted = True
 
         # Send message to Claude
-        response = claude.send_message(message, system_prompt)
+        with span('reply'):
+            response = claude.send_message(message, system_prompt, word_limit=user_context.get('word_limit'))
 
         # Save conversation history to session
         session['claude_conversation_history'] = claude.get_conversation_history()
 
+        # Start synthesising the reply now so it overlaps hint generation
+        reply_audio = None
+        if data.get('speak') and Config.REPLY_AUDIO_ENABLED and 'user_id' in session:
+            with span('reply_audio'):
+                reply_audio = _start_reply_audio(response, user_context.get('target_language'), data)
+
         # Add delay to prevent context bleeding
-        time.sleep(0.5)
+        with span('sleep'):
+            time.sleep(0.5)
 
         # Get number of exchanges from context
         total_exchanges = user_context.get('number_of_exchanges', 5)
@@ -152,6 +191,8 @@ def casual_chat():
             'message_count': message_count,
             'total_messages_required': total_exchanges
         }
+        if reply_audio:
+            response_data['audio'] = reply_audio
 
         feedback_level = user_context.get('level', 'A1').upper()
 
@@ -160,16 +201,19 @@ def casual_chat():
             target_language = user_context.get('target_language', 'german')
             native_language = user_context.get('input_language', 'english')
 
-            hint_data = generate_language_hint(
-                message, claude, feedback_level,
-                target_language=target_language,
-                native_language=native_language
-            )
+            with span('hint'):
+                hint_data = generate_language_hint(
+                    message, claude, feedback_level,
+                    target_language=target_language,
+                    native_language=native_language,
+                    topic_number=user_context.get('topic_number')
+                )
 
             if hint_data and 'type' in hint_data:
                 type_mapping = {'correction': 'error', 'hint': 'warning', 'suggestion': 'warning', 'tip': 'warning'}
                 hint_data['type'] = type_mapping.get(hint_data['type'], hint_data['type'])
-                if hint_data['type'] in ['praise', 'warning']:
+                # A "please repeat" hint means nothing was understood, so it isn't correct
+                if hint_data['type'] in ['praise', 'warning'] and not hint_data.get('repeat'):
                     session['casual_chat_correct'] += 1
 
             response_data['hint'] = hint_data
@@ -179,11 +223,12 @@ def casual_chat():
             target_language = user_context.get('target_language', 'german')
             native_language = user_context.get('input_language', 'english')
 
-            feedback_data = generate_comprehensive_feedback(
-                session['casual_chat_messages'], claude, feedback_level,
-                target_language=target_language,
-                native_language=native_language
-            )
+            with span('feedback'):
+                feedback_data = generate_comprehensive_feedback(
+                    session['casual_chat_messages'], claude, feedback_level,
+                    target_language=target_language,
+                    native_language=native_language
+                )
             response_data['comprehensive_feedback'] = feedback_data
 
         # Mark as complete and save score
@@ -223,9 +268,9 @@ def casual_chat():
                             response_data['exercise_completed'] = result.get('newly_completed', False)
                             response_data['topic_advanced'] = result.get('topic_advanced', False)
 
-                            print(f"[SCORE SAVED] Casual Chat: {score:.1f}%")
+                            logger.info("Score saved - Casual Chat: %.1f%%", score)
                     except Exception as e:
-                        print(f"[ERROR] Saving exercise score: {e}")
+                        logger.error("Saving exercise score: %s", e)
 
             # Clear session for next conversation
             session['casual_chat_messages'] = []
@@ -235,8 +280,19 @@ def casual_chat():
         session.modified = True
         return jsonify(response_data)
 
+    except CircuitOpenError as e:
+        logger.warning("Casual chat API: %s", e)
+        if message_counted:
+            _undo_chat_message()
+        response = jsonify({'error': 'The tutor is temporarily unavailable, please try again shortly'})
+        response.headers['Retry-After'] = str(max(int(e.retry_in), 1))
+        return response, 503
+    except SchedulerBusyError as e:
+        if message_counted:
+            _undo_chat_message()
+        return _busy_response(e)
     except Exception as e:
-        print(f"[ERROR] Casual chat API: {e}")
+        logger.error("Casual chat API: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -255,7 +311,7 @@ def clear_casual_chat():
             session.pop('claude_client', None)
         if 'claude_conversation_history' in session:
             session.pop('claude_conversation_history', None)
-            print("[SESSION CLEAR] Cleared conversation history")
+            logger.debug("Cleared conversation history from session")
 
         if hasattr(current_app, 'claude_clients'):
             current_app.claude_clients = {}
@@ -264,12 +320,13 @@ def clear_casual_chat():
         return jsonify({'status': 'success', 'message': 'Conversation cleared'})
 
     except Exception as e:
-        print(f"[ERROR] Clearing conversation: {e}")
+        logger.error("Clearing conversation: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
 @api_bp.route('/casual-chat/tts', methods=['POST'])
 @login_required
+@rate_limited('tts', budget='tts')
 def casual_chat_tts():
     """Text-to-speech endpoint for casual chat using Minimax."""
     try:
@@ -290,7 +347,14 @@ def casual_chat_tts():
         volume = data.get('vol')
         pitch = data.get('pitch')
 
-        print(f"[TTS REQUEST] Character: {character}, Text length: {len(text)}")
+        logger.debug("TTS request - Character: %s, Text length: %d", character, len(text))
+
+        # Pipelined mode streams one NDJSON line per sentence, in order, as each is ready
+        if data.get('pipelined') and Config.TTS_PIPELINE_ENABLED:
+            return _stream_tts_segments(
+                text, data.get('target_language'), session.get('user_id'),
+                character=character, voice_id=voice_id, speed=speed, volume=volume, pitch=pitch
+            )
 
         success, result = minimax_client.synthesize_speech(
             text=text,
@@ -307,10 +371,101 @@ def casual_chat_tts():
             return jsonify(result), 500
 
     except Exception as e:
-        print(f"[ERROR] TTS endpoint: {e}")
+        logger.error("TTS endpoint: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
+def _start_reply_audio(text, language, data):
+    """
+    Start server-side synthesis of a chat reply, charged like a /casual-chat/tts request
+
+    Returns:
+        {"url", "segments"} for the chat response, or None (the client then requests TTS itself)
+    """
+    from services.reply_audio import start_reply_audio
+
+    user_id = session.get('user_id')
+    if Config.RATE_LIMIT_ENABLED:
+        within, _, _ = check_budget(user_id, 'tts')
+        if not within or take_token('user', 'tts', user_id):
+            REPLY_AUDIO.inc(outcome='skipped')
+            return None
+
+    started = start_reply_audio(
+        text, language, user_id,
+        character=data.get('character'),
+        voice_id=data.get('voice_id'),
+        speed=data.get('speed'),
+        volume=data.get('vol'),
+        pitch=data.get('pitch')
+    )
+    if started is None:
+        return None
+    audio_id, segments = started
+    # Synthesis runs in pool threads; charge the characters to this request up front
+    record_spend(tts_characters=sum(len(segment) for segment in segments))
+    return {'url': url_for('api.casual_chat_audio', audio_id=audio_id), 'segments': len(segments)}
+
+
+@api_bp.route('/casual-chat/audio/<audio_id>', methods=['GET'])
+@login_required
+def casual_chat_audio(audio_id):
+    """Stream server-initiated reply audio (same NDJSON lines as pipelined TTS)."""
+    from services.reply_audio import get_reply_audio_segments, iter_reply_audio
+
+    segments = get_reply_audio_segments(audio_id, session.get('user_id'))
+    if segments is None:
+        return jsonify({'error': 'Audio not found or expired'}), 404
+
+    def generate():
+        for line in iter_reply_audio(audio_id, segments):
+            yield json.dumps(line) + '\n'
+        yield json.dumps({'done': True}) + '\n'
+
+    return _ndjson_response(generate())
+
+
+def _ndjson_response(lines):
+    """Unbuffered application/x-ndjson response streaming `lines`"""
+    response = Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def _stream_tts_segments(text, language, user_id, **voice):
+    """
+    Stream a reply's audio sentence by sentence as application/x-ndjson
+
+    Each line is {"index", "count", "text", "audio_data", "format"} or
+    {"index", "count", "text", "error"}; the last line is {"done": true}.
+    """
+    from services.minimax_client import minimax_client
+    from services.tts_pipeline import plan_segments, synthesize_pipelined
+
+    segments = plan_segments(text, language)
+    logger.debug("Pipelined TTS: %d segments", len(segments))
+
+    def generate():
+        characters = 0
+        try:
+            for index, segment, success, result in synthesize_pipelined(segments, minimax_client, **voice):
+                line = {'index': index, 'count': len(segments), 'text': segment}
+                if success:
+                    characters += len(segment)
+                    line.update(audio_data=result['audio_data'], format=result['format'])
+                else:
+                    line['error'] = result.get('error', 'Synthesis failed')
+                yield json.dumps(line) + '\n'
+            yield json.dumps({'done': True}) + '\n'
+        finally:
+            # Segments are synthesised in pool threads, after the rate limiter flushed this request
+            record_spend(tts_characters=characters)
+            flush_spend(user_id)
+
+    return _ndjson_response(generate())
+
+
 @api_bp.route('/casual-chat/scenario', methods=['GET'])
 @login_required
 def get_chat_scenario():
@@ -328,14 +483,24 @@ def get_chat_scenario():
         scenario_manager = ScenarioManager()
         scenario_text, context = scenario_manager.get_scenario_for_user(user_id, character, topic_override)
 
-        return jsonify({
+        payload = {
             'scenario': scenario_text,
             'context': context,
             'status': 'success'
-        })
+        }
+
+        # Strong ETag over the exact payload; unchanged scenarios revalidate with a 304
+        etag = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()[:32]
+
+        response = jsonify(payload)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
 
     except Exception as e:
-        print(f"[ERROR] Fetching scenario: {e}")
+        logger.error("Fetching scenario: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -348,9 +513,8 @@ def get_chat_scenario():
 def get_user_progress():
     """Get current user's progress for the active language pair."""
     try:
-        from progress.exercise_progress_manager import ExerciseProgressManager
         from topics.topic_manager import TopicManager
-        from tests.test_manager import TestManager
+        from progress.progression_engine import get_progression_engine
 
         user_id = session.get('user_id')
         if not user_id:
@@ -360,29 +524,26 @@ def get_user_progress():
         target_lang = request.args.get('target_language')
 
         progress_manager = ProgressManager()
-        exercise_manager = ExerciseProgressManager()
         topic_manager = TopicManager()
-        test_manager = TestManager()
 
         user_progress = progress_manager.get_user_progress(user_id, input_lang, target_lang)
 
         if not user_progress:
             return jsonify({'error': 'No progress found for this language pair'}), 404
 
+        # One snapshot answers every topic/exercise/test lookup below
+        engine = get_progression_engine(user_progress.id)
+
         topics = topic_manager.get_all_topics_for_level(user_progress.current_level)
-        all_topic_progress = topic_manager.get_user_topic_progress(user_progress.id, user_progress.current_level)
 
         topic_progress_list = []
         completed_topics = []
 
-        completed_topics_nums = [tp.topic_number for tp in all_topic_progress if tp.completed]
-        max_accessible_topic = max(completed_topics_nums) + 1 if completed_topics_nums else user_progress.current_topic
+        max_accessible_topic = engine.max_accessible_topic()
 
         for topic in topics:
-            topic_progress = next((tp for tp in all_topic_progress if tp.topic_number == topic.topic_number), None)
-            exercise_status = exercise_manager.get_topic_exercises_status(
-                user_progress.id, user_progress.current_level, topic.topic_number
-            )
+            topic_progress = engine.get_topic_progress(topic.topic_number)
+            exercise_status = engine.exercise_status(user_progress.current_level, topic.topic_number)
 
             is_completed = topic_progress.completed if topic_progress else False
             is_current = (topic.topic_number == user_progress.current_topic)
@@ -410,7 +571,7 @@ def get_user_progress():
         ]
 
         for test_config in test_configs:
-            test_progress = test_manager.get_test_progress(user_progress.id, test_config['type'])
+            test_progress = engine.get_test(test_config['type'])
             required_topics = list(range(test_config['after_topic'] - 2, test_config['after_topic'] + 1))
             is_unlocked = all(t in completed_topics for t in required_topics)
 
@@ -445,7 +606,7 @@ def get_user_progress():
         })
 
     except Exception as e:
-        print(f"[ERROR] Getting user progress: {e}")
+        logger.error("Getting user progress: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -481,7 +642,7 @@ def check_completion_popup():
             return jsonify({'show_popup': False}), 200
 
     except Exception as e:
-        print(f"[ERROR] Checking completion popup: {e}")
+        logger.error("Checking completion popup: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -519,7 +680,7 @@ def mark_popup_seen():
             return jsonify({'error': message}), 400
 
     except Exception as e:
-        print(f"[ERROR] Marking popup seen: {e}")
+        logger.error("Marking popup seen: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -557,7 +718,7 @@ def navigate_to_topic():
             return jsonify({'error': result.get('error', 'Navigation failed')}), 400
 
     except Exception as e:
-        print(f"[ERROR] Navigating to topic: {e}")
+        logger.error("Navigating to topic: %s", e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -567,6 +728,7 @@ def navigate_to_topic():
 
 @api_bp.route('/writing-practice/generate', methods=['POST'])
 @login_required
+@rate_limited('generate', budget='tokens')
 def generate_email_letter():
     """Generate a letter for the email writing exercise."""
     try:
@@ -608,15 +770,16 @@ def generate_email_letter():
         else:
             return jsonify(result), 500
 
+    except SchedulerBusyError as e:
+        return _busy_response(e)
     except Exception as e:
-        print(f"[ERROR] Generating letter: {e}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Generating letter: %s", e)
         return jsonify({'error': f'Failed to generate letter: {str(e)}'}), 500
 
 
 @api_bp.route('/writing-practice/submit', methods=['POST'])
 @login_required
+@rate_limited('submit', budget='tokens')
 def submit_email_response():
     """Submit and evaluate a response for the email writing exercise."""
     try:
@@ -678,17 +841,17 @@ def submit_email_response():
                         result['exercise_completed'] = db_result.get('newly_completed', False)
                         result['topic_advanced'] = db_result.get('topic_advanced', False)
 
-                        print(f"[SCORE SAVED] Email Writing: {result['score']}%")
+                        logger.info("Score saved - Email Writing: %s%%", result['score'])
 
                 except Exception as e:
-                    print(f"[ERROR] Saving email writing score: {e}")
+                    logger.error("Saving email writing score: %s", e)
 
             return jsonify(result)
         else:
             return jsonify(result), 500
 
+    except SchedulerBusyError as e:
+        return _busy_response(e)
     except Exception as e:
-        print(f"[ERROR] Evaluating response: {e}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Evaluating response: %s", e)
         return jsonify({'error': f'Failed to evaluate response: {str(e)}'}), 500
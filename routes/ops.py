@@ -0,0 +1,100 @@
+"""
+Operations routes blueprint.
+Handles monitoring endpoints such as /healthz, /readyz, /metrics and /ops/profiles.
+"""
+
+import hmac
+
+from flask import Blueprint, Response, request, jsonify, abort
+
+from config import Config
+
+
+ops_bp = Blueprint('ops', __name__)
+
+
+@ops_bp.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is serving requests (no dependency checks)."""
+    return jsonify({'status': 'ok'})
+
+
+@ops_bp.route('/readyz', methods=['GET'])
+def readyz():
+    """
+    Readiness: warm-up finished and dependencies answer in time.
+
+    Returns 503 until then so the load balancer keeps cold or degraded
+    instances out of rotation (see observability/health.py).
+    """
+    from observability.health import check_readiness
+    from warmup import is_warm
+
+    ready, report = check_readiness(is_warm())
+    return jsonify(report), 200 if ready else 503
+
+
+@ops_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus metrics for all workers.
+
+    Requires METRICS_TOKEN as bearer token when set. In production, without
+    a token configured, the endpoint is not served at all.
+    """
+    from observability.metrics import render_prometheus, flush
+
+    if Config.METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied, Config.METRICS_TOKEN):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    elif Config.IS_PRODUCTION:
+        abort(404)
+
+    # Publish our own counts first so other workers' scrapes stay current too
+    flush(force=True)
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _require_profiler_token():
+    """Profiles expose code paths; they are only served with PROFILER_TOKEN as bearer token."""
+    if not Config.PROFILER_TOKEN:
+        abort(404)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(supplied, Config.PROFILER_TOKEN):
+        abort(401)
+
+
+@ops_bp.route('/ops/profiles', methods=['GET'])
+def profiles():
+    """Stored request profiles per route (see observability/profiler.py)."""
+    from observability.profiler import list_profiles
+
+    _require_profiler_token()
+    return jsonify({'profile_dir': Config.PROFILER_DIR, 'routes': list_profiles()})
+
+
+@ops_bp.route('/ops/profiles/flamegraph', methods=['GET'])
+def profile_flamegraph():
+    """
+    Merged flamegraph for one route.
+
+    Query args: route (URL rule, required), format (folded|speedscope), limit (newest N profiles)
+    """
+    from observability.profiler import aggregate_stacks, to_folded, to_speedscope
+
+    _require_profiler_token()
+    route = request.args.get('route')
+    if not route:
+        return jsonify({'error': 'route is required'}), 400
+
+    stacks, used = aggregate_stacks(route, request.args.get('limit', type=int))
+    if not stacks:
+        return jsonify({'error': f'No profiles recorded for {route}'}), 404
+
+    if request.args.get('format', 'folded') == 'speedscope':
+        response = Response(to_speedscope(stacks, f'{route} ({used} profiles)'), mimetype='application/json')
+    else:
+        response = Response(to_folded(stacks), mimetype='text/plain; charset=utf-8')
+    response.headers['X-Profiles-Merged'] = str(used)
+    return response
@@ -4,6 +4,47 @@
 from typing import Dict, Optional, Tuple
 from topics.topic_manager import TopicManager
 from progress.progress_manager import ProgressManager
+from logging_config import get_logger
+from observability.timing import timed
+from observability.metrics import record_cache
+
+logger = get_logger('scenarios')
+
+
+# Language name translations
+# Used to translate the {target_language} placeholder in scenarios
+# Each language has translations for all target languages
+LANGUAGE_TRANSLATIONS = {
+    'english': {
+        'german': 'German',
+        'spanish': 'Spanish',
+        'portuguese': 'Portuguese',
+        'english': 'English'
+    },
+    'german': {
+        'german': 'Deutsch',
+        'spanish': 'Spanisch',
+        'portuguese': 'Portugiesisch',
+        'english': 'Englisch'
+    },
+    'spanish': {
+        'german': 'Alemán',
+        'spanish': 'Español',
+        'portuguese': 'Portugués',
+        'english': 'Inglés'
+    },
+    'portuguese': {
+        'german': 'Alemão',
+        'spanish': 'Espanhol',
+        'portuguese': 'Português',
+        'english': 'Inglês'
+    }
+}
+
+# Precomputed scenarios keyed by (level, topic_number, input_language, target_language).
+# None until built; a value of None inside means the topic has no template.
+_scenario_table = None
+
 
 class ScenarioManager:
     """Manages scenario generation and translation for conversation practice"""
@@ -13,36 +54,9 @@ class ScenarioManager:
         self.topic_manager = TopicManager()
         self.progress_manager = ProgressManager()
 
-        # Language name translations
-        # Used to translate the {target_language} placeholder in scenarios
-        # Each language has translations for all target languages
-        self.language_translations = {
-            'english': {
-                'german': 'German',
-                'spanish': 'Spanish',
-                'portuguese': 'Portuguese',
-                'english': 'English'
-            },
-            'german': {
-                'german': 'Deutsch',
-                'spanish': 'Spanisch',
-                'portuguese': 'Portugiesisch',
-                'english': 'Englisch'
-            },
-            'spanish': {
-                'german': 'Alemán',
-                'spanish': 'Español',
-                'portuguese': 'Portugués',
-                'english': 'Inglés'
-            },
-            'portuguese': {
-                'german': 'Alemão',
-                'spanish': 'Espanhol',
-                'portuguese': 'Português',
-                'english': 'Inglês'
-            }
-        }
+        self.language_translations = LANGUAGE_TRANSLATIONS
 
+    @timed('scenario')
     def get_scenario_for_user(self, user_id: int, character: str = 'harry', topic_override: int = None) -> Tuple[str, Dict]:
         """
         Get a translated scenario for the user's current topic and language pair
@@ -70,21 +84,21 @@ class ScenarioManager:
             # Use topic override if provided, otherwise determine current topic
             if topic_override:
                 topic_number = topic_override
-                print(f"[INFO] ScenarioManager: Using topic override: Topic {topic_override}")
+                logger.info("ScenarioManager: Using topic override: Topic %s", topic_override)
             else:
                 # Determine current topic (next uncompleted)
                 topic_number = self._determine_current_topic(user_progress.id, level)
 
-            # Get scenario template from database in user's native language
-            print(f"[DEBUG] ScenarioManager: Fetching scenario for level={level}, topic={topic_number}, language={input_language}")
-            scenario_template = self.topic_manager.get_scenario_template(
-                level, topic_number, language=input_language
+            # Look up the precomputed scenario (already translated into the user's native language)
+            logger.debug("ScenarioManager: Fetching scenario for level=%s, topic=%s, language=%s", level, topic_number, input_language)
+            translated_scenario = self.get_precomputed_scenario(
+                level, topic_number, input_language, target_language
             )
-            print(f"[DEBUG] ScenarioManager: Scenario template received: {'YES' if scenario_template else 'NO (None)'}")
+            logger.debug("ScenarioManager: Scenario template received: %s", 'YES' if translated_scenario else 'NO (None)')
 
-            if not scenario_template:
+            if not translated_scenario:
                 # No scenario for this topic yet, use default
-                print(f"[WARNING] ScenarioManager: No scenario template found, using default fallback")
+                logger.warning("ScenarioManager: No scenario template found, using default fallback")
                 return self._get_default_scenario_for_topic(
                     input_language, target_language, level, topic_number
                 ), {
@@ -94,13 +108,6 @@ class ScenarioManager:
                     'target_language': target_language
                 }
 
-            # Process the scenario template (only replace placeholder)
-            translated_scenario = self._translate_scenario(
-                scenario_template,
-                input_language,
-                target_language
-            )
-
             # Return scenario with context
             context = {
                 'level': level,
@@ -113,9 +120,82 @@ class ScenarioManager:
             return translated_scenario, context
 
         except Exception as e:
-            print(f"[ERROR] ScenarioManager.get_scenario_for_user: {e}")
+            logger.error("ScenarioManager.get_scenario_for_user: %s", e)
             return self._get_default_scenario(), {}
 
+    @classmethod
+    def load_scenario_table(cls) -> int:
+        """
+        Precompute every translated scenario from the topic definitions
+
+        Scenarios only depend on (level, topic, input_language, target_language),
+        so they are rendered once per process instead of on every page load.
+        Call again after changing topic definitions to pick up new templates.
+
+        Returns:
+            Number of entries in the table (0 if it could not be built)
+        """
+        global _scenario_table
+        from database import db
+        from models.topic_definition import TopicDefinition
+
+        try:
+            manager = cls()
+            table = {}
+            for topic in db.session.query(TopicDefinition).all():
+                for input_language in LANGUAGE_TRANSLATIONS:
+                    template = TopicManager.select_scenario_template(topic, input_language)
+                    for target_language in LANGUAGE_TRANSLATIONS:
+                        key = (topic.level, topic.topic_number, input_language, target_language)
+                        table[key] = manager._translate_scenario(
+                            template, input_language, target_language
+                        ) if template else None
+
+            # An empty table usually means topics aren't populated yet; retry on next use
+            _scenario_table = table or None
+            logger.info("ScenarioManager: Precomputed %s scenarios", len(table))
+            return len(table)
+
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("ScenarioManager: Could not precompute scenarios: %s", e)
+            return 0
+
+    def get_precomputed_scenario(
+        self, level: str, topic_number: int, input_language: str, target_language: str
+    ) -> Optional[str]:
+        """
+        Get a translated scenario from the precomputed table
+
+        Combinations outside the table (unknown languages, topics added after
+        startup) fall back to loading and translating the template directly.
+
+        Args:
+            level: Current level
+            topic_number: Topic number
+            input_language: User's native language
+            target_language: Language they're learning
+
+        Returns:
+            Translated scenario or None if the topic has no template
+        """
+        if _scenario_table is None:
+            self.load_scenario_table()
+
+        key = (level, topic_number, input_language, target_language)
+        if _scenario_table is not None and key in _scenario_table:
+            record_cache('scenario_table', True)
+            return _scenario_table[key]
+
+        record_cache('scenario_table', False)
+
+        scenario_template = self.topic_manager.get_scenario_template(
+            level, topic_number, language=input_language
+        )
+        if not scenario_template:
+            return None
+        return self._translate_scenario(scenario_template, input_language, target_language)
+
     def _translate_scenario(self, template: str, input_language: str, target_language: str) -> str:
         """
         Process a scenario template by replacing the {target_language} placeholder
@@ -153,31 +233,11 @@ class ScenarioManager:
             Topic number (1-12)
         """
         try:
-            # Get all topic progress for this user
-            from models.topic_progress import TopicProgress
-            all_progress = TopicProgress.query.filter_by(
-                user_progress_id=user_progress_id
-            ).all()
-
-            if not all_progress:
-                # No progress yet, start with topic 1
-                return 1
-
-            # Find the first uncompleted topic
-            for topic_num in range(1, 13):  # Topics 1-12
-                topic_progress = next(
-                    (tp for tp in all_progress if tp.topic_number == topic_num),
-                    None
-                )
-
-                if not topic_progress or not topic_progress.completed:
-                    return topic_num
-
-            # All topics completed, cycle back to 1
-            return 1
+            from progress.progression_engine import get_progression_engine
+            return get_progression_engine(user_progress_id).first_uncompleted_topic()
 
         except Exception as e:
-            print(f"[WARNING] Could not determine current topic: {e}")
+            logger.warning("Could not determine current topic: %s", e)
             return 1
 
     def _get_default_scenario(self) -> str:
@@ -3,27 +3,77 @@ import re
 import time
 from typing import List, Dict, Optional, Tuple
 
+from config import Config
+from logging_config import get_logger
+from observability.timing import span
+from observability.metrics import CLAUDE_REQUESTS, CLAUDE_DURATION, CLAUDE_TOKENS
+from services.model_routing import resolve_route
+from services.resilience import ResilientCaller, CircuitOpenError
+from services.llm_scheduler import scheduler, SchedulerBusyError
+from services.single_flight import get_flight, fingerprint
+from services.spend_ledger import record_spend
+
+logger = get_logger('claude')
+
+
+def is_retryable_error(error) -> bool:
+    """Connection problems, timeouts, 408/409/429 and 5xx (incl. 529 overloaded) are transient."""
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+# Shared by all ClaudeClient instances in this worker (see services/resilience.py)
+resilient_caller = ResilientCaller('claude', is_retryable_error)
+
+# Identical concurrent calls of these types share one request (see services/single_flight.py);
+# conversation replies are per learner and never identical
+SINGLE_FLIGHT_CALL_TYPES = ('hint', 'letter', 'evaluation', 'feedback')
+claude_flight = get_flight('claude')
+
+
+def _encode_response(response):
+    return response.model_dump(mode='json')
+
+
+def _decode_response(data):
+    return anthropic.types.Message.model_validate(data)
+
 
 class ClaudeClient:
     """Handles all interactions with the Anthropic Claude API."""
     
-    def __init__(self, model: str = "claude-3-haiku-20240307", max_tokens: int = 3000, temperature: float = 1.0):
+    def __init__(self, model: Optional[str] = None, max_tokens: Optional[int] = None,
+                 temperature: Optional[float] = None):
         """
         Initialize the Claude client.
-        
+
+        Unset parameters come from the per-call-type routing policy
+        (services/model_routing.py); set ones apply to every call.
+
         Args:
             model: Claude model to use
             max_tokens: Maximum tokens for responses
             temperature: Temperature for response generation
         """
-        self.client = anthropic.Anthropic()
+        # base_url lets load tests point the client at a local fake server.
+        # Retries are handled by resilient_caller, not the SDK.
+        if Config.ANTHROPIC_BASE_URL:
+            self.client = anthropic.Anthropic(base_url=Config.ANTHROPIC_BASE_URL,
+                                              max_retries=0, timeout=Config.CLAUDE_TIMEOUT)
+        else:
+            self.client = anthropic.Anthropic(max_retries=0, timeout=Config.CLAUDE_TIMEOUT)
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
         self.conversation_history: List[Dict[str, str]] = []
         self.enable_tools = False  # Simplified version - no tools for now
+        self.last_usage: Dict[str, int] = {}
         
-    def send_message(self, user_input: str, system_prompt: str = '', context=None) -> str:
+    def send_message(self, user_input: str, system_prompt: str = '', context=None,
+                     call_type: str = 'reply', word_limit: Optional[int] = None) -> str:
         """
         Send a message to Claude and get a response.
 
@@ -31,17 +81,22 @@ class ClaudeClient:
             user_input: The user's message
             system_prompt: System prompt to use for the conversation
             context: Optional context (not used in simplified version)
+            call_type: Routing policy and metrics label (reply/hint/feedback/letter/evaluation)
+            word_limit: Topic word limit, sizes the output budget of replies
 
         Returns:
             Claude's response text
 
         Raises:
+            CircuitOpenError: Claude is failing and calls are short-circuited
+            SchedulerBusyError: Too many queued calls of this type (see services/llm_scheduler.py)
             Exception: If there's an error communicating with the API
         """
         # Log conversation history state BEFORE sending
-        print(f"[CLAUDE CLIENT] send_message() called with user_input length: {len(user_input)}")
-        print(f"[CLAUDE CLIENT] Current conversation_history length: {len(self.conversation_history)}")
-        print(f"[CLAUDE CLIENT] ClaudeClient object ID: {id(self)}")
+        logger.debug(
+            "send_message() user_input length: %d, history length: %d, client id: %d",
+            len(user_input), len(self.conversation_history), id(self)
+        )
 
         # Prepare messages
         messages_to_send = self.conversation_history.copy()
@@ -52,17 +107,67 @@ class ClaudeClient:
             "content": user_input
         })
 
-        print(f"[CLAUDE CLIENT] Sending {len(messages_to_send)} messages to Claude API")
+        logger.debug("Sending %d messages to Claude API", len(messages_to_send))
         
         try:
             # Send request to Claude
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                system=system_prompt,
-                messages=messages_to_send
-            )
+            start = time.perf_counter()
+            outcome = 'error'
+            route = resolve_route(call_type, word_limit)
+            request_params = {
+                'model': self.model or route['model'],
+                'max_tokens': self.max_tokens or route['max_tokens'],
+                'temperature': route['temperature'] if self.temperature is None else self.temperature,
+            }
+            if route['stop_sequences']:
+                request_params['stop_sequences'] = route['stop_sequences']
+
+            # Hints are short and idempotent: a tighter timeout and optional hedging
+            is_hint = call_type == 'hint'
+            timeout = Config.CLAUDE_HINT_TIMEOUT if is_hint else Config.CLAUDE_TIMEOUT
+            hedge_after = Config.HINT_HEDGE_AFTER_MS / 1000.0 if is_hint and Config.HINT_HEDGE_AFTER_MS > 0 else None
+            def call():
+                # Callers sharing a single-flight result don't take a scheduler slot
+                with scheduler.slot(call_type):
+                    return resilient_caller.call(
+                        lambda: self.client.messages.create(
+                            **request_params,
+                            system=system_prompt,
+                            messages=messages_to_send,
+                            timeout=timeout
+                        ),
+                        hedge_after=hedge_after
+                    )
+
+            shared = False
+            try:
+                with span('claude_api'):
+                    if call_type == 'hint':
+                        # A hint depends on the analysed message (in the system prompt and user_input),
+                        # not on the learner's conversation history - the hint cache makes the same
+                        # assumption - so learners sending the same line share one call
+                        key = fingerprint(call_type, request_params, system_prompt, user_input)
+                        response, shared = claude_flight.do(key, call, _encode_response, _decode_response)
+                    elif call_type in SINGLE_FLIGHT_CALL_TYPES:
+                        key = fingerprint(call_type, request_params, system_prompt, messages_to_send)
+                        response, shared = claude_flight.do(key, call, _encode_response, _decode_response)
+                    else:
+                        response = call()
+                outcome = 'shared' if shared else 'ok'
+            except CircuitOpenError:
+                outcome = 'circuit_open'
+                raise
+            except SchedulerBusyError:
+                outcome = 'rejected'
+                raise
+            finally:
+                CLAUDE_DURATION.observe(time.perf_counter() - start, call_type=call_type)
+                CLAUDE_REQUESTS.inc(call_type=call_type, outcome=outcome)
+            if shared:
+                # A shared response's tokens were counted by the caller that made the request
+                self.last_usage = {}
+            else:
+                self._record_usage(response, call_type)
             
             # Extract response text
             assistant_message = response.content[0].text
@@ -77,24 +182,44 @@ class ClaudeClient:
                 "content": assistant_message
             })
 
-            print(f"[CLAUDE CLIENT] Added user + assistant messages to history")
-            print(f"[CLAUDE CLIENT] New conversation_history length: {len(self.conversation_history)}")
+            logger.debug("Added user + assistant messages, history length: %d", len(self.conversation_history))
 
             # Keep conversation history manageable (last 20 messages)
             if len(self.conversation_history) > 20:
                 self.conversation_history = self.conversation_history[-20:]
-                print(f"[CLAUDE CLIENT] Trimmed history to last 20 messages")
+                logger.debug("Trimmed history to last 20 messages")
 
             return assistant_message
             
         except Exception as e:
-            print(f"[ERROR] [CLAUDE CLIENT] Error sending message: {e}")
+            logger.error("Error sending message: %s", e)
             raise e
+
+    def _record_usage(self, response, call_type: str):
+        """Keep the response's token usage and add it to the token counters."""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            self.last_usage = {}
+            return
+
+        self.last_usage = {
+            'input': getattr(usage, 'input_tokens', 0) or 0,
+            'output': getattr(usage, 'output_tokens', 0) or 0,
+            'cache_read': getattr(usage, 'cache_read_input_tokens', 0) or 0,
+            'cache_creation': getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        }
+        for kind, tokens in self.last_usage.items():
+            if tokens:
+                CLAUDE_TOKENS.inc(tokens, call_type=call_type, kind=kind)
+        record_spend(
+            input_tokens=self.last_usage['input'] + self.last_usage['cache_read'] + self.last_usage['cache_creation'],
+            output_tokens=self.last_usage['output']
+        )
     
     def clear_conversation_history(self):
         """Clear the conversation history."""
         self.conversation_history = []
-        print("[CLAUDE CLIENT] Conversation history cleared")
+        logger.debug("Conversation history cleared")
     
     def get_conversation_history(self) -> List[Dict[str, str]]:
         """Get the current conversation history."""
@@ -103,17 +228,17 @@ class ClaudeClient:
     def set_conversation_history(self, history: List[Dict[str, str]]):
         """Set the conversation history from external source (e.g., session)."""
         self.conversation_history = history.copy()
-        print(f"[CLAUDE CLIENT] Conversation history restored: {len(self.conversation_history)} messages")
+        logger.debug("Conversation history restored: %d messages", len(self.conversation_history))
 
-    def set_model(self, model: str):
-        """Change the Claude model being used."""
+    def set_model(self, model: Optional[str]):
+        """Change the Claude model being used (None restores per-call-type routing)."""
         self.model = model
-        print(f"[INFO] [CLAUDE CLIENT] Model changed to: {model}")
+        logger.info("Model changed to: %s", model)
     
-    def set_temperature(self, temperature: float):
-        """Change the temperature setting."""
+    def set_temperature(self, temperature: Optional[float]):
+        """Change the temperature setting (None restores per-call-type routing)."""
         self.temperature = temperature
-        print(f"[TEMP] [CLAUDE CLIENT] Temperature changed to: {temperature}")
+        logger.debug("Temperature changed to: %s", temperature)
     
     def set_tools_enabled(self, enabled: bool):
         """
@@ -2,9 +2,33 @@
 # Enhanced with dynamic language support
 
 import json
+import logging
+import os
 import re
+import yaml
 from typing import List, Dict, Any, Optional
 from prompts.feedback_prompts import FeedbackPromptBuilder
+from services.hint_cache import get_cached_hint, store_hint, normalise_message, strip_fillers
+from observability.metrics import HINTS
+from logging_config import get_logger
+
+hint_logger = get_logger('hints')
+feedback_logger = get_logger('feedback')
+
+PRESCREEN_PHRASES_FILE = os.path.join('prompts', 'templates', 'hint_prescreen.yaml')
+A1_SCRIPTS_FILE = os.path.join('prompts', 'templates', 'a1_topic_scripts.yaml')
+
+# Scripted lines in a1_topic_scripts.yaml, e.g.  - German: "Hallo! Ich bin Harry."
+_SCRIPT_LINE = re.compile(r'^\s*-\s*(German|Spanish|Portuguese|English):\s*"(.+)"\s*$', re.MULTILINE)
+_SCRIPT_TOPIC = re.compile(r'^topic_(\d+)_', re.MULTILINE)
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_NAME_SLOT = 'namex'
+
+# Parsed pre-screen data shared by every request in the process
+_prescreen_data = {}
+
+# Ordered (name, screen) pairs; see register_prescreen()
+HINT_PRESCREENS = []
 
 def clean_json_response(json_str):
     """
@@ -43,8 +67,178 @@ def get_message_requirement(user_level):
     }
     return requirements.get(user_level.lower() if user_level else 'intermediate', 6)
 
+def _name_pattern(template):
+    """Compile a normalised phrase whose name slot matches any single word"""
+    return re.compile(template.replace(_NAME_SLOT, r'\w+').replace('{name}', r'\w+'))
+
+
+def load_prescreen_data():
+    """
+    Parse the pre-screen phrase lists and the A1 scripted lines into the shared cache
+
+    Returns:
+        Number of phrases and patterns loaded
+    """
+    if _prescreen_data:
+        return _prescreen_data['size']
+
+    with open(PRESCREEN_PHRASES_FILE, 'r', encoding='utf-8') as file:
+        phrases = yaml.safe_load(file) or {}
+
+    greetings = {language: {normalise_message(phrase) for phrase in items}
+                 for language, items in (phrases.get('greetings') or {}).items()}
+    name_patterns = {language: [_name_pattern(pattern) for pattern in items]
+                     for language, items in (phrases.get('name_patterns') or {}).items()}
+
+    # (language, topic number) -> set of normalised sentences / name-slot patterns
+    scripted, scripted_patterns = {}, {}
+    with open(A1_SCRIPTS_FILE, 'r', encoding='utf-8') as file:
+        scripts = file.read()
+    topics = [(match.start(), int(match.group(1))) for match in _SCRIPT_TOPIC.finditer(scripts)]
+    for match in _SCRIPT_LINE.finditer(scripts):
+        topic_number = max((number for start, number in topics if start < match.start()), default=0)
+        key = (match.group(1).lower(), topic_number)
+        for sentence in _SENTENCE_END.split(match.group(2).replace('[name]', _NAME_SLOT)):
+            text = normalise_message(sentence)
+            if not text:
+                continue
+            if _NAME_SLOT in text:
+                scripted_patterns.setdefault(key, []).append(_name_pattern(text))
+            else:
+                scripted.setdefault(key, set()).add(text)
+
+    _prescreen_data.update(
+        greetings=greetings, name_patterns=name_patterns, scripted=scripted,
+        scripted_patterns=scripted_patterns, praise=phrases.get('praise') or {},
+        repeat=phrases.get('repeat') or {}
+    )
+    _prescreen_data['size'] = (
+        sum(len(items) for items in greetings.values())
+        + sum(len(items) for items in name_patterns.values())
+        + sum(len(items) for items in scripted.values())
+        + sum(len(items) for items in scripted_patterns.values())
+    )
+    return _prescreen_data['size']
+
+
+def register_prescreen(name):
+    """
+    Register a local pre-screen that runs before the hint cache and Claude
+
+    A screen receives the pre-screen context (see prescreen_hint) and returns
+    a hint dict when it is certain about the message, or None to pass it on.
+    Screens run in registration order and the first hint wins.
+    """
+    def decorator(screen):
+        HINT_PRESCREENS.append((name, screen))
+        return screen
+    return decorator
+
+
+def _localized(kind, native_language):
+    texts = _prescreen_data[kind]
+    return texts.get((native_language or '').lower()) or texts.get('english', '')
+
+
+def _praise(context):
+    return {
+        'type': 'praise',
+        'phrase': context['message'].strip(),
+        'hint': _localized('praise', context['native_language']),
+        'category': 'vocabulary'
+    }
+
+
+@register_prescreen('noise')
+def screen_noise(context):
+    """Empty or filler-only STT output: ask the learner to repeat"""
+    if sum(char.isalpha() for char in context['text']) >= 2:
+        return None
+    return {
+        'type': 'warning',
+        'phrase': '',
+        'hint': _localized('repeat', context['native_language']),
+        'category': 'speaking',
+        'repeat': True
+    }
+
+
+@register_prescreen('greeting')
+def screen_greeting(context):
+    """Greetings and introductions the hint prompt lists as always correct"""
+    language, text = context['target_language'], context['text']
+    if text in _prescreen_data['greetings'].get(language, ()):
+        return _praise(context)
+    if any(pattern.fullmatch(text) for pattern in _prescreen_data['name_patterns'].get(language, ())):
+        return _praise(context)
+    return None
+
+
+@register_prescreen('scripted')
+def screen_scripted(context):
+    """A sentence from the A1 topic scripts (the current topic if known)"""
+    if context['level'] != 'A1':
+        return None
+    language, text = context['target_language'], context['text']
+    keys = [key for key in _prescreen_data['scripted_patterns'].keys() | _prescreen_data['scripted'].keys()
+            if key[0] == language and context['topic_number'] in (None, key[1])]
+    for key in keys:
+        if text in _prescreen_data['scripted'].get(key, ()):
+            return _praise(context)
+        if any(pattern.fullmatch(text) for pattern in _prescreen_data['scripted_patterns'].get(key, ())):
+            return _praise(context)
+    return None
+
+
+@register_prescreen('vocabulary')
+def screen_vocabulary(context):
+    """The message is exactly one of the topic's required vocabulary phrases"""
+    if context['topic_number'] is None:
+        return None
+    from topics.topic_manager import TopicManager
+    vocabulary = TopicManager().get_required_vocabulary(context['level'], context['topic_number'])
+    if any(strip_fillers(normalise_message(phrase)) == context['text'] for phrase in vocabulary or ()):
+        return _praise(context)
+    return None
+
+
+def prescreen_hint(message, user_level, target_language, native_language, topic_number=None):
+    """
+    Resolve obvious messages locally before the hint cache and Claude
+
+    Args:
+        message: The user's message
+        user_level: CEFR level (A1, A2, B1, B2)
+        target_language: The language being learned
+        native_language: The user's native language
+        topic_number: Current topic, if known
+
+    Returns:
+        Tuple of (screen name, hint dict), or (None, None) to escalate
+    """
+    try:
+        load_prescreen_data()
+    except (OSError, yaml.YAMLError) as e:
+        hint_logger.warning("Hint pre-screen disabled, phrases not loaded: %s", e)
+        return None, None
+
+    context = {
+        'message': message or '',
+        'text': strip_fillers(normalise_message(message)),
+        'level': (user_level or '').upper(),
+        'target_language': (target_language or '').lower(),
+        'native_language': (native_language or '').lower(),
+        'topic_number': int(topic_number) if topic_number is not None else None
+    }
+    for name, screen in HINT_PRESCREENS:
+        hint = screen(context)
+        if hint is not None:
+            return name, hint
+    return None, None
+
+
 def generate_language_hint(message, claude_client, user_level='intermediate',
-                         target_language='german', native_language='english'):
+                         target_language='german', native_language='english', topic_number=None):
     """
     Generate a language hint based on the user's message.
 
@@ -54,50 +248,68 @@ def generate_language_hint(message, claude_client, user_level='intermediate',
         user_level: The user's proficiency level
         target_language: The language being learned
         native_language: The user's native language
+        topic_number: The current topic, used by the local pre-screens
 
     Returns:
         Dict with hint information
     """
-    print(f"[TARGET] [HINT GENERATION] Starting hint generation for message: '{message[:50]}...'")
-    print(f"[TARGET] [HINT GENERATION] User level: {user_level}")
-    print(f"[TARGET] [HINT GENERATION] Target language: {target_language}, Native language: {native_language}")
-    print(f"[TARGET] [HINT GENERATION] Claude client tools enabled: {getattr(claude_client, 'enable_tools', 'unknown')}")
+    # Previews are sliced only when DEBUG records can actually be emitted
+    debug_enabled = hint_logger.isEnabledFor(logging.DEBUG)
+    if debug_enabled:
+        hint_logger.debug(
+            "Starting hint generation for message: '%s...' (level: %s, target: %s, native: %s, tools: %s)",
+            message[:50], user_level, target_language, native_language,
+            getattr(claude_client, 'enable_tools', 'unknown')
+        )
+
+    # Greetings, scripted answers and noise are resolved without calling Claude
+    screen, prescreened_hint = prescreen_hint(message, user_level, target_language, native_language, topic_number)
+    if prescreened_hint is not None:
+        hint_logger.debug("Hint pre-screened by '%s': %s", screen, prescreened_hint)
+        HINTS.inc(source='prescreen', screen=screen)
+        return prescreened_hint
+
+    # Popular messages are answered from the hint cache without calling Claude
+    cached_hint = get_cached_hint(message, target_language, native_language, user_level)
+    if cached_hint is not None:
+        hint_logger.debug("Hint cache hit: %s", cached_hint)
+        HINTS.inc(source='cache')
+        return cached_hint
+
+    HINTS.inc(source='claude')
 
     try:
         # Get the dynamic language analysis prompt
         feedback_builder = FeedbackPromptBuilder()
         analysis_prompt = feedback_builder.get_hint_prompt(target_language, native_language, user_level)
-        print(f"[TARGET] [HINT GENERATION] Dynamic prompt loaded: {len(analysis_prompt)} characters")
-        print(f"[DEBUG] Target: {target_language}, Native: {native_language}")
+        hint_logger.debug("Dynamic prompt loaded: %d characters", len(analysis_prompt))
 
         # Replace placeholders
         analysis_prompt = analysis_prompt.replace('{message}', message)
         analysis_prompt = analysis_prompt.replace('{level}', user_level)
 
         # Debug: Show first 200 chars of the prompt to see language instruction
-        print(f"[DEBUG] Prompt preview: {analysis_prompt[:200]}...")
+        if debug_enabled:
+            hint_logger.debug("Prompt preview: %s...", analysis_prompt[:200])
         
         # Get hint from Claude - pass a clear analysis request as user_input
-        print(f"[TARGET] [HINT GENERATION] Calling Claude with analysis request")
-        
         # Temporarily disable tools for hint generation
         original_tools_state = claude_client.enable_tools
         claude_client.set_tools_enabled(False)
-        print(f"[TARGET] [HINT GENERATION] Temporarily disabled tools (was: {original_tools_state})")
 
         hint_response = claude_client.send_message(
             f"Analyze this {target_language.capitalize()} message and provide a hint: '{message}'",
-            analysis_prompt
+            analysis_prompt,
+            call_type='hint'
         )
         
         # Restore original tools state
         claude_client.set_tools_enabled(original_tools_state)
-        print(f"[TARGET] [HINT GENERATION] Restored tools state to: {original_tools_state}")
         
-        print(f"[TARGET] [HINT GENERATION] Claude response received: {hint_response[:200]}...")
+        if debug_enabled:
+            hint_logger.debug("Claude response received: %s...", hint_response[:200])
         
         # Try to parse JSON response
-        import json
         try:
             # Clean up response if needed
             hint_response = hint_response.strip()
@@ -132,11 +344,12 @@ def generate_language_hint(message, claude_client, user_level='intermediate',
                 }
                 hint_data['type'] = type_mapping.get(hint_type, hint_type)
 
-                print(f"[SUCCESS] [HINT GENERATION] Successfully parsed hint: {hint_data}")
+                hint_logger.debug("Successfully parsed hint: %s", hint_data)
+                store_hint(message, target_language, native_language, user_level, hint_data)
                 return hint_data
             else:
                 # Fallback if structure is wrong
-                print(f"[WARNING] [HINT GENERATION] JSON structure invalid, using error indicator")
+                hint_logger.warning("JSON structure invalid, using error indicator")
                 return {
                     "type": "error",
                     "phrase": "System Notice",
@@ -145,8 +358,7 @@ def generate_language_hint(message, claude_client, user_level='intermediate',
                 }
 
         except json.JSONDecodeError as e:
-            print(f"[WARNING] JSON parsing error: {e}")
-            print(f"[WARNING] Response was: {hint_response[:200] if len(hint_response) > 200 else hint_response}")
+            hint_logger.warning("JSON parsing error: %s; response was: %s", e, hint_response[:200])
             # Return error indicator instead of fake hint
             return {
                 "type": "error",
@@ -156,7 +368,7 @@ def generate_language_hint(message, claude_client, user_level='intermediate',
             }
         
     except Exception as e:
-        print(f"[ERROR] Error generating hint: {e}")
+        hint_logger.error("Error generating hint: %s", e)
         return {
             "type": "error",
             "phrase": "System Error",
@@ -179,9 +391,10 @@ def generate_comprehensive_feedback(messages, claude_client, user_level='interme
     Returns:
         Dict with comprehensive feedback
     """
-    print(f"[COMPREHENSIVE] Starting comprehensive feedback generation")
-    print(f"[COMPREHENSIVE] Messages count: {len(messages)}")
-    print(f"[COMPREHENSIVE] Target: {target_language}, Native: {native_language}, Level: {user_level}")
+    feedback_logger.debug(
+        "Starting comprehensive feedback generation - messages: %d, target: %s, native: %s, level: %s",
+        len(messages), target_language, native_language, user_level
+    )
 
     try:
         # Get the dynamic comprehensive feedback prompt
@@ -189,7 +402,7 @@ def generate_comprehensive_feedback(messages, claude_client, user_level='interme
         feedback_prompt = feedback_builder.get_comprehensive_feedback_prompt(
             target_language, native_language, user_level
         )
-        print(f"[COMPREHENSIVE] Prompt loaded: {len(feedback_prompt)} characters")
+        feedback_logger.debug("Prompt loaded: %d characters", len(feedback_prompt))
         
         # Format messages
         messages_text = "\n".join([f"Message {i+1}: {msg}" for i, msg in enumerate(messages)])
@@ -197,15 +410,14 @@ def generate_comprehensive_feedback(messages, claude_client, user_level='interme
         feedback_prompt = feedback_prompt.replace('{level}', user_level)
         
         # Get feedback from Claude - pass analysis request with correct parameter order
-        print(f"[COMPREHENSIVE] Calling Claude for feedback analysis")
         feedback_response = claude_client.send_message(
             f"Provide comprehensive feedback on these {target_language.capitalize()} messages",
-            feedback_prompt
+            feedback_prompt,
+            call_type='feedback'
         )
-        print(f"[COMPREHENSIVE] Received response: {len(feedback_response)} characters")
+        feedback_logger.debug("Received response: %d characters", len(feedback_response))
 
         # Try to parse as JSON
-        import json
         try:
             # Extract JSON from response if wrapped in markdown
             original_response = feedback_response  # Keep original for debugging
@@ -222,16 +434,18 @@ def generate_comprehensive_feedback(messages, claude_client, user_level='interme
             cleaned_response = clean_json_response(feedback_response)
 
             # Debug logging
-            print(f"[DEBUG] First 200 chars of cleaned response: {cleaned_response[:200] if len(cleaned_response) > 200 else cleaned_response}")
+            if feedback_logger.isEnabledFor(logging.DEBUG):
+                feedback_logger.debug("First 200 chars of cleaned response: %s", cleaned_response[:200])
 
             feedback_data = json.loads(cleaned_response)
-            print(f"[COMPREHENSIVE] Successfully parsed feedback JSON")
+            feedback_logger.debug("Successfully parsed feedback JSON")
             return feedback_data
 
         except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON parsing failed: {e}")
-            print(f"[ERROR] Failed at position {e.pos if hasattr(e, 'pos') else 'unknown'}")
-            print(f"[DEBUG] Raw response length: {len(feedback_response)}")
+            feedback_logger.error(
+                "JSON parsing failed: %s (position %s, raw response length %d)",
+                e, getattr(e, 'pos', 'unknown'), len(feedback_response)
+            )
             # Return honest error message instead of fake feedback
             return {
                 "error": True,
@@ -242,7 +456,7 @@ def generate_comprehensive_feedback(messages, claude_client, user_level='interme
                 "overall_feedback": "The feedback system is temporarily unavailable. Please try again later or contact support if the problem persists."
             }
         except Exception as e:
-            print(f"[ERROR] Unexpected error parsing feedback: {e}")
+            feedback_logger.error("Unexpected error parsing feedback: %s", e)
             return {
                 "error": True,
                 "message": "An unexpected error occurred while generating feedback.",
@@ -253,7 +467,7 @@ def generate_comprehensive_feedback(messages, claude_client, user_level='interme
             }
             
     except Exception as e:
-        print(f"[ERROR] Error generating comprehensive feedback: {e}")
+        feedback_logger.error("Error generating comprehensive feedback: %s", e)
         return {
             "error": True,
             "message": "Failed to generate feedback due to a system error.",
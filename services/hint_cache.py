@@ -0,0 +1,272 @@
+"""
+Hint cache for casual chat.
+
+Learners at the same level send the same short messages over and over, and
+each one used to cost a Claude call with the full hint prompt. Parsed hint
+dicts are cached under the normalised message text plus target language,
+native language and level, in two tiers:
+
+- a per-process LRU (HINT_CACHE_LOCAL_ENTRIES) answering in microseconds;
+- a SQLite file (HINT_CACHE_PATH) shared by every worker on the host, bounded
+  to HINT_CACHE_MAX_ENTRIES rows.
+
+Entries expire after HINT_CACHE_TTL seconds in both tiers. Lookups and stores
+never raise: a broken cache file just means a miss. Hits and misses are counted
+as cache="hint" in cache_requests_total.
+
+Speech recognition output varies in trivial ways (casing, punctuation, filler
+words), so exact misses fall back to a per-process MinHash/LSH index of recent
+messages per language pair and level (services/similarity_index.py). A stored
+hint is reused when the trigram similarity reaches HINT_SIMILARITY_THRESHOLD
+and the hint still applies: its phrase must occur in the new message, and
+praise is only reused when no words changed apart from fillers. These lookups
+are counted as cache="hint_similar".
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from config import Config
+from logging_config import get_logger
+from observability.metrics import record_cache
+from services.similarity_index import MinHashIndex
+
+logger = get_logger('hints')
+
+# Bump when the hint prompt or hint format changes so old entries are ignored
+HINT_CACHE_VERSION = 1
+
+# Shared-tier pruning runs every this many stores
+PRUNE_EVERY = 200
+
+_PUNCTUATION = re.compile(r'[^\w\s]', re.UNICODE)
+
+# Hesitation sounds that STT transcribes but that carry no language content
+# (short real words such as German "er" or Portuguese "em" are deliberately absent)
+FILLER_WORDS = frozenset([
+    'äh', 'ähm', 'öh', 'öhm', 'hm', 'hmm', 'mhm', 'uh', 'uhm', 'um', 'umm', 'erm',
+    'eh', 'ehm', 'ehh', 'ah', 'ahm', 'ahn', 'hã', 'hum'
+])
+
+_local = OrderedDict()       # key -> (expires_at, hint dict)
+_local_lock = threading.Lock()
+_shared = {'conn': threading.local(), 'pid': None, 'stores': 0}
+_similar = MinHashIndex(Config.HINT_SIMILARITY_ENTRIES)
+
+
+def normalise_message(message):
+    """
+    Normalise a learner message for cache lookups
+
+    Case, punctuation and whitespace differences don't change the hint
+    (the hint prompt ignores punctuation), so they don't change the key.
+    lower() rather than casefold() keeps "ß" and "ss" apart.
+    """
+    text = unicodedata.normalize('NFC', message or '').lower()
+    text = _PUNCTUATION.sub(' ', text)
+    return ' '.join(text.split())
+
+
+def strip_fillers(normalised):
+    """Drop filler words from a normalised message"""
+    return ' '.join(word for word in normalised.split() if word not in FILLER_WORDS)
+
+
+def make_group(target_language, native_language, level):
+    """Language pair and level a hint is valid for"""
+    return '|'.join([
+        str(HINT_CACHE_VERSION), (target_language or '').lower(), (native_language or '').lower(),
+        (level or '').upper()
+    ])
+
+
+def make_key(message, target_language, native_language, level):
+    """Cache key for a message in a language pair and level"""
+    raw = f'{make_group(target_language, native_language, level)}|{normalise_message(message)}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def match_phrase(hint, message):
+    """
+    Adapt a cached hint to a message that normalised to the same key
+
+    The phrase field must quote the learner's message verbatim, so a phrase
+    cached from "hallo, wie geht's" is rewritten to the casing used in
+    "Hallo wie geht's". Returns None if the phrase can't be found.
+    """
+    phrase = hint.get('phrase')
+    if not phrase or hint.get('type') == 'praise' or phrase in message:
+        return hint
+    found = re.search(re.escape(phrase), message, re.IGNORECASE)
+    if found is None:
+        return None
+    return dict(hint, phrase=found.group(0))
+
+
+def _connection():
+    """Per-thread connection to the shared SQLite tier (None if unavailable)"""
+    if not Config.HINT_CACHE_PATH:
+        return None
+    if _shared['pid'] != os.getpid():
+        # Connections must not cross a fork
+        _shared['conn'] = threading.local()
+        _shared['pid'] = os.getpid()
+    conn = getattr(_shared['conn'], 'value', None)
+    if conn is None:
+        directory = os.path.dirname(Config.HINT_CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(Config.HINT_CACHE_PATH, timeout=0.5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS hint_cache ('
+            'key TEXT PRIMARY KEY, hint TEXT NOT NULL, expires_at REAL NOT NULL, created_at REAL NOT NULL)'
+        )
+        _shared['conn'].value = conn
+    return conn
+
+
+def _local_get(key, now):
+    with _local_lock:
+        entry = _local.get(key)
+        if entry is None:
+            return None
+        if entry[0] < now:
+            del _local[key]
+            return None
+        _local.move_to_end(key)
+        return entry[1]
+
+
+def _local_put(key, hint, expires_at):
+    with _local_lock:
+        _local[key] = (expires_at, hint)
+        _local.move_to_end(key)
+        while len(_local) > Config.HINT_CACHE_LOCAL_ENTRIES:
+            _local.popitem(last=False)
+
+
+def get_cached_hint(message, target_language, native_language, level):
+    """
+    Look up a cached hint
+
+    Returns:
+        A copy of the hint dict, or None on a miss
+    """
+    if not Config.HINT_CACHE_ENABLED:
+        return None
+    key = make_key(message, target_language, native_language, level)
+    now = time.time()
+
+    hint = _local_get(key, now)
+    if hint is None:
+        try:
+            conn = _connection()
+            row = conn.execute(
+                'SELECT hint, expires_at FROM hint_cache WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone() if conn else None
+        except (sqlite3.Error, OSError) as e:
+            logger.debug("Hint cache lookup failed: %s", e)
+            row = None
+        if row:
+            hint = json.loads(row[0])
+            _local_put(key, hint, row[1])
+
+    if hint is not None:
+        hint = match_phrase(hint, message)
+    record_cache('hint', hint is not None)
+    if hint is not None:
+        _index_similar(message, target_language, native_language, level, hint)
+        return dict(hint)
+    return _get_similar_hint(message, target_language, native_language, level)
+
+
+def _index_similar(message, target_language, native_language, level, hint):
+    """Make a hint findable for near-duplicate messages in this process"""
+    if not Config.HINT_SIMILARITY_ENABLED:
+        return
+    text = strip_fillers(normalise_message(message))
+    if text:
+        _similar.add(make_group(target_language, native_language, level), text, hint, Config.HINT_CACHE_TTL)
+
+
+def _get_similar_hint(message, target_language, native_language, level):
+    """Reuse the hint of a near-duplicate message if it still applies"""
+    if not Config.HINT_SIMILARITY_ENABLED:
+        return None
+    text = strip_fillers(normalise_message(message))
+    match = _similar.lookup(
+        make_group(target_language, native_language, level), text, Config.HINT_SIMILARITY_THRESHOLD
+    ) if text else None
+
+    hint = None
+    if match is not None:
+        stored_text, stored_hint, similarity = match
+        if stored_hint.get('type') == 'praise':
+            # Praise says the whole message is right; any changed word may break that
+            if set(stored_text.split()) == set(text.split()):
+                hint = stored_hint
+        elif stored_hint.get('phrase'):
+            hint = match_phrase(stored_hint, message)
+        if hint is not None:
+            logger.debug("Similar hint reused (similarity %.2f): '%s' ~ '%s'", similarity, text, stored_text)
+
+    record_cache('hint_similar', hint is not None)
+    return dict(hint) if hint is not None else None
+
+
+def store_hint(message, target_language, native_language, level, hint):
+    """Cache a successfully parsed hint (system error placeholders are skipped)"""
+    if not Config.HINT_CACHE_ENABLED or not hint or hint.get('system_error'):
+        return
+    key = make_key(message, target_language, native_language, level)
+    now = time.time()
+    expires_at = now + Config.HINT_CACHE_TTL
+    hint = dict(hint)
+    _local_put(key, hint, expires_at)
+    _index_similar(message, target_language, native_language, level, hint)
+
+    try:
+        conn = _connection()
+        if conn is None:
+            return
+        conn.execute(
+            'INSERT OR REPLACE INTO hint_cache (key, hint, expires_at, created_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(hint, ensure_ascii=False), expires_at, now)
+        )
+        _shared['stores'] += 1
+        if _shared['stores'] % PRUNE_EVERY == 0:
+            _prune(conn, now)
+    except (sqlite3.Error, OSError) as e:
+        logger.debug("Hint cache store failed: %s", e)
+
+
+def _prune(conn, now):
+    """Drop expired rows, then the oldest rows beyond HINT_CACHE_MAX_ENTRIES"""
+    conn.execute('DELETE FROM hint_cache WHERE expires_at <= ?', (now,))
+    conn.execute(
+        'DELETE FROM hint_cache WHERE key IN ('
+        'SELECT key FROM hint_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)',
+        (Config.HINT_CACHE_MAX_ENTRIES,)
+    )
+
+
+def clear_hint_cache():
+    """Empty both tiers (e.g. after changing the hint prompt)"""
+    with _local_lock:
+        _local.clear()
+    _similar.clear()
+    try:
+        conn = _connection()
+        if conn is not None:
+            conn.execute('DELETE FROM hint_cache')
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Could not clear hint cache: %s", e)
@@ -0,0 +1,364 @@
+"""
+Priority-aware admission control for outbound Claude calls.
+
+Every Claude call used to compete equally for the provider's rate limits and
+the worker's threads, so a burst of end-of-session feedback slowed down the
+interactive replies with it. PriorityScheduler.slot() gives each call type a
+priority, a concurrency cap and a bounded queue:
+
+    reply > evaluation > hint > letter > feedback > test
+
+At most CLAUDE_MAX_CONCURRENCY calls run at once. When a slot frees up the
+highest-priority waiter whose class is under its cap gets it. A call is
+rejected with SchedulerBusyError (HTTP 429 with Retry-After in the routes)
+when its class queue is full or it waited longer than CLAUDE_QUEUE_TIMEOUT.
+Retry-After is estimated from the class's recent call duration and queue depth.
+
+CLAUDE_SCHEDULER_LIMITS ("call_type=concurrency/queue,...") overrides the caps.
+
+The provider's rate limit is shared by every worker, so the limits are too:
+with CLAUDE_SCHEDULER_PATH set, running and queued calls are leases in a
+SQLite table (SharedSlots) that all workers on a host count against, and
+waiters poll it in priority order. The in-process queue still orders a
+worker's own threads. A single sync worker never has more than one call in
+flight, so the limits only bite with several workers or threads
+(WEB_CONCURRENCY / GUNICORN_THREADS in gunicorn_config.py). Errors in the
+lease table never block a call.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from config import Config
+from logging_config import get_logger
+from observability.metrics import CLAUDE_ADMISSIONS, CLAUDE_QUEUE_WAIT
+from observability.timing import record_span
+
+logger = get_logger('scheduler')
+
+# call type -> priority (lower runs first), max concurrent calls (None: any free slot), max queued calls
+SCHEDULER_CLASSES = {
+    'reply': {'priority': 0, 'concurrency': None, 'queue': 32},
+    'evaluation': {'priority': 1, 'concurrency': 4, 'queue': 8},
+    'hint': {'priority': 2, 'concurrency': 4, 'queue': 8},
+    'letter': {'priority': 3, 'concurrency': 2, 'queue': 4},
+    'feedback': {'priority': 4, 'concurrency': 2, 'queue': 4},
+    'test': {'priority': 5, 'concurrency': 1, 'queue': 1},
+}
+
+# Smoothing of the per-class call duration used for Retry-After
+DURATION_SMOOTHING = 0.2
+MAX_RETRY_AFTER = 30
+
+# Seconds between lease table polls while waiting for a host-wide slot
+POLL_INTERVAL = 0.05
+# A waiting lease not refreshed for this long belongs to a dead worker
+WAITER_LEASE = 2.0
+
+
+class SchedulerBusyError(Exception):
+    """The call was not admitted; try again after retry_after seconds"""
+
+    def __init__(self, call_type, retry_after, reason):
+        super().__init__(f"Claude {call_type} calls are saturated ({reason}), retry in {retry_after}s")
+        self.call_type = call_type
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def parse_scheduler_limits(spec):
+    """
+    Parse a "call_type=concurrency/queue,..." string
+
+    Args:
+        spec: Limit overrides, e.g. "hint=2/4,feedback=1/2" (queue may be omitted)
+
+    Returns:
+        Dict mapping call type to {'concurrency', 'queue'} overrides
+    """
+    limits = {}
+    for part in (spec or '').split(','):
+        call_type, _, value = part.partition('=')
+        concurrency, _, queue = value.partition('/')
+        try:
+            override = {'concurrency': int(concurrency)}
+            if queue.strip():
+                override['queue'] = int(queue)
+        except ValueError:
+            continue
+        if call_type.strip():
+            limits[call_type.strip()] = override
+    return limits
+
+
+class _Waiter:
+    def __init__(self, call_type, priority, seq):
+        self.call_type = call_type
+        self.priority = priority
+        self.seq = seq
+        self.granted = False
+        self.event = threading.Event()
+
+
+class SharedSlots:
+    """Host-wide running and queued Claude calls, as leases in a SQLite file"""
+
+    def __init__(self, path, lease):
+        """
+        Args:
+            path: SQLite file shared by the workers on a host
+            lease: Seconds a running slot is held at most (frees slots of crashed workers)
+        """
+        self.path = path
+        self.lease = lease
+        self._conn = threading.local()
+        self._pid = None
+
+    def _connection(self):
+        if self._pid != os.getpid():
+            # Connections must not cross a fork
+            self._conn = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._conn, 'value', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=0.5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS claude_slots ('
+                'owner TEXT PRIMARY KEY, call_type TEXT NOT NULL, priority INTEGER NOT NULL, '
+                'state TEXT NOT NULL, queued_at REAL NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._conn.value = conn
+        return conn
+
+    def _poll(self, owner, call_type, classes, max_concurrency, queued_at, first):
+        """
+        One admission attempt (`first`: not queued yet, so the class queue limit applies)
+
+        Returns:
+            'admitted', 'waiting' or 'queue_full'
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM claude_slots WHERE expires_at < ?', (now,))
+            rows = conn.execute(
+                'SELECT owner, call_type, priority, state, queued_at FROM claude_slots WHERE owner != ?', (owner,)
+            ).fetchall()
+            running = {}
+            for _, other_type, _, state, _ in rows:
+                if state == 'running':
+                    running[other_type] = running.get(other_type, 0) + 1
+            total = sum(running.values())
+
+            def can_run(other_type):
+                concurrency = classes.get(other_type, {}).get('concurrency')
+                cap = max_concurrency if concurrency is None else concurrency
+                return total < max_concurrency and running.get(other_type, 0) < cap
+
+            priority = classes[call_type]['priority']
+            # Waiters of the same or higher priority that queued earlier and could take a slot go first
+            ahead = any(
+                state == 'waiting' and (other_priority, other_queued) < (priority, queued_at) and can_run(other_type)
+                for _, other_type, other_priority, state, other_queued in rows
+            )
+            if not ahead and can_run(call_type):
+                result, state, expires_at = 'admitted', 'running', now + self.lease
+            elif first and sum(
+                1 for _, other_type, _, state, _ in rows if state == 'waiting' and other_type == call_type
+            ) >= classes[call_type]['queue']:
+                conn.execute('COMMIT')
+                return 'queue_full'
+            else:
+                result, state, expires_at = 'waiting', 'waiting', now + WAITER_LEASE
+            conn.execute(
+                'INSERT OR REPLACE INTO claude_slots (owner, call_type, priority, state, queued_at, expires_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (owner, call_type, priority, state, queued_at, expires_at)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+    def acquire(self, call_type, classes, max_concurrency, deadline):
+        """
+        Wait for a host-wide slot until `deadline` (time.time())
+
+        Returns:
+            Tuple of (owner or None, rejection reason or None); owner is None when the table is unavailable
+        """
+        owner = f'{os.getpid()}:{uuid.uuid4().hex}'
+        queued_at = time.time()
+        first = True
+        try:
+            while True:
+                result = self._poll(owner, call_type, classes, max_concurrency, queued_at, first)
+                if result == 'admitted':
+                    return owner, None
+                if result == 'queue_full':
+                    return None, 'queue_full'
+                first = False
+                if time.time() >= deadline:
+                    self.release(owner)
+                    return None, 'queue_timeout'
+                time.sleep(POLL_INTERVAL)
+        except (sqlite3.Error, OSError) as e:
+            logger.debug("Scheduler lease table unavailable: %s", e)
+            self.release(owner)
+            return None, None
+
+    def release(self, owner):
+        """Give a slot (or queue place) back"""
+        try:
+            self._connection().execute('DELETE FROM claude_slots WHERE owner = ?', (owner,))
+        except (sqlite3.Error, OSError) as e:
+            logger.debug("Scheduler lease table unavailable: %s", e)
+
+
+class PriorityScheduler:
+    """Per-class concurrency caps and bounded priority queues"""
+
+    def __init__(self, max_concurrency, classes, shared=None):
+        """
+        Args:
+            max_concurrency: Calls running at once across all classes
+            classes: call type -> {'priority', 'concurrency', 'queue'}
+            shared: SharedSlots applying the same limits across workers (None: this worker only)
+        """
+        self.max_concurrency = max_concurrency
+        self.classes = classes
+        self.shared = shared
+        self.reset()
+
+    def reset(self):
+        """Forget running and queued calls (their threads don't survive a fork)"""
+        self._lock = threading.Lock()
+        self.running = {call_type: 0 for call_type in self.classes}
+        self.total = 0
+        self.waiting = []
+        self.seq = 0
+        self.avg_duration = {call_type: 1.0 for call_type in self.classes}
+
+    def _concurrency(self, call_type):
+        concurrency = self.classes[call_type]['concurrency']
+        return self.max_concurrency if concurrency is None else concurrency
+
+    def _can_run(self, call_type):
+        return self.total < self.max_concurrency and self.running[call_type] < self._concurrency(call_type)
+
+    def _start(self, call_type):
+        self.running[call_type] += 1
+        self.total += 1
+
+    def _retry_after(self, call_type):
+        queued = sum(1 for waiter in self.waiting if waiter.call_type == call_type)
+        estimate = self.avg_duration[call_type] * (queued + 1) / max(self._concurrency(call_type), 1)
+        return max(1, min(math.ceil(estimate), MAX_RETRY_AFTER))
+
+    def _reject(self, call_type, reason):
+        CLAUDE_ADMISSIONS.inc(call_type=call_type, result=reason)
+        retry_after = self._retry_after(call_type)
+        logger.warning("Rejected Claude %s call (%s), retry after %ds", call_type, reason, retry_after)
+        return SchedulerBusyError(call_type, retry_after, reason)
+
+    def _dispatch(self):
+        """Hand free slots to the highest-priority waiters that may run"""
+        for waiter in list(self.waiting):
+            if self.total >= self.max_concurrency:
+                break
+            if self._can_run(waiter.call_type):
+                self.waiting.remove(waiter)
+                self._start(waiter.call_type)
+                waiter.granted = True
+                waiter.event.set()
+
+    @contextmanager
+    def slot(self, call_type):
+        """
+        Hold a slot for one call of `call_type` (unknown types count as 'reply')
+
+        Raises:
+            SchedulerBusyError: The class queue is full or the wait timed out
+        """
+        if call_type not in self.classes:
+            call_type = 'reply'
+        priority = self.classes[call_type]['priority']
+        start = time.perf_counter()
+        waiter = None
+        with self._lock:
+            # Queued calls of the same or higher priority that could take a slot go first
+            ahead = any(other.priority <= priority and self._can_run(other.call_type) for other in self.waiting)
+            if not ahead and self._can_run(call_type):
+                self._start(call_type)
+            elif sum(1 for other in self.waiting if other.call_type == call_type) >= self.classes[call_type]['queue']:
+                raise self._reject(call_type, 'queue_full')
+            else:
+                self.seq += 1
+                waiter = _Waiter(call_type, priority, self.seq)
+                self.waiting.append(waiter)
+                self.waiting.sort(key=lambda other: (other.priority, other.seq))
+
+        if waiter is not None:
+            waiter.event.wait(Config.CLAUDE_QUEUE_TIMEOUT)
+            with self._lock:
+                if not waiter.granted:
+                    self.waiting.remove(waiter)
+                    raise self._reject(call_type, 'queue_timeout')
+
+        owner = None
+        started = None
+        try:
+            if self.shared is not None:
+                deadline = time.time() + Config.CLAUDE_QUEUE_TIMEOUT - (time.perf_counter() - start)
+                owner, reason = self.shared.acquire(call_type, self.classes, self.max_concurrency, deadline)
+                if reason:
+                    with self._lock:
+                        raise self._reject(call_type, reason)
+
+            waited = time.perf_counter() - start
+            CLAUDE_QUEUE_WAIT.observe(waited, call_type=call_type)
+            CLAUDE_ADMISSIONS.inc(call_type=call_type, result='admitted')
+            if waited >= 0.001:
+                record_span('claude_queue', waited)
+
+            started = time.perf_counter()
+            yield
+        finally:
+            if owner is not None:
+                self.shared.release(owner)
+            with self._lock:
+                self.running[call_type] -= 1
+                self.total -= 1
+                if started is not None:
+                    duration = time.perf_counter() - started
+                    self.avg_duration[call_type] += DURATION_SMOOTHING * (duration - self.avg_duration[call_type])
+                self._dispatch()
+
+
+def build_scheduler():
+    """Scheduler from SCHEDULER_CLASSES with the CLAUDE_SCHEDULER_LIMITS overrides applied"""
+    classes = {call_type: dict(settings) for call_type, settings in SCHEDULER_CLASSES.items()}
+    for call_type, override in parse_scheduler_limits(Config.CLAUDE_SCHEDULER_LIMITS).items():
+        if call_type in classes:
+            classes[call_type].update(override)
+    shared = SharedSlots(Config.CLAUDE_SCHEDULER_PATH, Config.CLAUDE_SLOT_LEASE) if Config.CLAUDE_SCHEDULER_PATH else None
+    return PriorityScheduler(Config.CLAUDE_MAX_CONCURRENCY, classes, shared)
+
+
+# Shared by all ClaudeClient instances in this worker (and through SharedSlots by the host)
+scheduler = build_scheduler()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=scheduler.reset)
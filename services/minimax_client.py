@@ -3,26 +3,60 @@ Minimax TTS Client - OOP implementation for Text-to-Speech functionality
 Following Spralingua's OOP architecture pattern
 """
 
-import os
+import time
 import base64
 import requests
 from typing import Dict, Any, Optional, Tuple
-from dotenv import load_dotenv
+
+from config import Config
+from logging_config import get_logger
+from observability.timing import span
+from observability.metrics import MINIMAX_REQUESTS, MINIMAX_DURATION, MINIMAX_AUDIO_BYTES
+from services.resilience import ResilientCaller, CircuitOpenError
+from services.single_flight import get_flight, fingerprint
+from services.spend_ledger import record_spend
+
+logger = get_logger('minimax')
+
+
+# base_resp status codes worth retrying: unknown error, timeout, RPM and TPM rate limits
+TRANSIENT_STATUS_CODES = (1000, 1001, 1002, 1039)
+
+
+class MinimaxTransientError(Exception):
+    """A 200 response whose base_resp reports a transient failure."""
+
+
+def is_retryable_error(error) -> bool:
+    """Connection errors, timeouts, 429/5xx responses and transient API codes are retried."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          MinimaxTransientError)):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+# See services/resilience.py
+resilient_caller = ResilientCaller('minimax', is_retryable_error)
+
+# See services/single_flight.py
+tts_flight = get_flight('minimax')
 
 class MinimaxClient:
     """Client for Minimax Text-to-Speech API integration."""
     
     def __init__(self):
-        """Initialize Minimax client and load environment variables."""
-        load_dotenv()
-        
+        """Initialize Minimax client from Config (which has already loaded .env)."""
         # API credentials
-        self.api_key = os.getenv('MINIMAX_API_KEY')
-        self.group_id = os.getenv('MINIMAX_GROUP_ID')
-        self.default_voice_id = os.getenv('MINIMAX_VOICE_ID', 'female-shaonv')
+        self.api_key = Config.MINIMAX_API_KEY
+        self.group_id = Config.MINIMAX_GROUP_ID
+        self.default_voice_id = Config.MINIMAX_VOICE_ID
         
         # API configuration - matching GTA-V2 exactly
-        self.base_url = f"https://api.minimax.io/v1/t2a_v2?GroupId={self.group_id}"
+        # MINIMAX_BASE_URL lets load tests point the client at a local fake server
+        self.api_host = Config.MINIMAX_BASE_URL.rstrip('/')
+        self.base_url = f"{self.api_host}/v1/t2a_v2?GroupId={self.group_id}"
         self.headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -52,7 +86,7 @@ class MinimaxClient:
             'sally_original': 'female-shaonv'     # Thoughtful female voice
         }
         
-        print(f"[MINIMAX] Client initialized - API key configured: {bool(self.api_key)}")
+        logger.info("Client initialized - API key configured: %s", bool(self.api_key))
     
     def validate_config(self) -> Tuple[bool, Optional[str]]:
         """
@@ -95,7 +129,7 @@ class MinimaxClient:
         # Validate configuration
         is_valid, error_msg = self.validate_config()
         if not is_valid:
-            print(f"[MINIMAX ERROR] {error_msg}")
+            logger.error("%s", error_msg)
             return False, {"error": error_msg}
         
         # Clean and validate text
@@ -129,16 +163,33 @@ class MinimaxClient:
             }
         }
         
-        print(f"[MINIMAX] Synthesizing speech - Voice: {voice_id}, Text length: {len(text)}")
+        logger.debug("Synthesizing speech - Voice: %s, Text length: %d", voice_id, len(text))
         
+        # Identical concurrent requests (double taps, reloads) share one upstream call
+        result, _ = tts_flight.do(
+            fingerprint(self.base_url, payload), lambda: self._synthesize(payload, voice_id, text),
+            encode=list, decode=tuple
+        )
+        return result
+
+    def _synthesize(self, payload: Dict[str, Any], voice_id: str, text: str) -> Tuple[bool, Dict[str, Any]]:
+        """Make the TTS request for a built payload (see synthesize_speech for the result)."""
         try:
             # Make API request
-            response = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            start = time.perf_counter()
+            result = None
+            try:
+                with span('minimax_api'):
+                    response, result = resilient_caller.call(lambda: self._post(payload))
+            except requests.exceptions.HTTPError as e:
+                # Transient HTTP status that was still failing after retries
+                response = e.response
+            except MinimaxTransientError as e:
+                logger.error("%s", e)
+                MINIMAX_REQUESTS.inc(outcome='api_error')
+                return False, {"error": str(e)}
+            finally:
+                MINIMAX_DURATION.observe(time.perf_counter() - start)
             
             # Check response status
             if response.status_code != 200:
@@ -148,36 +199,38 @@ class MinimaxClient:
                     error_msg = error_detail.get('base_resp', {}).get('status_msg', error_msg)
                 except:
                     pass
-                print(f"[MINIMAX ERROR] {error_msg}")
+                logger.error("%s", error_msg)
+                MINIMAX_REQUESTS.inc(outcome='http_error')
                 return False, {"error": error_msg}
             
-            # Parse response
-            result = response.json()
-            print(f"[MINIMAX DEBUG] Response keys: {result.keys()}")
-            print(f"[MINIMAX DEBUG] base_resp: {result.get('base_resp')}")
+            logger.debug("Response keys: %s, base_resp: %s", list(result), result.get('base_resp'))
             
             # Check for API-level errors
             if result.get('base_resp', {}).get('status_code') != 0:
                 error_msg = result.get('base_resp', {}).get('status_msg', 'Unknown API error')
-                print(f"[MINIMAX ERROR] {error_msg}")
+                logger.error("%s", error_msg)
+                MINIMAX_REQUESTS.inc(outcome='api_error')
                 return False, {"error": error_msg}
             
             # Get audio data from nested structure (matching GTA-V2)
             data_section = result.get('data', {})
-            print(f"[MINIMAX DEBUG] data section keys: {list(data_section.keys())}")
             
             # Check TTS processing status
             tts_status = data_section.get('status')
-            print(f"[MINIMAX DEBUG] TTS status: {tts_status}")
+            logger.debug("Data section keys: %s, TTS status: %s", list(data_section), tts_status)
             
             # Check for audio data in either new or old field format
             audio_base64 = data_section.get('audio') or data_section.get('audio_file')
             
             if not audio_base64:
-                print(f"[MINIMAX ERROR] No audio data in response. Full data section: {data_section}")
+                logger.error("No audio data in response. Full data section: %s", data_section)
+                MINIMAX_REQUESTS.inc(outcome='no_audio')
                 return False, {"error": "No audio data received"}
             
-            print(f"[MINIMAX SUCCESS] Audio generated - Size: {len(audio_base64)} chars")
+            logger.debug("Audio generated - Size: %d chars", len(audio_base64))
+            MINIMAX_REQUESTS.inc(outcome='ok')
+            MINIMAX_AUDIO_BYTES.inc(len(audio_base64) // 2)  # hex-encoded
+            record_spend(tts_characters=len(text))
             
             return True, {
                 "audio_data": audio_base64,
@@ -186,16 +239,51 @@ class MinimaxClient:
                 "text_length": len(text)
             }
             
+        except CircuitOpenError as e:
+            logger.warning("%s", e)
+            MINIMAX_REQUESTS.inc(outcome='circuit_open')
+            return False, {"error": "Text-to-speech is temporarily unavailable"}
         except requests.exceptions.Timeout:
-            print("[MINIMAX ERROR] Request timeout")
+            logger.error("Request timeout")
+            MINIMAX_REQUESTS.inc(outcome='timeout')
             return False, {"error": "Request timeout - Minimax API is slow"}
         except requests.exceptions.RequestException as e:
-            print(f"[MINIMAX ERROR] Request failed: {e}")
+            logger.error("Request failed: %s", e)
+            MINIMAX_REQUESTS.inc(outcome='request_error')
             return False, {"error": f"Request failed: {str(e)}"}
         except Exception as e:
-            print(f"[MINIMAX ERROR] Unexpected error: {e}")
+            logger.error("Unexpected error: %s", e)
+            MINIMAX_REQUESTS.inc(outcome='error')
             return False, {"error": f"Unexpected error: {str(e)}"}
     
+    def _post(self, payload: Dict[str, Any]) -> Tuple[requests.Response, Optional[Dict[str, Any]]]:
+        """
+        Send one synthesis request.
+
+        Returns:
+            Tuple of (response, parsed JSON body for 200 responses else None)
+
+        Raises:
+            requests.exceptions.HTTPError: On 429/5xx so the resilient caller retries it
+            MinimaxTransientError: On a transient base_resp status code
+        """
+        response = requests.post(
+            self.base_url,
+            headers=self.headers,
+            json=payload,
+            timeout=(Config.MINIMAX_CONNECT_TIMEOUT, Config.MINIMAX_TIMEOUT)
+        )
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        if response.status_code != 200:
+            return response, None
+
+        result = response.json()
+        base_resp = result.get('base_resp', {})
+        if base_resp.get('status_code') in TRANSIENT_STATUS_CODES:
+            raise MinimaxTransientError(base_resp.get('status_msg') or f"API error {base_resp.get('status_code')}")
+        return response, result
+
     def get_character_voice(self, character: str) -> str:
         """
         Get the voice ID for a specific character.
@@ -0,0 +1,102 @@
+"""
+Model routing policy for Claude calls.
+
+Each call type gets its own model, output token cap, temperature and stop
+sequences instead of one model with max_tokens=3000 for everything. A short
+max_tokens bounds generation time, and small structured tasks (hints) run
+cooler for parseable JSON.
+
+Casual chat replies are capped from the topic's word limit
+(TopicManager.get_topic_word_limit): roughly REPLY_TOKENS_PER_WORD tokens per
+word with 50% headroom, so a 40-word A1 reply gets ~130 tokens.
+
+CLAUDE_MODEL sets the default model; CLAUDE_MODEL_ROUTES ("hint=<model>,...")
+points individual call types at a different one.
+"""
+
+import math
+
+from config import Config
+
+# Used for replies when no word limit is known
+DEFAULT_REPLY_WORD_LIMIT = 50
+REPLY_TOKEN_HEADROOM = 1.5
+MIN_REPLY_TOKENS = 96
+MAX_REPLY_TOKENS = 600
+
+# Keeps a reply from continuing as the student
+REPLY_STOP_SEQUENCES = ['\nStudent:', '\nUser:']
+
+# call type -> max_tokens, temperature, stop sequences (model comes from Config)
+MODEL_ROUTES = {
+    'reply': {'max_tokens': None, 'temperature': 1.0, 'stop_sequences': REPLY_STOP_SEQUENCES},
+    'hint': {'max_tokens': 300, 'temperature': 0.3, 'stop_sequences': []},
+    'feedback': {'max_tokens': 2000, 'temperature': 0.3, 'stop_sequences': []},
+    'letter': {'max_tokens': 1500, 'temperature': 0.9, 'stop_sequences': []},
+    'evaluation': {'max_tokens': 2000, 'temperature': 0.2, 'stop_sequences': []},
+    'test': {'max_tokens': 100, 'temperature': 0.0, 'stop_sequences': []},
+}
+
+
+def parse_model_routes(spec):
+    """
+    Parse a "call_type=model,..." string into a dict
+
+    Args:
+        spec: Route overrides, e.g. "hint=claude-3-5-haiku-latest,feedback=claude-sonnet-4-5"
+
+    Returns:
+        Dict mapping call type to model name
+    """
+    routes = {}
+    for part in (spec or '').split(','):
+        call_type, _, model = part.partition('=')
+        if call_type.strip() and model.strip():
+            routes[call_type.strip()] = model.strip()
+    return routes
+
+
+_model_overrides = {'routes': None}
+
+
+def get_model(call_type):
+    """Model for a call type (CLAUDE_MODEL_ROUTES override, else CLAUDE_MODEL)"""
+    if _model_overrides['routes'] is None:
+        _model_overrides['routes'] = parse_model_routes(Config.CLAUDE_MODEL_ROUTES)
+    return _model_overrides['routes'].get(call_type, Config.CLAUDE_MODEL)
+
+
+def reply_token_budget(word_limit):
+    """
+    Output token cap for a conversation reply
+
+    Args:
+        word_limit: Words per response for the topic (None for the default)
+
+    Returns:
+        max_tokens for the reply
+    """
+    words = word_limit or DEFAULT_REPLY_WORD_LIMIT
+    tokens = math.ceil(words * Config.REPLY_TOKENS_PER_WORD * REPLY_TOKEN_HEADROOM)
+    return max(MIN_REPLY_TOKENS, min(tokens, MAX_REPLY_TOKENS))
+
+
+def resolve_route(call_type, word_limit=None):
+    """
+    Get the request parameters for a call type
+
+    Args:
+        call_type: reply/hint/feedback/letter/evaluation/test (unknown types use 'reply')
+        word_limit: Topic word limit, used for replies
+
+    Returns:
+        Dict with 'model', 'max_tokens', 'temperature' and 'stop_sequences'
+    """
+    route = MODEL_ROUTES.get(call_type, MODEL_ROUTES['reply'])
+    max_tokens = route['max_tokens'] or reply_token_budget(word_limit)
+    return {
+        'model': get_model(call_type),
+        'max_tokens': max_tokens,
+        'temperature': route['temperature'],
+        'stop_sequences': list(route['stop_sequences']),
+    }
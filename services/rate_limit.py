@@ -0,0 +1,229 @@
+"""
+Per-user and per-IP token-bucket rate limiting for provider-backed routes.
+
+Each limited route names a limit (chat, tts, generate, submit). A request takes
+one token from the user's bucket (RATE_LIMITS) and one from the client IP's
+bucket (RATE_LIMITS_IP); a bucket of capacity N over S seconds refills at N/S
+tokens per second. An empty bucket answers 429 with Retry-After set to when
+the next token arrives. IP limits are looser because classrooms share an
+address; they stop scripted clients cycling accounts.
+
+Buckets live in a SQLite file (RATE_LIMIT_PATH) so the workers on a host share
+them; with no path they are per worker. After the buckets, the user's daily
+budget is checked against the spend ledger (services/spend_ledger.py) and the
+request's provider spend is written to it when the view returns.
+
+Errors in the bucket store never block a request (the limiter fails open).
+"""
+
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request, session
+
+from config import Config
+from logging_config import get_logger
+from observability.metrics import RATE_LIMITED
+from services.spend_ledger import check_budget, flush_spend, seconds_until_reset
+
+logger = get_logger('ratelimit')
+
+
+def parse_rate_limits(spec):
+    """
+    Parse a "name=capacity/seconds,..." string
+
+    Args:
+        spec: Limits, e.g. "chat=20/60,generate=6/300"
+
+    Returns:
+        Dict mapping limit name to (capacity, refill tokens per second)
+    """
+    limits = {}
+    for part in (spec or '').split(','):
+        name, _, value = part.partition('=')
+        capacity, _, seconds = value.partition('/')
+        try:
+            capacity, seconds = float(capacity), float(seconds or 60)
+        except ValueError:
+            continue
+        if name.strip() and capacity > 0 and seconds > 0:
+            limits[name.strip()] = (capacity, capacity / seconds)
+    return limits
+
+
+_limits = {}
+
+
+def get_limit(scope, name):
+    """(capacity, rate) for a limit in scope 'user' or 'ip', or None if unlimited"""
+    if not _limits:
+        _limits['user'] = parse_rate_limits(Config.RATE_LIMITS)
+        _limits['ip'] = parse_rate_limits(Config.RATE_LIMITS_IP)
+    return _limits[scope].get(name)
+
+
+def _refill(tokens, updated_at, capacity, rate, now):
+    return min(capacity, tokens + (now - updated_at) * rate)
+
+
+class MemoryBuckets:
+    """Token buckets in this worker's memory"""
+
+    def __init__(self):
+        self.buckets = {}   # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take one token; returns seconds until one is available (0 when taken)"""
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self.buckets.get(key, (capacity, now))
+            tokens = _refill(tokens, updated_at, capacity, rate, now)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now)
+                return (1 - tokens) / rate
+            self.buckets[key] = (tokens - 1, now)
+            return 0
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file shared by the workers on a host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = threading.local()
+        self._pid = None
+
+    def _connection(self):
+        if self._pid != os.getpid():
+            # Connections must not cross a fork
+            self._conn = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._conn, 'value', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=0.5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)'
+            )
+            self._conn.value = conn
+        return conn
+
+    def take(self, key, capacity, rate):
+        """Take one token; returns seconds until one is available (0 when taken)"""
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?', (key,)).fetchone()
+            tokens = _refill(row[0], row[1], capacity, rate, now) if row else capacity
+            wait = (1 - tokens) / rate if tokens < 1 else 0
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                (key, tokens if wait else tokens - 1, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return wait
+
+
+_store = {'buckets': None}
+
+
+def _get_buckets():
+    if _store['buckets'] is None:
+        _store['buckets'] = SQLiteBuckets(Config.RATE_LIMIT_PATH) if Config.RATE_LIMIT_PATH else MemoryBuckets()
+    return _store['buckets']
+
+
+def client_ip():
+    """Client address, trusting RATE_LIMIT_TRUSTED_PROXIES entries of X-Forwarded-For"""
+    hops = Config.RATE_LIMIT_TRUSTED_PROXIES
+    forwarded = [address.strip() for address in request.headers.get('X-Forwarded-For', '').split(',') if address.strip()]
+    if hops > 0 and forwarded:
+        return forwarded[-min(hops, len(forwarded))]
+    return request.remote_addr or 'unknown'
+
+
+def take_token(scope, name, identity):
+    """
+    Take a token from one bucket
+
+    Returns:
+        Seconds until a token is available (0 when the request may proceed)
+    """
+    limit = get_limit(scope, name)
+    if limit is None:
+        return 0
+    try:
+        return _get_buckets().take(f'{scope}:{name}:{identity}', *limit)
+    except (sqlite3.Error, OSError) as e:
+        logger.debug("Rate limit store unavailable: %s", e)
+        return 0
+
+
+def _limited_response(name, scope, retry_after, message):
+    RATE_LIMITED.inc(limit=name, scope=scope)
+    logger.warning("Rate limited %s (%s) for %s", name, scope, session.get('user_id') or client_ip())
+    response = jsonify({'error': message, 'retry_after': retry_after})
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+
+def rate_limited(name, budget=None):
+    """
+    Decorator applying a route's token buckets and daily budget (use under @login_required)
+
+    Args:
+        name: Limit name in RATE_LIMITS / RATE_LIMITS_IP
+        budget: Daily budget checked before the view ('tokens' or 'tts', None for none)
+
+    Usage:
+        @api_bp.route('/casual-chat/chat', methods=['POST'])
+        @login_required
+        @rate_limited('chat', budget='tokens')
+        def casual_chat():
+            ...
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not Config.RATE_LIMIT_ENABLED:
+                return f(*args, **kwargs)
+
+            user_id = session.get('user_id')
+            for scope, identity in (('ip', client_ip()), ('user', user_id)):
+                if identity is None:
+                    continue
+                wait = take_token(scope, name, identity)
+                if wait:
+                    return _limited_response(
+                        name, scope, max(1, math.ceil(wait)), 'Too many requests, please slow down'
+                    )
+
+            if budget:
+                within, spent, limit = check_budget(user_id, budget)
+                if not within:
+                    logger.info("User %s reached the daily %s budget (%d/%d)", user_id, budget, spent, limit)
+                    return _limited_response(
+                        name, 'budget', seconds_until_reset(), 'Daily practice limit reached, please come back tomorrow'
+                    )
+
+            try:
+                return f(*args, **kwargs)
+            finally:
+                flush_spend(user_id)
+        return decorated_function
+    return decorator
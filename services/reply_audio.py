@@ -0,0 +1,269 @@
+"""
+Server-initiated audio for casual chat replies.
+
+Without it the browser receives the chat reply and only then POSTs the same
+text back to /api/casual-chat/tts. When the chat request asks for it
+("speak": true), start_reply_audio() queues the reply's sentences on the TTS
+pool (services/tts_pipeline.py) as soon as Claude answers, so synthesis
+overlaps hint generation, and the chat response carries an audio URL. The
+client fetches /api/casual-chat/audio/<id>, which streams the segments in
+order as they are stored, in the same NDJSON format as pipelined TTS.
+
+Segments live in a SQLite file (REPLY_AUDIO_PATH) so any worker on the host
+can serve the URL; with no path they stay in the worker that synthesised
+them. Entries are dropped after REPLY_AUDIO_TTL seconds. Store errors never
+fail the chat request: the client falls back to asking for TTS itself.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from config import Config
+from logging_config import get_logger
+from observability.metrics import REPLY_AUDIO
+
+logger = get_logger('minimax')
+
+# Seconds between store polls while a segment is still being synthesised
+POLL_INTERVAL = 0.05
+
+
+class MemoryAudioStore:
+    """Reply audio in this worker's memory"""
+
+    def __init__(self):
+        self.entries = {}   # audio_id -> {'user_id', 'texts', 'created_at', 'segments'}
+        self._cond = threading.Condition()
+
+    def _purge(self, now):
+        expired = [key for key, entry in self.entries.items() if entry['created_at'] < now - Config.REPLY_AUDIO_TTL]
+        for key in expired:
+            del self.entries[key]
+        return len(expired)
+
+    def open(self, audio_id, user_id, texts):
+        """Register a reply and its segment texts; returns the number of expired entries dropped"""
+        now = time.time()
+        with self._cond:
+            purged = self._purge(now)
+            self.entries[audio_id] = {'user_id': user_id, 'texts': texts, 'created_at': now, 'segments': {}}
+        return purged
+
+    def put(self, audio_id, index, segment):
+        with self._cond:
+            entry = self.entries.get(audio_id)
+            if entry is not None:
+                entry['segments'][index] = segment
+                self._cond.notify_all()
+
+    def header(self, audio_id):
+        """(user_id, segment texts) of a reply, or None if unknown or expired"""
+        with self._cond:
+            entry = self.entries.get(audio_id)
+            return (entry['user_id'], entry['texts']) if entry else None
+
+    def get(self, audio_id, index, timeout):
+        """Segment dict once stored, or None after timeout"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                entry = self.entries.get(audio_id)
+                if entry is None:
+                    return None
+                if index in entry['segments']:
+                    return entry['segments'][index]
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+
+class SQLiteAudioStore:
+    """Reply audio in a SQLite file shared by the workers on a host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = threading.local()
+        self._pid = None
+
+    def _connection(self):
+        if self._pid != os.getpid():
+            # Connections must not cross a fork
+            self._conn = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._conn, 'value', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=0.5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            # idx -1 holds the header (owner, segment texts as a JSON list)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS reply_audio ('
+                'audio_id TEXT NOT NULL, idx INTEGER NOT NULL, user_id INTEGER, '
+                'text TEXT, audio_data TEXT, format TEXT, error TEXT, created_at REAL NOT NULL, '
+                'PRIMARY KEY (audio_id, idx))'
+            )
+            self._conn.value = conn
+        return conn
+
+    def open(self, audio_id, user_id, texts):
+        conn = self._connection()
+        now = time.time()
+        purged = conn.execute(
+            'DELETE FROM reply_audio WHERE idx = -1 AND created_at < ?', (now - Config.REPLY_AUDIO_TTL,)
+        ).rowcount
+        if purged:
+            conn.execute('DELETE FROM reply_audio WHERE created_at < ?', (now - Config.REPLY_AUDIO_TTL,))
+        conn.execute(
+            'INSERT OR REPLACE INTO reply_audio (audio_id, idx, user_id, text, created_at) VALUES (?, -1, ?, ?, ?)',
+            (audio_id, user_id, json.dumps(texts), now)
+        )
+        return purged
+
+    def put(self, audio_id, index, segment):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO reply_audio (audio_id, idx, text, audio_data, format, error, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (audio_id, index, segment['text'], segment.get('audio_data'), segment.get('format'),
+             segment.get('error'), time.time())
+        )
+
+    def header(self, audio_id):
+        row = self._connection().execute(
+            'SELECT user_id, text FROM reply_audio WHERE audio_id = ? AND idx = -1 AND created_at >= ?',
+            (audio_id, time.time() - Config.REPLY_AUDIO_TTL)
+        ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def get(self, audio_id, index, timeout):
+        conn = self._connection()
+        deadline = time.time() + timeout
+        while True:
+            row = conn.execute(
+                'SELECT text, audio_data, format, error FROM reply_audio WHERE audio_id = ? AND idx = ?',
+                (audio_id, index)
+            ).fetchone()
+            if row is not None:
+                segment = {'text': row[0]}
+                if row[3] is None:
+                    segment.update(audio_data=row[1], format=row[2])
+                else:
+                    segment['error'] = row[3]
+                return segment
+            if time.time() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+
+_store = {'audio': None}
+
+
+def _get_store():
+    if _store['audio'] is None:
+        _store['audio'] = SQLiteAudioStore(Config.REPLY_AUDIO_PATH) if Config.REPLY_AUDIO_PATH else MemoryAudioStore()
+    return _store['audio']
+
+
+def _reset_after_fork():
+    """The in-memory store belongs to the parent; workers start their own"""
+    _store['audio'] = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _synthesize_segment(audio_id, index, text, client, voice):
+    try:
+        success, result = client.synthesize_speech(text=text, **voice)
+    except Exception as e:
+        # Store the failure so the reader doesn't wait out REPLY_AUDIO_WAIT
+        success, result = False, {'error': str(e)}
+    if success:
+        segment = {'text': text, 'audio_data': result['audio_data'], 'format': result['format']}
+    else:
+        segment = {'text': text, 'error': result.get('error', 'Synthesis failed')}
+    try:
+        _get_store().put(audio_id, index, segment)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Could not store reply audio segment: %s", e)
+
+
+def start_reply_audio(text, language, user_id, **voice):
+    """
+    Start synthesising a chat reply in the background
+
+    Args:
+        text: Reply text
+        language: Target language (name or code) for sentence rules
+        user_id: Owner; only they can fetch the audio
+        **voice: character, voice_id, speed, volume, pitch for synthesize_speech
+
+    Returns:
+        Tuple of (audio_id, segments) or None if the audio could not be started
+    """
+    from services.minimax_client import minimax_client
+    from services.tts_pipeline import plan_segments, submit
+
+    segments = plan_segments(text, language)
+    if not segments:
+        return None
+
+    audio_id = uuid.uuid4().hex
+    try:
+        purged = _get_store().open(audio_id, user_id, segments)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Reply audio store unavailable: %s", e)
+        return None
+    if purged:
+        REPLY_AUDIO.inc(purged, outcome='expired')
+
+    for index, segment in enumerate(segments):
+        submit(_synthesize_segment, audio_id, index, segment, minimax_client, voice)
+    REPLY_AUDIO.inc(outcome='started')
+    logger.debug("Started reply audio %s: %d segments", audio_id, len(segments))
+    return audio_id, segments
+
+
+def get_reply_audio_segments(audio_id, user_id):
+    """Segment texts of a user's reply audio, or None if unknown, expired or not theirs"""
+    try:
+        header = _get_store().header(audio_id)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning("Reply audio store unavailable: %s", e)
+        return None
+    if header is None or header[0] != user_id:
+        return None
+    return header[1]
+
+
+def iter_reply_audio(audio_id, segments):
+    """
+    Yield a reply's segments in order as they become available
+
+    Args:
+        audio_id: ID from start_reply_audio()
+        segments: Texts from get_reply_audio_segments()
+
+    Yields:
+        Dicts with index, count, text and audio_data/format or error
+    """
+    REPLY_AUDIO.inc(outcome='fetched')
+    store = _get_store()
+    count = len(segments)
+    for index, text in enumerate(segments):
+        try:
+            segment = store.get(audio_id, index, Config.REPLY_AUDIO_WAIT)
+        except (sqlite3.Error, OSError) as e:
+            logger.warning("Reply audio store unavailable: %s", e)
+            segment = None
+        if segment is None:
+            segment = {'text': text, 'error': 'Audio not ready'}
+        yield dict(segment, index=index, count=count)
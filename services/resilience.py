@@ -0,0 +1,256 @@
+"""
+Resilience layer for outbound provider calls (Claude, Minimax).
+
+Every call goes through ResilientCaller.call(), which combines:
+- A per-provider circuit breaker: when the failure rate over the last
+  CIRCUIT_WINDOW seconds reaches CIRCUIT_FAILURE_RATE (with at least
+  CIRCUIT_MIN_CALLS calls), calls fail fast with CircuitOpenError for
+  CIRCUIT_COOLDOWN seconds, then a single trial call decides whether to close.
+- Retries with full-jitter exponential backoff (honouring Retry-After), capped
+  at RETRY_MAX_ATTEMPTS and by a retry budget: each call deposits
+  RETRY_BUDGET_RATIO tokens and each retry spends one, so retries can never
+  add more than that fraction of extra load while a provider is struggling.
+- Optional hedging: if the first attempt hasn't answered after `hedge_after`
+  seconds, a second identical request is sent and the first answer wins.
+  Hedges spend retry budget too. Only used for short idempotent calls (hints).
+
+State is per worker process; breakers and budgets don't need to agree across
+workers to protect them.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from config import Config
+from logging_config import get_logger
+from observability.metrics import PROVIDER_RETRIES, PROVIDER_CIRCUIT, PROVIDER_HEDGES
+
+logger = get_logger('resilience')
+
+
+class CircuitOpenError(Exception):
+    """The provider's circuit is open; the call was not attempted"""
+
+    def __init__(self, provider, retry_in):
+        super().__init__(f"{provider} is temporarily unavailable (circuit open, retry in {retry_in:.0f}s)")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+class RetryBudget:
+    """Token bucket limiting retries (and hedges) to a fraction of calls"""
+
+    def __init__(self, ratio, burst):
+        self.ratio = ratio
+        self.burst = burst
+        self.balance = float(burst)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.balance = min(self.burst, self.balance + self.ratio)
+
+    def withdraw(self):
+        """Spend one token; False when the budget is exhausted"""
+        with self._lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Closed -> open on a high failure rate, half-open trial after a cooldown"""
+
+    def __init__(self, provider, failure_rate, min_calls, window, cooldown):
+        self.provider = provider
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self.state = 'closed'
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.outcomes = deque()   # (monotonic time, ok)
+        self._lock = threading.Lock()
+
+    def _transition(self, state):
+        self.state = state
+        PROVIDER_CIRCUIT.inc(provider=self.provider, event=state)
+        log = logger.warning if state == 'open' else logger.info
+        log("Circuit for %s is now %s", self.provider, state)
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go out now"""
+        with self._lock:
+            if self.state == 'closed':
+                return
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.cooldown:
+                self._transition('half_open')
+            if self.state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+            PROVIDER_CIRCUIT.inc(provider=self.provider, event='rejected')
+            raise CircuitOpenError(self.provider, max(self.cooldown - (now - self.opened_at), 0))
+
+    def record(self, ok):
+        """Record the outcome of a call that went out"""
+        with self._lock:
+            now = time.monotonic()
+            if self.state == 'half_open':
+                self.trial_in_flight = False
+                self.outcomes.clear()
+                if ok:
+                    self._transition('closed')
+                else:
+                    self.opened_at = now
+                    self._transition('open')
+                return
+
+            self.outcomes.append((now, ok))
+            while self.outcomes and now - self.outcomes[0][0] > self.window:
+                self.outcomes.popleft()
+            if ok or self.state != 'closed' or len(self.outcomes) < self.min_calls:
+                return
+            failures = sum(1 for _, outcome in self.outcomes if not outcome)
+            if failures / len(self.outcomes) >= self.failure_rate:
+                self.opened_at = now
+                self._transition('open')
+
+    def release(self):
+        """A call ended without a provider verdict (e.g. a client error)"""
+        with self._lock:
+            self.trial_in_flight = False
+
+
+_hedge_executor = {'pool': None}
+_hedge_lock = threading.Lock()
+
+
+def _get_hedge_executor():
+    with _hedge_lock:
+        if _hedge_executor['pool'] is None:
+            _hedge_executor['pool'] = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedge')
+        return _hedge_executor['pool']
+
+
+def _reset_after_fork():
+    """Executor threads don't survive fork; workers create their own"""
+    global _hedge_lock
+    _hedge_lock = threading.Lock()
+    _hedge_executor['pool'] = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_retry_after(exc):
+    """Retry-After seconds from an HTTP error's response, if present"""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class ResilientCaller:
+    """Retries, retry budget, circuit breaker and hedging for one provider"""
+
+    def __init__(self, provider, is_retryable):
+        """
+        Args:
+            provider: Provider name (metrics label)
+            is_retryable: Callable(exception) -> True for transient provider
+                failures; other exceptions are raised immediately and don't
+                count against the circuit
+        """
+        self.provider = provider
+        self.is_retryable = is_retryable
+        self.budget = RetryBudget(Config.RETRY_BUDGET_RATIO, Config.RETRY_BUDGET_BURST)
+        self.breaker = CircuitBreaker(
+            provider, Config.CIRCUIT_FAILURE_RATE, Config.CIRCUIT_MIN_CALLS,
+            Config.CIRCUIT_WINDOW, Config.CIRCUIT_COOLDOWN
+        )
+
+    def backoff(self, attempt, exc):
+        """Full-jitter exponential delay before retry number `attempt` (1-based)"""
+        ceiling = min(Config.RETRY_MAX_DELAY, Config.RETRY_BASE_DELAY * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+        retry_after = get_retry_after(exc)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, Config.RETRY_MAX_DELAY))
+        return delay
+
+    def call(self, func, hedge_after=None):
+        """
+        Call `func` with retries under the circuit breaker
+
+        Args:
+            func: Zero-argument callable doing one request
+            hedge_after: Seconds after which a hedged duplicate is sent (None disables)
+
+        Returns:
+            Result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: The circuit is open
+            Exception: The last error once retries or the budget are exhausted
+        """
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_call()
+            try:
+                result = self._hedged(func, hedge_after) if hedge_after else func()
+            except Exception as e:
+                if not self.is_retryable(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record(False)
+                if attempt >= Config.RETRY_MAX_ATTEMPTS:
+                    raise
+                if not self.budget.withdraw():
+                    PROVIDER_RETRIES.inc(provider=self.provider, result='budget_exhausted')
+                    logger.warning("Retry budget for %s exhausted: %s", self.provider, e)
+                    raise
+                delay = self.backoff(attempt, e)
+                PROVIDER_RETRIES.inc(provider=self.provider, result='retried')
+                logger.warning("%s call failed (%s), retry %d in %.2fs", self.provider, e, attempt, delay)
+                time.sleep(delay)
+                continue
+            self.breaker.record(True)
+            return result
+
+    def _hedged(self, func, hedge_after):
+        """Run func; send a duplicate if it hasn't answered after hedge_after seconds"""
+        executor = _get_hedge_executor()
+        pending = {executor.submit(func)}
+        done, pending = wait(pending, timeout=hedge_after)
+        if not done and self.budget.withdraw():
+            PROVIDER_HEDGES.inc(provider=self.provider, result='launched')
+            hedge = executor.submit(func)
+            pending.add(hedge)
+        else:
+            hedge = None
+
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        PROVIDER_HEDGES.inc(provider=self.provider, result='won')
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
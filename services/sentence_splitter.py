@@ -0,0 +1,147 @@
+"""
+Sentence splitting for pipelined text-to-speech.
+
+Tutor replies are split on sentence-ending punctuation (. ! ? …) followed by
+whitespace, except after:
+- language-specific abbreviations ("z.B.", "Sr.", "Dr.", "e.g.");
+- German ordinal numbers, i.e. a number followed by a month name or a
+  lowercase word ("am 3. Mai", "der 2. versuch"), but not "Ich bin 25. Und du?";
+- single uppercase initials ("J. K. Rowling"), but not short words ("é.").
+
+Spanish sentences may open with ¿ or ¡, so those count as the start of the
+next sentence. Segments shorter than MIN_SEGMENT_CHARS ("Ja!", "Sí.") are
+joined to the following one so TTS isn't called for a single word.
+"""
+
+import re
+
+MIN_SEGMENT_CHARS = 12
+
+# Lowercase, with their trailing period
+ABBREVIATIONS = {
+    'german': {
+        'z.b.', 'd.h.', 'u.a.', 'usw.', 'bzw.', 'ca.', 'evtl.', 'ggf.', 'inkl.', 'nr.', 'str.',
+        'dr.', 'prof.', 'hr.', 'fr.', 'etc.', 'vgl.', 'sog.', 'bspw.',
+    },
+    'spanish': {
+        'sr.', 'sra.', 'srta.', 'dr.', 'dra.', 'ud.', 'uds.', 'etc.', 'p.ej.', 'aprox.', 'núm.', 'pág.', 'av.',
+    },
+    'portuguese': {
+        'sr.', 'sra.', 'dr.', 'dra.', 'etc.', 'p.ex.', 'av.', 'nº.', 'pág.', 'aprox.', 'prof.',
+    },
+    'english': {
+        'mr.', 'mrs.', 'ms.', 'dr.', 'prof.', 'st.', 'e.g.', 'i.e.', 'etc.', 'vs.', 'approx.',
+    },
+}
+
+LANGUAGE_ALIASES = {'de': 'german', 'es': 'spanish', 'pt': 'portuguese', 'en': 'english'}
+
+GERMAN_MONTHS = {
+    'januar', 'februar', 'märz', 'april', 'mai', 'juni', 'juli', 'august',
+    'september', 'oktober', 'november', 'dezember',
+}
+
+# Candidate boundary: terminal punctuation (plus closing quotes/brackets), then whitespace or ¿/¡
+_BOUNDARY = re.compile(r'([.!?…]+["\'»”)\]]*)(?:\s+|(?=[¿¡]))')
+_LAST_WORD = re.compile(r'(\S+)$')
+_NEXT_WORD = re.compile(r'\s*([^\s.,;:!?]+)')
+
+
+def resolve_language(language):
+    """Map 'de'/'de-DE'/'German' to the ABBREVIATIONS key (None if unknown)"""
+    language = (language or '').lower()
+    language = LANGUAGE_ALIASES.get(language.split('-')[0], language)
+    return language if language in ABBREVIATIONS else None
+
+
+def _is_boundary(text, position, punctuation, language):
+    """Whether the punctuation ending at `position` ends a sentence"""
+    if punctuation[0] != '.' or len(punctuation) > 1:
+        return True
+    last_word = _LAST_WORD.search(text[:position])
+    if last_word is None:
+        return True
+    word = last_word.group(1).lstrip('(¿¡"\'«“')
+    if language and word.lower() in ABBREVIATIONS[language]:
+        return False
+    if len(word) == 2 and word[0].isupper():
+        # Single initial: "J. K. Rowling"
+        return False
+    if language == 'german' and word[:-1].isdigit():
+        # Ordinal number: "am 3. Mai", "der 2. versuch" (but "Ich bin 25. Und du?" ends a sentence)
+        next_word = _NEXT_WORD.match(text, position)
+        if next_word and (next_word.group(1).islower() or next_word.group(1).lower() in GERMAN_MONTHS):
+            return False
+    return True
+
+
+def split_sentences(text, language=None):
+    """
+    Split text into sentences
+
+    Args:
+        text: Reply text
+        language: Target language (name or code) for abbreviation rules
+
+    Returns:
+        List of non-empty sentences, in order
+    """
+    text = ' '.join((text or '').split())
+    language = resolve_language(language)
+    sentences = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        end = match.end(1)
+        if _is_boundary(text, end, match.group(1), language):
+            sentences.append(text[start:end].strip())
+            start = match.end()
+    if text[start:].strip():
+        sentences.append(text[start:].strip())
+    return [sentence for sentence in sentences if sentence]
+
+
+def split_for_speech(text, language=None, min_chars=MIN_SEGMENT_CHARS):
+    """
+    Split text into TTS segments: sentences, with very short ones merged forward
+
+    Returns:
+        List of segments whose concatenation (with spaces) is the whole text
+    """
+    segments = []
+    pending = ''
+    for sentence in split_sentences(text, language):
+        pending = f'{pending} {sentence}'.strip()
+        if len(pending) >= min_chars:
+            segments.append(pending)
+            pending = ''
+    if pending:
+        if segments:
+            segments[-1] = f'{segments[-1]} {pending}'
+        else:
+            segments.append(pending)
+    return segments
+
+
+# (text, language, expected sentences); run with `python -m services.sentence_splitter`
+_SELF_CHECKS = [
+    ('Hallo! Wie geht es dir?', 'german', ['Hallo!', 'Wie geht es dir?']),
+    ('Ich wohne z.B. in Berlin. Und du?', 'german', ['Ich wohne z.B. in Berlin.', 'Und du?']),
+    ('Wir treffen uns am 3. Mai. Passt das?', 'german', ['Wir treffen uns am 3. Mai.', 'Passt das?']),
+    ('Das ist mein 2. versuch. Super!', 'german', ['Das ist mein 2. versuch.', 'Super!']),
+    ('Ich bin 25. Und du?', 'german', ['Ich bin 25.', 'Und du?']),
+    ('J. K. Rowling schreibt Bücher. Kennst du sie?', 'german', ['J. K. Rowling schreibt Bücher.', 'Kennst du sie?']),
+    ('O livro é. Eu gosto dele.', 'portuguese', ['O livro é.', 'Eu gosto dele.']),
+    ('Hola, Sr. García. ¿Cómo está?', 'spanish', ['Hola, Sr. García.', '¿Cómo está?']),
+    ('Muy bien.¡Gracias!', 'spanish', ['Muy bien.', '¡Gracias!']),
+]
+
+
+if __name__ == '__main__':
+    failures = 0
+    for text, language, expected in _SELF_CHECKS:
+        result = split_sentences(text, language)
+        if result != expected:
+            failures += 1
+            print(f"[ERROR] {text!r}: expected {expected}, got {result}")
+    print(f"[{'ERROR' if failures else 'SUCCESS'}] {len(_SELF_CHECKS) - failures}/{len(_SELF_CHECKS)} sentence splitting checks passed")
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,138 @@
+"""
+MinHash / LSH index for near-duplicate short texts.
+
+Texts are represented by their character trigrams. Each text gets a MinHash
+signature of NUM_PERMUTATIONS values; signatures are split into BANDS bands
+of ROWS rows and every band is a bucket key, so two texts become candidates
+when any band matches (likely once their trigram Jaccard similarity is above
+roughly (1/BANDS)^(1/ROWS) = 0.5). Candidates are then checked against the
+exact Jaccard similarity, so the threshold passed to lookup() is precise.
+
+Pure Python and in-process: entries are bounded (oldest evicted first) and
+carry an expiry time. Used by services/hint_cache.py.
+"""
+
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures must not change between processes or restarts
+_rng = random.Random(1729)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+
+def shingles(text):
+    """Character trigrams of a (normalised) text, padded so short words count"""
+    padded = f' {text} '
+    if len(padded) <= SHINGLE_SIZE:
+        return frozenset([padded])
+    return frozenset(padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1))
+
+
+@lru_cache(maxsize=32768)
+def _permuted_hashes(shingle):
+    """The shingle's value under every permutation (trigrams repeat across messages)"""
+    x = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+    return tuple((a * x + b) % _PRIME for a, b in _PERMUTATIONS)
+
+
+def minhash(shingle_set):
+    """MinHash signature of a shingle set"""
+    return tuple(map(min, zip(*(_permuted_hashes(shingle) for shingle in shingle_set))))
+
+
+def jaccard(first, second):
+    """Exact Jaccard similarity of two sets"""
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
+
+
+class MinHashIndex:
+    """Bounded LSH index of texts per group, returning the most similar stored value"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # (group, text) -> (shingles, band keys, value, expires_at)
+        self.buckets = {}              # (group, band, rows) -> set of (group, text)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _band_keys(group, signature):
+        return [(group, band, signature[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS)]
+
+    def add(self, group, text, value, ttl):
+        """
+        Index a text
+
+        Args:
+            group: Partition key (only texts in the same group are compared)
+            text: Normalised text
+            value: Stored value returned by lookup()
+            ttl: Seconds until the entry expires
+        """
+        shingle_set = shingles(text)
+        band_keys = self._band_keys(group, minhash(shingle_set))
+        key = (group, text)
+        with self._lock:
+            self._remove(key)
+            self.entries[key] = (shingle_set, band_keys, value, time.time() + ttl)
+            for band_key in band_keys:
+                self.buckets.setdefault(band_key, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for band_key in entry[1]:
+            bucket = self.buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band_key]
+
+    def lookup(self, group, text, threshold):
+        """
+        Find the most similar indexed text
+
+        Args:
+            group: Partition key
+            text: Normalised text
+            threshold: Minimum trigram Jaccard similarity
+
+        Returns:
+            Tuple of (stored text, value, similarity) or None
+        """
+        shingle_set = shingles(text)
+        band_keys = self._band_keys(group, minhash(shingle_set))
+        now = time.time()
+        best = None
+        with self._lock:
+            candidates = set()
+            for band_key in band_keys:
+                candidates |= self.buckets.get(band_key, set())
+            for key in candidates:
+                stored_shingles, _, value, expires_at = self.entries[key]
+                if expires_at < now:
+                    self._remove(key)
+                    continue
+                similarity = jaccard(shingle_set, stored_shingles)
+                if similarity >= threshold and (best is None or similarity > best[2]):
+                    best = (key[1], value, similarity)
+        return best
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.buckets.clear()
@@ -0,0 +1,222 @@
+"""
+Single-flight deduplication of identical provider calls.
+
+A page reload, a double-tapped speaker button or two learners opening the same
+topic fire identical TTS and Claude requests at the same moment. SingleFlight.do()
+makes concurrent calls with the same fingerprint wait for one upstream call and
+share its result (or its error):
+
+- within a worker, followers wait on the leader's in-flight call;
+- across the workers on a host (SINGLE_FLIGHT_PATH set), the leader claims a row
+  in a SQLite lock table and publishes its encoded result there for
+  SINGLE_FLIGHT_RESULT_TTL seconds; other workers poll for it. A follower whose
+  leader fails, or takes longer than SINGLE_FLIGHT_TIMEOUT, calls upstream itself.
+
+Only calls that are safe to share belong here: the same fingerprint must mean
+the same request. Errors in the lock table never fail a call.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import Config
+from logging_config import get_logger
+from observability.metrics import SINGLE_FLIGHT_CALLS
+
+logger = get_logger('single_flight')
+
+# Seconds between lock table polls while another worker is the leader
+POLL_INTERVAL = 0.05
+
+
+def fingerprint(*parts):
+    """Stable key for a request built from JSON-serialisable parts"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    """One in-flight call in this worker"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_shared = {'conn': threading.local(), 'pid': None}
+
+
+def _connection():
+    """Per-thread connection to the cross-worker lock table (None if disabled)"""
+    if not Config.SINGLE_FLIGHT_PATH:
+        return None
+    if _shared['pid'] != os.getpid():
+        # Connections must not cross a fork
+        _shared['conn'] = threading.local()
+        _shared['pid'] = os.getpid()
+    conn = getattr(_shared['conn'], 'value', None)
+    if conn is None:
+        directory = os.path.dirname(Config.SINGLE_FLIGHT_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(Config.SINGLE_FLIGHT_PATH, timeout=0.5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS single_flight ('
+            'key TEXT PRIMARY KEY, owner TEXT NOT NULL, result TEXT, expires_at REAL NOT NULL)'
+        )
+        _shared['conn'].value = conn
+    return conn
+
+
+class SingleFlight:
+    """Deduplicates concurrent identical calls for one kind of request"""
+
+    def __init__(self, name):
+        """
+        Args:
+            name: Flight name (metrics label and lock table key prefix)
+        """
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget in-flight calls (their threads don't survive a fork)"""
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, encode=None, decode=None):
+        """
+        Run func once for all concurrent callers with the same key
+
+        Args:
+            key: Request fingerprint (see fingerprint())
+            func: Zero-argument callable doing the upstream call
+            encode: Callable(result) -> JSON-serialisable value; enables sharing across workers
+            decode: Inverse of encode
+
+        Returns:
+            Tuple of (result, shared) where shared is True when another caller made the call
+
+        Raises:
+            Exception: Whatever func raised (followers in this worker get the leader's error)
+        """
+        if not Config.SINGLE_FLIGHT_ENABLED:
+            return func(), False
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(Config.SINGLE_FLIGHT_TIMEOUT):
+                SINGLE_FLIGHT_CALLS.inc(flight=self.name, role='follower')
+                if call.error is not None:
+                    raise call.error
+                return copy.deepcopy(call.value), True
+            logger.warning("%s leader still running after %.0fs, calling upstream", self.name, Config.SINGLE_FLIGHT_TIMEOUT)
+            return func(), False
+
+        try:
+            if encode is not None and decode is not None:
+                call.value, shared = self._do_shared(key, func, encode, decode)
+            else:
+                call.value, shared = func(), False
+            if not shared:
+                SINGLE_FLIGHT_CALLS.inc(flight=self.name, role='leader')
+            return call.value, shared
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _do_shared(self, key, func, encode, decode):
+        """Lead or follow through the cross-worker lock table"""
+        row_key = f'{self.name}:{key}'
+        owner = f'{os.getpid()}:{threading.get_ident()}'
+        try:
+            conn = _connection()
+            if conn is None:
+                return func(), False
+            now = time.time()
+            conn.execute('DELETE FROM single_flight WHERE expires_at <= ?', (now,))
+            claimed = conn.execute(
+                'INSERT OR IGNORE INTO single_flight (key, owner, result, expires_at) VALUES (?, ?, NULL, ?)',
+                (row_key, owner, now + Config.SINGLE_FLIGHT_TIMEOUT)
+            ).rowcount == 1
+        except (sqlite3.Error, OSError) as e:
+            logger.debug("Single-flight lock table unavailable: %s", e)
+            return func(), False
+
+        if claimed:
+            return self._lead(conn, row_key, owner, func, encode), False
+
+        deadline = time.monotonic() + Config.SINGLE_FLIGHT_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                row = conn.execute(
+                    'SELECT result FROM single_flight WHERE key = ? AND expires_at > ?', (row_key, time.time())
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.debug("Single-flight poll failed: %s", e)
+                break
+            if row is None:
+                # The leader failed or its claim expired
+                break
+            if row[0] is not None:
+                SINGLE_FLIGHT_CALLS.inc(flight=self.name, role='remote_follower')
+                return decode(json.loads(row[0])), True
+            time.sleep(POLL_INTERVAL)
+        return func(), False
+
+    def _lead(self, conn, row_key, owner, func, encode):
+        """Make the call and publish its result to other workers"""
+        try:
+            value = func()
+        except Exception:
+            try:
+                conn.execute('DELETE FROM single_flight WHERE key = ? AND owner = ?', (row_key, owner))
+            except sqlite3.Error as e:
+                logger.debug("Single-flight release failed: %s", e)
+            raise
+        try:
+            conn.execute(
+                'UPDATE single_flight SET result = ?, expires_at = ? WHERE key = ? AND owner = ?',
+                (json.dumps(encode(value), ensure_ascii=False), time.time() + Config.SINGLE_FLIGHT_RESULT_TTL,
+                 row_key, owner)
+            )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.debug("Single-flight publish failed: %s", e)
+        return value
+
+
+_flights = []
+
+
+def get_flight(name):
+    """Create a named flight (reset automatically in forked workers)"""
+    flight = SingleFlight(name)
+    _flights.append(flight)
+    return flight
+
+
+def _reset_after_fork():
+    for flight in _flights:
+        flight.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
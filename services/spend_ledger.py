@@ -0,0 +1,123 @@
+"""
+Per-user provider spend ledger and daily budgets.
+
+Claude usage (ClaudeClient._record_usage) and Minimax characters
+(MinimaxClient._synthesize) are added to the current request with
+record_spend(). Rate-limited routes (services/rate_limit.py) write the
+request's total to usage_ledger with one upsert per request, keyed by user
+and UTC day, and refuse new requests once a user has spent
+DAILY_TOKEN_BUDGET Claude tokens or DAILY_TTS_CHAR_BUDGET TTS characters
+that day.
+
+Calls that shared another request's result (single flight, hint cache)
+spent nothing and are not recorded. Ledger errors never fail a request.
+"""
+
+from datetime import datetime
+
+from flask import g, has_request_context
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import Config
+from database import db
+from logging_config import get_logger
+from models.usage_ledger import UsageLedger
+
+logger = get_logger('spend')
+
+SPEND_FIELDS = ('input_tokens', 'output_tokens', 'tts_characters')
+
+# Budget kind -> (ledger columns summed, Config attribute)
+BUDGETS = {
+    'tokens': (('input_tokens', 'output_tokens'), 'DAILY_TOKEN_BUDGET'),
+    'tts': (('tts_characters',), 'DAILY_TTS_CHAR_BUDGET'),
+}
+
+
+def record_spend(**amounts):
+    """
+    Add provider spend to the current request (no-op outside a request)
+
+    Args:
+        **amounts: input_tokens, output_tokens and/or tts_characters
+    """
+    if not has_request_context():
+        return
+    spend = g.setdefault('provider_spend', dict.fromkeys(SPEND_FIELDS, 0))
+    for field, amount in amounts.items():
+        spend[field] += amount or 0
+
+
+def get_request_spend():
+    """Spend recorded so far in this request"""
+    return dict(g.get('provider_spend') or dict.fromkeys(SPEND_FIELDS, 0))
+
+
+def today():
+    """Ledger day (UTC)"""
+    return datetime.utcnow().date()
+
+
+def seconds_until_reset():
+    """Seconds until the budgets reset at UTC midnight"""
+    now = datetime.utcnow()
+    return 86400 - (now.hour * 3600 + now.minute * 60 + now.second)
+
+
+def check_budget(user_id, kind):
+    """
+    Check a user's daily budget
+
+    Args:
+        user_id: User ID
+        kind: 'tokens' or 'tts' (see BUDGETS)
+
+    Returns:
+        Tuple of (within_budget, spent, budget)
+    """
+    columns, setting = BUDGETS[kind]
+    budget = getattr(Config, setting)
+    if not budget or not user_id:
+        return True, 0, budget
+    try:
+        row = db.session.execute(
+            select(*(getattr(UsageLedger, column) for column in columns))
+            .where(UsageLedger.user_id == user_id, UsageLedger.day == today())
+        ).first()
+    except Exception as e:
+        logger.warning("Could not read spend ledger: %s", e)
+        db.session.rollback()
+        return True, 0, budget
+    spent = sum(row) if row else 0
+    return spent < budget, spent, budget
+
+
+def flush_spend(user_id):
+    """Add this request's spend to the user's ledger row for today"""
+    spend = get_request_spend()
+    if not user_id or not any(spend.values()):
+        return
+    table = UsageLedger.__table__
+    values = dict(spend, user_id=user_id, day=today(), requests=1, updated_at=datetime.utcnow())
+    dialect = db.engine.dialect.name
+    try:
+        if dialect in ('postgresql', 'sqlite'):
+            insert = (postgresql if dialect == 'postgresql' else sqlite).insert(table).values(**values)
+            updates = {field: table.c[field] + insert.excluded[field] for field in SPEND_FIELDS + ('requests',)}
+            updates['updated_at'] = insert.excluded.updated_at
+            db.session.execute(insert.on_conflict_do_update(index_elements=['user_id', 'day'], set_=updates))
+        else:
+            entry = UsageLedger.query.filter_by(user_id=user_id, day=values['day']).with_for_update().first()
+            if entry is None:
+                db.session.add(UsageLedger(**values))
+            else:
+                for field in SPEND_FIELDS + ('requests',):
+                    setattr(entry, field, getattr(entry, field) + values[field])
+                entry.updated_at = values['updated_at']
+        db.session.commit()
+        g.provider_spend = dict.fromkeys(SPEND_FIELDS, 0)
+    except Exception as e:
+        logger.warning("Could not record spend for user %s: %s", user_id, e)
+        db.session.rollback()
+
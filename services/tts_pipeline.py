@@ -0,0 +1,95 @@
+"""
+Sentence-pipelined text-to-speech.
+
+A multi-sentence reply synthesised in one Minimax call can only start playing
+once all of it is rendered. synthesize_pipelined() splits the reply into
+sentences (services/sentence_splitter.py), submits every segment to a bounded
+per-worker pool (TTS_PIPELINE_WORKERS threads shared by all requests) and
+yields the results strictly in order, so the first sentence can play while
+the rest are still being synthesised.
+
+Each segment goes through MinimaxClient.synthesize_speech, so retries, the
+circuit breaker and single-flight deduplication apply per sentence.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import Config
+from logging_config import get_logger
+from services.sentence_splitter import split_for_speech
+
+logger = get_logger('minimax')
+
+_executor = {'pool': None}
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    with _executor_lock:
+        if _executor['pool'] is None:
+            _executor['pool'] = ThreadPoolExecutor(
+                max_workers=Config.TTS_PIPELINE_WORKERS, thread_name_prefix='tts-pipeline'
+            )
+        return _executor['pool']
+
+
+def _reset_after_fork():
+    """Executor threads don't survive fork; workers create their own"""
+    global _executor_lock
+    _executor_lock = threading.Lock()
+    _executor['pool'] = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def submit(func, *args, **kwargs):
+    """Run func on the shared TTS pool; returns its Future"""
+    return _get_executor().submit(func, *args, **kwargs)
+
+
+def plan_segments(text, language=None):
+    """
+    Split a reply into at most TTS_PIPELINE_MAX_SEGMENTS speech segments
+
+    Args:
+        text: Reply text
+        language: Target language (name or code) for sentence rules
+
+    Returns:
+        List of segments
+    """
+    segments = split_for_speech(text, language)
+    limit = max(Config.TTS_PIPELINE_MAX_SEGMENTS, 1)
+    if len(segments) > limit:
+        # Fold the tail into the last segment rather than dropping it
+        segments = segments[:limit - 1] + [' '.join(segments[limit - 1:])]
+    return segments
+
+
+def synthesize_pipelined(segments, client, **voice):
+    """
+    Synthesise segments concurrently and yield them in order
+
+    Args:
+        segments: Texts from plan_segments()
+        client: MinimaxClient
+        **voice: character, voice_id, speed, volume, pitch for synthesize_speech
+
+    Yields:
+        Tuple of (index, segment, success, result) as each next segment is ready
+    """
+    executor = _get_executor()
+    futures = [executor.submit(client.synthesize_speech, text=segment, **voice) for segment in segments]
+    try:
+        for index, (segment, future) in enumerate(zip(segments, futures)):
+            success, result = future.result()
+            yield index, segment, success, result
+    finally:
+        # The client went away: don't synthesise segments nobody will hear
+        cancelled = sum(1 for future in futures if future.cancel())
+        if cancelled:
+            logger.debug("Cancelled %d pending TTS segments", cancelled)
@@ -100,8 +100,9 @@ class ChatInterface {
      * Play TTS for assistant response
      * @param {string} text - Text to speak
      * @param {string} character - Character name for voice selection
+     * @param {Object} audio - Server-started reply audio ({url, segments}) from the chat response, if any
      */
-    async playAssistantResponse(text, character) {
+    async playAssistantResponse(text, character, audio = null) {
         if (!this.voiceOutput) {
             console.warn('[CHAT WRAPPER] VoiceOutput not initialized');
             return;
@@ -114,7 +115,7 @@ class ChatInterface {
             // (handled by voice-output.js onplay event)
             
             // Play the speech
-            await this.voiceOutput.speak(text);
+            await this.voiceOutput.speak(text, audio ? { audioUrl: audio.url } : {});
             
             // Return avatar to idle state
             if (window.avatarController && window.avatarController.isReady()) {
@@ -10,6 +10,7 @@ class VoiceOutput {
         this.isPlaying = false;
         this.currentUtterance = null;
         this.currentAudio = null;
+        this.pipelineController = null;
         this.queue = [];
         
         // Volume management
@@ -24,7 +25,8 @@ class VoiceOutput {
                 voice_id: null,  // Now handled by page-specific window.VOICE_CONFIG
                 language: 'English',
                 sample_rate: 24000,
-                bitrate: 128000
+                bitrate: 128000,
+                pipelined: true  // Stream sentence by sentence so playback starts after the first one
             },
             // Browser TTS configuration
             browser: {
@@ -150,6 +152,18 @@ class VoiceOutput {
         // Try primary provider first, fallback if it fails
         try {
             if (this.currentProvider === 'minimax') {
+                // Audio the server started with the chat reply: nothing to upload
+                if (options.audioUrl && this.isPipelineEnabled({ pipelined: true })) {
+                    try {
+                        return await this.speakWithMinimaxPipelined(cleanText, options);
+                    } catch (error) {
+                        console.warn('Server-started audio unavailable, requesting TTS:', error);
+                        options = { ...options, audioUrl: null };
+                    }
+                }
+                if (this.isPipelineEnabled(options)) {
+                    return await this.speakWithMinimaxPipelined(cleanText, options);
+                }
                 return await this.speakWithMinimax(cleanText, options);
             } else {
                 return await this.speakWithBrowser(cleanText, options);
@@ -244,6 +258,194 @@ class VoiceOutput {
         }
     }
     
+    /**
+     * Whether to use sentence-pipelined Minimax synthesis
+     * @param {Object} options - Override options
+     * @returns {boolean}
+     */
+    isPipelineEnabled(options = {}) {
+        const setting = options.pipelined ?? window.VOICE_CONFIG?.pipelined ?? this.config.minimax.pipelined;
+        return Boolean(setting) && typeof ReadableStream !== 'undefined' && typeof TextDecoder !== 'undefined';
+    }
+    
+    /**
+     * Speak text using sentence-pipelined Minimax synthesis
+     * The server streams one JSON line per sentence, in order, as soon as each is
+     * synthesised; each sentence plays as soon as it arrives and the previous one ends.
+     * With options.audioUrl the stream is the audio the server started with the chat reply.
+     * @param {string} text - Cleaned text to speak
+     * @param {Object} options - Override options
+     * @returns {Promise<void>}
+     */
+    async speakWithMinimaxPipelined(text, options = {}) {
+        const controller = new AbortController();
+        this.pipelineController = controller;
+        
+        const requestData = {
+            text: text,
+            pipelined: true,
+            language: options.language || this.config.minimax.language,
+            target_language: options.targetLanguage || window.VOICE_CONFIG?.targetLanguage
+        };
+        const voiceId = options.voice_id || window.VOICE_CONFIG?.voice_id;
+        if (voiceId) {
+            requestData.voice_id = voiceId;
+        }
+        if (window.VOICE_CONFIG?.character) {
+            requestData.character = window.VOICE_CONFIG.character;
+        }
+        
+        const ttsEndpoint = options.audioUrl || window.VOICE_CONFIG?.ttsEndpoint || '/api/casual-chat/tts';
+        const fetchFn = typeof fetchWithCredentials !== 'undefined' ? fetchWithCredentials : fetch;
+        const fetchOptions = options.audioUrl ? {
+            method: 'GET',
+            signal: controller.signal
+        } : {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(requestData),
+            signal: controller.signal
+        };
+        if (fetchFn === fetch) {
+            fetchOptions.credentials = 'include';
+        }
+        
+        console.log(options.audioUrl ? '🌐 Fetching server-started reply audio...' : '🌐 Calling Minimax TTS API (pipelined)...');
+        const response = await fetchFn(ttsEndpoint, fetchOptions);
+        
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            throw new Error(errorData.error || `HTTP ${response.status}`);
+        }
+        
+        // Non-streaming server (pipelining disabled): play the single response
+        if (!response.body || !(response.headers.get('Content-Type') || '').includes('ndjson')) {
+            const data = await response.json();
+            if (!data.audio_data) {
+                throw new Error('No audio data received from API');
+            }
+            return await this.playAudioFromUrl(URL.createObjectURL(this.hexToAudioBlob(data.audio_data, 'audio/mp3')));
+        }
+        
+        this.isPlaying = true;
+        let playback = Promise.resolve();
+        let segmentsPlayed = 0;
+        
+        const enqueueSegment = (segment) => {
+            playback = playback.then(async () => {
+                if (controller.signal.aborted) {
+                    return;
+                }
+                if (segment.audio_data) {
+                    const audioUrl = URL.createObjectURL(this.hexToAudioBlob(segment.audio_data, 'audio/mp3'));
+                    await this.playAudioSegment(audioUrl);
+                } else {
+                    console.warn(`Segment ${segment.index} failed (${segment.error}), using browser TTS`);
+                    await this.speakSegmentWithBrowser(segment.text);
+                }
+                segmentsPlayed++;
+            });
+        };
+        
+        try {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) {
+                    break;
+                }
+                buffer += decoder.decode(value, { stream: true });
+                let newline;
+                while ((newline = buffer.indexOf('\n')) >= 0) {
+                    const line = buffer.slice(0, newline).trim();
+                    buffer = buffer.slice(newline + 1);
+                    if (!line) {
+                        continue;
+                    }
+                    const segment = JSON.parse(line);
+                    if (!segment.done) {
+                        enqueueSegment(segment);
+                    }
+                }
+            }
+            
+            await playback;
+        } catch (error) {
+            this.isPlaying = false;
+            if (controller.signal.aborted) {
+                return;
+            }
+            // Nothing was heard yet: let speak() fall back to another provider
+            if (segmentsPlayed === 0) {
+                throw error;
+            }
+            console.error('Pipelined TTS interrupted:', error);
+        } finally {
+            if (this.pipelineController === controller) {
+                this.pipelineController = null;
+            }
+        }
+        
+        if (controller.signal.aborted) {
+            return;
+        }
+        return await new Promise(resolve => this.handleAudioEnd(resolve));
+    }
+    
+    /**
+     * Play one pipelined segment without ending the overall speech
+     * @param {string} audioUrl - Blob URL of the segment audio
+     * @returns {Promise<void>}
+     */
+    playAudioSegment(audioUrl) {
+        return new Promise((resolve, reject) => {
+            const audio = new Audio(audioUrl);
+            this.currentAudio = audio;
+            audio.volume = this.isMuted ? 0 : this.currentVolume;
+            audio.onplay = () => this.handleAudioStart();
+            audio.onended = () => {
+                URL.revokeObjectURL(audioUrl);
+                resolve();
+            };
+            audio.onerror = (event) => {
+                URL.revokeObjectURL(audioUrl);
+                reject(new Error('Audio playback failed'));
+            };
+            audio.play().catch(reject);
+        });
+    }
+    
+    /**
+     * Speak one pipelined segment with browser TTS without ending the overall speech
+     * @param {string} text - Segment text
+     * @returns {Promise<void>}
+     */
+    speakSegmentWithBrowser(text) {
+        return new Promise(resolve => {
+            if (!this.isBrowserSupported) {
+                resolve();
+                return;
+            }
+            const utterance = new SpeechSynthesisUtterance(text);
+            utterance.rate = this.config.browser.rate;
+            utterance.pitch = this.config.browser.pitch;
+            utterance.volume = this.isMuted ? 0 : this.currentVolume;
+            utterance.lang = this.config.browser.language;
+            if (this.config.browser.voice) {
+                utterance.voice = this.config.browser.voice;
+            }
+            utterance.onend = () => resolve();
+            utterance.onerror = () => resolve();
+            this.currentUtterance = utterance;
+            speechSynthesis.speak(utterance);
+        });
+    }
+    
     /**
      * Speak text using Browser TTS
      * @param {string} text - Cleaned text to speak
@@ -503,6 +705,12 @@ class VoiceOutput {
     stop() {
         console.log('🛑 Stopping speech output');
         
+        // Stop a pipelined stream (pending segments won't be fetched or played)
+        if (this.pipelineController) {
+            this.pipelineController.abort();
+            this.pipelineController = null;
+        }
+        
         // Stop current speech/audio
         if (this.isPlaying) {
             // Stop browser TTS
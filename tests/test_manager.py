@@ -3,9 +3,7 @@
 
 from database import db
 from models.test_progress import TestProgress
-from models.topic_progress import TopicProgress
-from models.user_progress import UserProgress
-from sqlalchemy.exc import IntegrityError
+from progress.progression_engine import get_progression_engine
 
 class TestManager:
     """Manages test progression and level advancement"""
@@ -52,51 +50,7 @@ class TestManager:
             Tuple (unlocked: bool, message: str)
         """
         try:
-            # Get completed topics
-            completed_topics = TopicProgress.query.filter_by(
-                user_progress_id=user_progress_id,
-                completed=True
-            ).all()
-            
-            completed_numbers = [t.topic_number for t in completed_topics]
-            
-            # Define requirements for each test
-            requirements = {
-                'checkpoint_1': {
-                    'topics': [1, 2, 3, 4],
-                    'message': 'Complete topics 1-4 to unlock Test 1'
-                },
-                'checkpoint_2': {
-                    'topics': [5, 6, 7, 8],
-                    'message': 'Complete topics 5-8 to unlock Test 2',
-                    'prerequisite_test': 'checkpoint_1'
-                },
-                'final': {
-                    'topics': [9, 10, 11, 12],
-                    'message': 'Complete topics 9-12 to unlock Final Test',
-                    'prerequisite_test': 'checkpoint_2'
-                }
-            }
-            
-            if test_type not in requirements:
-                return False, 'Invalid test type'
-            
-            req = requirements[test_type]
-            
-            # Check prerequisite test if exists
-            if 'prerequisite_test' in req:
-                prereq_test = self.get_test_progress(user_progress_id, req['prerequisite_test'])
-                if not prereq_test or not prereq_test.passed:
-                    return False, f'Must pass {req["prerequisite_test"]} first'
-            
-            # Check required topics
-            topics_complete = all(topic in completed_numbers for topic in req['topics'])
-            
-            if topics_complete:
-                return True, 'Test is unlocked'
-            else:
-                missing = [t for t in req['topics'] if t not in completed_numbers]
-                return False, f'{req["message"]} (Missing topics: {missing})'
+            return get_progression_engine(user_progress_id).is_test_unlocked(test_type)
             
         except Exception as e:
             print(f"Error checking test unlock: {e}")
@@ -161,8 +115,8 @@ class TestManager:
             Dict with advancement info
         """
         try:
-            # Get user progress
-            user_progress = UserProgress.query.get(user_progress_id)
+            # Get user progress (from the request's progress snapshot)
+            user_progress = get_progression_engine(user_progress_id).user_progress
             if not user_progress:
                 return {'error': 'User progress not found'}
             
@@ -278,46 +232,7 @@ class TestManager:
             Dict with test unlock info or None
         """
         try:
-            # Get completed topics
-            completed_topics = TopicProgress.query.filter_by(
-                user_progress_id=user_progress_id,
-                completed=True
-            ).all()
-
-            completed_numbers = set(t.topic_number for t in completed_topics)
-
-            # Check each test type
-            tests_to_check = [
-                ('checkpoint_1', {1, 2, 3, 4}, 'Test 1 is now available'),
-                ('checkpoint_2', {5, 6, 7, 8}, 'Test 2 is now available'),
-                ('final', {9, 10, 11, 12}, 'Final Test is now available')
-            ]
-
-            for test_type, required_topics, message in tests_to_check:
-                # Check if all required topics are completed
-                if required_topics.issubset(completed_numbers):
-                    # Check if test is not yet passed
-                    test_progress = self.get_test_progress(user_progress_id, test_type)
-                    if test_progress and not test_progress.passed:
-                        # Check prerequisites
-                        if test_type == 'checkpoint_2':
-                            prereq = self.get_test_progress(user_progress_id, 'checkpoint_1')
-                            if not prereq or not prereq.passed:
-                                continue
-                        elif test_type == 'final':
-                            prereq = self.get_test_progress(user_progress_id, 'checkpoint_2')
-                            if not prereq or not prereq.passed:
-                                continue
-
-                        # Test is newly unlocked
-                        return {
-                            'test_type': test_type,
-                            'test_number': test_progress.test_number,
-                            'message': message,
-                            'unlocked': True
-                        }
-
-            return None
+            return get_progression_engine(user_progress_id).newly_unlocked_test()
 
         except Exception as e:
             print(f"Error checking test unlock: {e}")
@@ -368,33 +283,7 @@ class TestManager:
             Tuple (can_proceed: bool, blocking_test: str or None)
         """
         try:
-            # Topics 5-8 require checkpoint_1
-            if topic_number in [5, 6, 7, 8]:
-                test = self.get_test_progress(user_progress_id, 'checkpoint_1')
-                if not test or not test.passed:
-                    # Check if topics 1-4 are complete
-                    topics_complete = TopicProgress.query.filter_by(
-                        user_progress_id=user_progress_id,
-                        completed=True
-                    ).filter(TopicProgress.topic_number.in_([1, 2, 3, 4])).count() == 4
-
-                    if topics_complete:
-                        return False, 'checkpoint_1'
-
-            # Topics 9-12 require checkpoint_2
-            elif topic_number in [9, 10, 11, 12]:
-                test = self.get_test_progress(user_progress_id, 'checkpoint_2')
-                if not test or not test.passed:
-                    # Check if topics 5-8 are complete
-                    topics_complete = TopicProgress.query.filter_by(
-                        user_progress_id=user_progress_id,
-                        completed=True
-                    ).filter(TopicProgress.topic_number.in_([5, 6, 7, 8])).count() == 4
-
-                    if topics_complete:
-                        return False, 'checkpoint_2'
-
-            return True, None
+            return get_progression_engine(user_progress_id).can_proceed_to_topic(topic_number)
 
         except Exception as e:
             print(f"Error checking topic proceed: {e}")
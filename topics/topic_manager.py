@@ -5,8 +5,18 @@ from database import db
 from models.topic_definition import TopicDefinition
 from models.topic_progress import TopicProgress
 from models.test_progress import TestProgress
-from models.user_progress import UserProgress
-from sqlalchemy.exc import IntegrityError
+from progress.progression_engine import get_progression_engine
+from sqlalchemy.orm import Session
+from logging_config import get_logger
+from observability.metrics import record_cache
+
+logger = get_logger('topics')
+
+# Topic definitions keyed by (level, topic_number), shared by every request in
+# the process. Definitions only change through migrations, so they are loaded
+# once (at warm-up or on first use) in a separate session and kept detached so
+# request commits can't expire them. Treat them as read-only.
+_topic_catalog = None
 
 class TopicManager:
     """Manages topic progression and tracking for language learning"""
@@ -14,6 +24,36 @@ class TopicManager:
     def __init__(self):
         """Initialize the TopicManager"""
         self.db = db
+
+    @classmethod
+    def load_topic_catalog(cls):
+        """
+        Load every topic definition into the process-wide catalog
+
+        Call again after changing topic definitions to pick them up.
+
+        Returns:
+            Number of topics loaded (0 if the catalog could not be built)
+        """
+        global _topic_catalog
+        try:
+            with Session(db.engine) as session:
+                topics = session.query(TopicDefinition).all()
+            # An empty table (fresh database) is retried on the next lookup
+            _topic_catalog = {(topic.level, topic.topic_number): topic for topic in topics} or None
+            return len(topics)
+        except Exception as e:
+            logger.warning("Could not load topic catalog: %s", e)
+            return 0
+
+    @staticmethod
+    def _get_topic_catalog():
+        """Get the catalog, loading it on first use (None if it can't be built)"""
+        hit = _topic_catalog is not None
+        if not hit:
+            TopicManager.load_topic_catalog()
+        record_cache('topic_catalog', hit)
+        return _topic_catalog
     
     def get_topic_definition(self, level, topic_number):
         """
@@ -24,9 +64,13 @@ class TopicManager:
             topic_number: The topic number (1-12)
         
         Returns:
-            TopicDefinition object or None
+            TopicDefinition object (detached, read-only) or None
         """
         try:
+            catalog = self._get_topic_catalog()
+            if catalog is not None:
+                return catalog.get((level.upper(), int(topic_number)))
+
             topic = TopicDefinition.query.filter_by(
                 level=level.upper(),
                 topic_number=topic_number
@@ -44,9 +88,17 @@ class TopicManager:
             level: The level (A1, A2, B1, B2)
         
         Returns:
-            List of TopicDefinition objects
+            List of TopicDefinition objects (detached, read-only)
         """
         try:
+            catalog = self._get_topic_catalog()
+            if catalog is not None:
+                level = level.upper()
+                return sorted(
+                    (topic for (topic_level, _), topic in catalog.items() if topic_level == level),
+                    key=lambda topic: topic.topic_number
+                )
+
             topics = TopicDefinition.query.filter_by(
                 level=level.upper()
             ).order_by(TopicDefinition.topic_number).all()
@@ -101,7 +153,7 @@ class TopicManager:
             if existing:
                 return existing
 
-            print(f"[WARNING] Topic progress missing for topic {topic_number}, creating...")
+            logger.warning("Topic progress missing for topic %s, creating it", topic_number)
 
             # Create it if missing
             new_progress = TopicProgress(
@@ -113,7 +165,7 @@ class TopicManager:
             self.db.session.add(new_progress)
             self.db.session.commit()
 
-            print(f"[SUCCESS] Created missing topic progress for topic {topic_number}")
+            logger.info("Created missing topic progress for topic %s", topic_number)
             return new_progress
 
         except Exception as e:
@@ -201,90 +253,9 @@ class TopicManager:
             Dict with current topic info or None
         """
         try:
-            # Get user progress to determine level
-            user_progress = UserProgress.query.get(user_progress_id)
-            if not user_progress:
-                return None
+            # Gating rules live in the progression engine (one snapshot per request)
+            return get_progression_engine(user_progress_id).current_topic()
 
-            # Get all topic progress
-            all_progress = self.get_user_topic_progress(user_progress_id, user_progress.current_level)
-            
-            if not all_progress:
-                return None
-            
-            # Get test progress
-            tests = TestProgress.query.filter_by(
-                user_progress_id=user_progress_id
-            ).all()
-            
-            # Check for test gates
-            checkpoint_1 = next((t for t in tests if t.test_type == 'checkpoint_1'), None)
-            checkpoint_2 = next((t for t in tests if t.test_type == 'checkpoint_2'), None)
-            
-            # Find the first incomplete topic that's not gated
-            for progress in all_progress:
-                topic_num = progress.topic_number
-                
-                # Check if topic is gated by a test
-                if topic_num in [5, 6, 7, 8] and checkpoint_1 and not checkpoint_1.passed:
-                    # Need to pass checkpoint 1 first
-                    completed_1_to_4 = all(
-                        p.completed for p in all_progress if p.topic_number in [1, 2, 3, 4]
-                    )
-                    if completed_1_to_4:
-                        return {
-                            'type': 'test',
-                            'test_type': 'checkpoint_1',
-                            'test_number': 1,
-                            'message': 'Complete Test 1 to unlock topics 5-8'
-                        }
-                    continue
-                    
-                elif topic_num in [9, 10, 11, 12] and checkpoint_2 and not checkpoint_2.passed:
-                    # Need to pass checkpoint 2 first
-                    completed_5_to_8 = all(
-                        p.completed for p in all_progress if p.topic_number in [5, 6, 7, 8]
-                    )
-                    if completed_5_to_8:
-                        return {
-                            'type': 'test',
-                            'test_type': 'checkpoint_2',
-                            'test_number': 2,
-                            'message': 'Complete Test 2 to unlock topics 9-12'
-                        }
-                    continue
-                
-                # If topic is not completed and not gated, it's current
-                if not progress.completed:
-                    # Get the user's level from UserProgress
-                    user_prog = UserProgress.query.get(user_progress_id)
-                    if user_prog:
-                        topic_def = self.get_topic_definition(user_prog.current_level, topic_num)
-                        if topic_def:
-                            return {
-                                'type': 'topic',
-                                'topic_number': topic_num,
-                                'title_key': topic_def.title_key,
-                                'progress': progress.to_dict(),
-                                'definition': topic_def.to_dict()
-                            }
-            
-            # All topics completed, check for final test
-            final_test = next((t for t in tests if t.test_type == 'final'), None)
-            if final_test and not final_test.passed:
-                return {
-                    'type': 'test',
-                    'test_type': 'final',
-                    'test_number': 3,
-                    'message': 'Complete Final Test to advance to next level'
-                }
-            
-            # Everything completed!
-            return {
-                'type': 'completed',
-                'message': 'Level completed! Ready to advance.'
-            }
-            
         except Exception as e:
             print(f"Error getting current topic: {e}")
             return None
@@ -499,23 +470,37 @@ class TopicManager:
             if not topic:
                 return None
 
-            # Map language to appropriate database column
-            language_lower = language.lower()
-
-            if language_lower == 'spanish' and topic.scenario_spanish:
-                return topic.scenario_spanish
-            elif language_lower == 'german' and topic.scenario_german:
-                return topic.scenario_german
-            elif language_lower == 'portuguese' and topic.scenario_portuguese:
-                return topic.scenario_portuguese
-            else:
-                # Default to English (scenario_template column)
-                return topic.scenario_template
+            return self.select_scenario_template(topic, language)
 
         except Exception as e:
             print(f"Error getting scenario template: {e}")
             return None
 
+    @staticmethod
+    def select_scenario_template(topic, language='english'):
+        """
+        Pick the scenario column of a loaded topic definition for a language
+
+        Args:
+            topic: TopicDefinition object
+            language: The language for the scenario (english, spanish, german, portuguese)
+
+        Returns:
+            Scenario template string or None
+        """
+        # Map language to appropriate database column
+        language_lower = language.lower()
+
+        if language_lower == 'spanish' and topic.scenario_spanish:
+            return topic.scenario_spanish
+        elif language_lower == 'german' and topic.scenario_german:
+            return topic.scenario_german
+        elif language_lower == 'portuguese' and topic.scenario_portuguese:
+            return topic.scenario_portuguese
+        else:
+            # Default to English (scenario_template column)
+            return topic.scenario_template
+
     def mark_topic_complete(self, user_progress_id, level, topic_number):
         """
         Mark a topic as complete and update current_topic
@@ -538,8 +523,8 @@ class TopicManager:
             if not topic_progress.completed:
                 topic_progress.mark_complete()
 
-            # Get user progress to update current topic
-            user_progress = UserProgress.query.get(user_progress_id)
+            # Get user progress to update current topic (from the request's progress snapshot)
+            user_progress = get_progression_engine(user_progress_id).user_progress
             if not user_progress:
                 return False, {'error': 'User progress not found'}
 
@@ -583,33 +568,7 @@ class TopicManager:
             Dict with next item info (topic or completed)
         """
         try:
-            # Simply advance to the next sequential topic
-            if completed_topic_number < 16:
-                next_topic_num = completed_topic_number + 1
-
-                # Get user progress for level
-                user_prog = UserProgress.query.get(user_progress_id)
-                if user_prog:
-                    # Get topic definition for the next topic
-                    topic_def = self.get_topic_definition(user_prog.current_level, next_topic_num)
-                    if topic_def:
-                        return {
-                            'type': 'topic',
-                            'topic_number': next_topic_num,
-                            'title_key': topic_def.title_key
-                        }
-
-            # Check if level is completed (all 16 topics done)
-            elif completed_topic_number == 16:
-                user_prog = UserProgress.query.get(user_progress_id)
-                if user_prog:
-                    # All 16 topics completed - level is done
-                    return {
-                        'type': 'completed',
-                        'message': 'Level completed! Ready to advance to next level.'
-                    }
-
-            return None
+            return get_progression_engine(user_progress_id).next_item(completed_topic_number)
 
         except Exception as e:
             print(f"Error determining next topic: {e}")
@@ -626,18 +585,13 @@ class TopicManager:
             Dict with popup info or None if no popup needed
         """
         try:
-            # Get user progress for context
-            user_progress = UserProgress.query.get(user_progress_id)
-            if not user_progress:
+            engine = get_progression_engine(user_progress_id)
+            if not engine.user_progress:
                 return None
 
             # Look for ANY completed topic that hasn't shown its popup yet
             # Get the earliest one (lowest topic number) to show in order
-            completed_without_popup = TopicProgress.query.filter_by(
-                user_progress_id=user_progress_id,
-                completed=True,
-                has_seen_completion_popup=False
-            ).order_by(TopicProgress.topic_number).first()
+            completed_without_popup = engine.completion_popup_topic()
 
             if completed_without_popup:
                 completed_topic_num = completed_without_popup.topic_number
@@ -646,7 +600,7 @@ class TopicManager:
                 next_item = self._determine_next_topic(user_progress_id, completed_topic_num)
 
                 if next_item:
-                    print(f"[INFO] Popup needed for completed Topic {completed_topic_num}")
+                    logger.debug("Popup needed for completed topic %s", completed_topic_num)
                     return {
                         'show_popup': True,
                         'completed_topic': completed_topic_num,
@@ -672,18 +626,18 @@ class TopicManager:
             Tuple (success: bool, message: str)
         """
         try:
-            # Get user progress for level
-            user_progress = UserProgress.query.get(user_progress_id)
-            if not user_progress:
+            # Get user progress and the topic row from the request's progress snapshot
+            engine = get_progression_engine(user_progress_id)
+            if not engine.user_progress:
                 return False, 'User progress not found'
 
-            topic_progress = self.get_user_topic_progress(user_progress_id, user_progress.current_level, topic_number)
+            topic_progress = engine.get_topic_progress(topic_number)
             if not topic_progress:
                 return False, 'Topic progress not found'
 
             # Check if the attribute exists (for existing records before migration)
             if not hasattr(topic_progress, 'has_seen_completion_popup'):
-                print(f"[WARNING] Topic progress {topic_number} missing has_seen_completion_popup field")
+                logger.warning("Topic progress %s missing has_seen_completion_popup field", topic_number)
                 return True, 'Field not available - skipping'
 
             topic_progress.mark_popup_seen()
@@ -707,20 +661,17 @@ class TopicManager:
             Tuple (success: bool, result: dict)
         """
         try:
+            engine = get_progression_engine(user_progress_id)
+
             # Check if user can access this topic
-            can_access, reason = self.can_access_topic(user_progress_id, new_topic_number)
+            can_access, reason = engine.can_access_topic(new_topic_number)
             if not can_access:
                 return False, {'error': reason}
 
-            # Get user progress
-            user_progress = UserProgress.query.get(user_progress_id)
-            if not user_progress:
-                return False, {'error': 'User progress not found'}
+            user_progress = engine.user_progress
 
             # Check if user can actually access this topic based on completed topics
-            all_topic_progress = self.get_user_topic_progress(user_progress_id, user_progress.current_level)
-            completed_topics = [tp.topic_number for tp in all_topic_progress if tp.completed]
-            max_accessible = max(completed_topics) + 1 if completed_topics else user_progress.current_topic
+            max_accessible = engine.max_accessible_topic()
 
             # Don't allow navigation to locked topics
             if new_topic_number > max_accessible:
@@ -756,26 +707,7 @@ class TopicManager:
             Tuple (can_access: bool, reason: str)
         """
         try:
-            # Get user progress for level
-            user_progress = UserProgress.query.get(user_progress_id)
-            if not user_progress:
-                return False, "User progress not found"
-
-            # Get all progress
-            all_progress = self.get_user_topic_progress(user_progress_id, user_progress.current_level)
-            tests = TestProgress.query.filter_by(user_progress_id=user_progress_id).all()
-
-            # Topic 1 is always accessible
-            if topic_number == 1:
-                return True, "First topic is always accessible"
-
-            # Check if previous topic is completed
-            prev_topic = next((p for p in all_progress if p.topic_number == topic_number - 1), None)
-            if prev_topic and not prev_topic.completed:
-                return False, f"Complete Topic {topic_number - 1} first"
-
-            # In 16-topic system, no test gates - just sequential progression
-            return True, "Topic is accessible"
+            return get_progression_engine(user_progress_id).can_access_topic(topic_number)
 
         except Exception as e:
             print(f"Error checking topic access: {e}")
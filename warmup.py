@@ -0,0 +1,131 @@
+"""
+Warm-up for Spralingua.
+Builds everything a worker would otherwise build on its first requests.
+
+With gunicorn's preload_app the master imports the app once and calls
+warmup() before forking (see gunicorn_config.py). Workers then start with
+every module imported and the topic/level catalogs, scenario table,
+personalities and prompt files already loaded. Those objects are moved out of
+the garbage collector's reach with gc.freeze(), so collections in the workers
+don't touch them and the pages stay shared copy-on-write instead of being
+copied into every worker.
+"""
+
+import gc
+import importlib
+import os
+import pkgutil
+import time
+
+from logging_config import get_logger
+
+logger = get_logger('warmup')
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Packages imported up front (route handlers import managers lazily)
+APP_PACKAGES = [
+    'auth', 'email_writing', 'language', 'level_rules', 'models', 'observability',
+    'progress', 'prompts', 'routes', 'scenarios', 'services', 'tests', 'topics'
+]
+
+FALLBACK_PROMPT_FILE = os.path.join('prompts', 'fallback_error.yaml')
+
+# Set once warm-up has finished in this process (inherited by forked workers)
+_state = {'warm': False, 'summary': None}
+
+
+def is_warm():
+    """True once warmup() has completed in this process"""
+    return _state['warm']
+
+
+def get_warmup_summary():
+    """Summary returned by the last warmup() (None before warm-up)"""
+    return _state['summary']
+
+
+def import_app_modules():
+    """
+    Import every module of the application packages
+
+    Returns:
+        Number of modules imported
+    """
+    count = 0
+    for package_name in APP_PACKAGES:
+        package = importlib.import_module(package_name)
+        count += 1
+        for module in pkgutil.walk_packages(package.__path__, prefix=f'{package_name}.'):
+            try:
+                importlib.import_module(module.name)
+                count += 1
+            except Exception as e:
+                logger.warning("Could not import %s: %s", module.name, e)
+    return count
+
+
+def load_catalogs(app):
+    """
+    Load the database-backed catalogs and the prompt files
+
+    Args:
+        app: Flask application
+
+    Returns:
+        Dict of catalog name -> number of entries
+    """
+    from database import db
+    from level_rules.level_rules_manager import LevelRulesManager
+    from prompts.conversation_prompt_builder import ConversationPromptBuilder
+    from prompts.prompt_manager import PromptManager
+    from scenarios.scenario_manager import ScenarioManager
+    from services.feedback import load_prescreen_data
+    from topics.topic_manager import TopicManager
+
+    loaded = {}
+    with app.app_context():
+        loaded['topics'] = TopicManager.load_topic_catalog()
+        loaded['level_rules'] = LevelRulesManager.load_level_rules()
+        loaded['scenarios'] = ScenarioManager.load_scenario_table()
+        db.session.remove()
+        # Connections opened here must not be inherited by forked workers
+        db.engine.dispose()
+
+    loaded['personalities'] = ConversationPromptBuilder.load_personalities()
+    loaded['prompt_files'] = len(PromptManager(FALLBACK_PROMPT_FILE).get_all_prompts())
+    loaded['hint_prescreens'] = load_prescreen_data()
+    return loaded
+
+
+def warmup(app, freeze=True):
+    """
+    Import, load and (optionally) freeze everything shared by the workers
+
+    Args:
+        app: Flask application
+        freeze: Call gc.freeze() afterwards (only useful before a fork)
+
+    Returns:
+        Dict summarising what was loaded
+    """
+    started = time.perf_counter()
+
+    # Relative paths (personalities, prompt files) resolve against the project root
+    previous_cwd = os.getcwd()
+    os.chdir(PROJECT_ROOT)
+    try:
+        summary = {'modules': import_app_modules()}
+        summary.update(load_catalogs(app))
+    finally:
+        os.chdir(previous_cwd)
+
+    if freeze and hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+        summary['frozen_objects'] = gc.get_freeze_count()
+
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    _state.update(warm=True, summary=summary)
+    logger.info("Warm-up complete: %s", ', '.join(f'{key}={value}' for key, value in summary.items()))
+    return summary